@@ -1,14 +1,28 @@
+import hashlib
 import json
+import re
+import threading
 import time
 import config
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from tqdm import tqdm
 from anthropic import Anthropic
 from pathlib import Path
 
+import cluster_annotate
+import model_router
+import profiling
+from annotation_cache import AnnotationCache, group_by_text
+from preclassify import DEFAULT_THRESHOLD as DEFAULT_PRECLASSIFY_THRESHOLD, LocalClassifier
+
 CLAUDE_API_KEY = getattr(config, "CLAUDE_API_KEY", "")
 CLAUDE_MODEL = getattr(config, "CLAUDE_MODEL", "")
+# Routing: short/simple comments -> fast model, long or mixed-language -> strong model
+CLAUDE_MODEL_FAST = getattr(config, "CLAUDE_MODEL_FAST", "") or CLAUDE_MODEL
+CLAUDE_MODEL_STRONG = getattr(config, "CLAUDE_MODEL_STRONG", "") or CLAUDE_MODEL
+ROUTING_ENABLED = CLAUDE_MODEL_FAST != CLAUDE_MODEL_STRONG
 BATCH_SIZE = int(getattr(config, "BATCH_SIZE", 10))
 
 def _slugify_channel(handle: str) -> str:
@@ -30,6 +44,7 @@ DATA_DIR.mkdir(exist_ok=True)
 
 INPUT_PATH = DATA_DIR / f"raw_comments_{CHANNEL_SLUG}.json"
 OUTPUT_PATH = DATA_DIR / f"annotated_comments_{CHANNEL_SLUG}.json"  
+CLUSTER_STATS_PATH = DATA_DIR / f"cluster_stats_{CHANNEL_SLUG}.json"
 
 DEBUG_DIR = DATA_DIR / "debug_claude"
 DEBUG_DIR.mkdir(exist_ok=True)
@@ -39,6 +54,17 @@ DEFAULT_MAX_TOKENS = 3500
 DEFAULT_MAX_RETRIES = 2
 DEFAULT_SLEEP_SECONDS = 0.5
 DEFAULT_REPAIR_ENABLED = True
+DEFAULT_STREAM_ENABLED = True
+DEFAULT_ANNOTATION_MODE = "text"  # "text" (free-form JSON) | "tool" (schema-constrained tool call)
+DEFAULT_CACHE_ENABLED = True
+DEFAULT_PROMPT_CACHE_ENABLED = True
+DEFAULT_PRECLASSIFY_ENABLED = False
+DEFAULT_CLUSTER_ENABLED = False
+DEFAULT_CLUSTER_MIN_COMMENTS = 2000
+DEFAULT_CLUSTER_AVG_SIZE = 20
+DEFAULT_CLUSTER_REPRESENTATIVES = 3
+DEFAULT_CLUSTER_SIMILARITY = 0.6
+DEFAULT_ROUTER_MAX_FAST_CHARS = 280
 
 
 def _get_cfg(name: str, default):
@@ -49,9 +75,29 @@ MAX_TOKENS = int(_get_cfg("CLAUDE_MAX_TOKENS", DEFAULT_MAX_TOKENS))
 MAX_RETRIES = int(_get_cfg("MAX_RETRIES", DEFAULT_MAX_RETRIES))
 SLEEP_SECONDS = float(_get_cfg("SLEEP_SECONDS", DEFAULT_SLEEP_SECONDS))
 REPAIR_ENABLED = bool(_get_cfg("REPAIR_JSON_ENABLED", DEFAULT_REPAIR_ENABLED))
-
-
-SYSTEM_PROMPT = """
+STREAM_ENABLED = bool(_get_cfg("CLAUDE_STREAM_ENABLED", DEFAULT_STREAM_ENABLED))
+ANNOTATION_MODE = str(_get_cfg("ANNOTATION_MODE", DEFAULT_ANNOTATION_MODE)).strip().lower()
+CACHE_ENABLED = bool(_get_cfg("ANNOTATION_CACHE_ENABLED", DEFAULT_CACHE_ENABLED))
+# Tool mode: mark tools + system prompt as cacheable (Anthropic prompt caching)
+PROMPT_CACHE_ENABLED = bool(_get_cfg("PROMPT_CACHE_ENABLED", DEFAULT_PROMPT_CACHE_ENABLED))
+# Shared across channels on purpose: identical texts get identical labels everywhere
+CACHE_PATH = Path(_get_cfg("ANNOTATION_CACHE_PATH", DATA_DIR / "annotation_cache.sqlite"))
+# Local fast path: comments the pre-classifier is confident about never reach Claude
+PRECLASSIFY_ENABLED = bool(_get_cfg("PRECLASSIFY_ENABLED", DEFAULT_PRECLASSIFY_ENABLED))
+PRECLASSIFY_THRESHOLD = float(_get_cfg("PRECLASSIFY_THRESHOLD", DEFAULT_PRECLASSIFY_THRESHOLD))
+# Cluster mode: only a few representatives per cluster of near-paraphrases go to Claude
+CLUSTER_ENABLED = bool(_get_cfg("CLUSTER_ANNOTATION_ENABLED", DEFAULT_CLUSTER_ENABLED))
+CLUSTER_MIN_COMMENTS = int(_get_cfg("CLUSTER_MIN_COMMENTS", DEFAULT_CLUSTER_MIN_COMMENTS))
+CLUSTER_AVG_SIZE = int(_get_cfg("CLUSTER_AVG_SIZE", DEFAULT_CLUSTER_AVG_SIZE))
+CLUSTER_REPRESENTATIVES = int(_get_cfg("CLUSTER_REPRESENTATIVES", DEFAULT_CLUSTER_REPRESENTATIVES))
+CLUSTER_SIMILARITY = float(_get_cfg("CLUSTER_SIMILARITY_THRESHOLD", DEFAULT_CLUSTER_SIMILARITY))
+ROUTER_MAX_FAST_CHARS = int(_get_cfg("ROUTER_MAX_FAST_CHARS", DEFAULT_ROUTER_MAX_FAST_CHARS))
+
+ALLOWED_SENTIMENTS = ["positive", "neutral", "negative"]
+ALLOWED_INTENTS = ["praise", "question", "constructive_criticism", "aggressive_criticism", "discussion", "other"]
+
+
+_PROMPT_INTRO = """
 You are an analytical assistant for community feedback analysis.
 
 Classify each YouTube comment objectively and conservatively.
@@ -59,11 +105,19 @@ Do not infer intent beyond what is clearly expressed.
 When uncertain, prefer neutral sentiment and "discussion" or "other" intent.
 Do not explain your reasoning.
 
-Output format rules:
+"""
+_TEXT_OUTPUT_RULES = """Output format rules:
 - Return ONLY a valid JSON array (no markdown, no extra text).
 - Each element must be an object with: id, sentiment, intent, emotion_intensity, key_topics.
 
-Sentiment:
+"""
+_TOOL_OUTPUT_RULES = """Output format rules:
+- Call the record_annotations tool exactly once, with one entry in "annotations" per comment.
+- Each entry has: id (the comment's id, unchanged), sentiment, intent, emotion_intensity, key_topics.
+- Do not answer in plain text.
+
+"""
+_LABEL_RULES = """Sentiment:
 - positive | neutral | negative
 
 Intent:
@@ -83,6 +137,17 @@ Topics:
 - Avoid generic topics like "this_video", "creator", "content".
 - Avoid names and specific events.
 """
+SYSTEM_PROMPT = _PROMPT_INTRO + _TEXT_OUTPUT_RULES + _LABEL_RULES
+TOOL_SYSTEM_PROMPT = _PROMPT_INTRO + _TOOL_OUTPUT_RULES + _LABEL_RULES
+
+# Cache entries are only reused for the same prompt/model/mode
+PROMPT_VERSION = str(
+    _get_cfg("ANNOTATION_PROMPT_VERSION", "")
+    or hashlib.sha1(
+        f"{SYSTEM_PROMPT if ANNOTATION_MODE == 'text' else TOOL_SYSTEM_PROMPT}|"
+        f"{CLAUDE_MODEL_STRONG}|{CLAUDE_MODEL_FAST}|{ANNOTATION_MODE}".encode("utf-8")
+    ).hexdigest()[:12]
+)
 
 
 def build_user_prompt(comments: List[Dict[str, Any]]) -> str:
@@ -102,6 +167,74 @@ Comments:
 """
 
 
+# Tool-use mode: the schema carries the field list, so the per-batch prompt only holds the comments.
+ANNOTATION_TOOL: Dict[str, Any] = {
+    "name": "record_annotations",
+    "description": "Record the classification of every comment in the batch.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "annotations": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "string"},
+                        "sentiment": {"type": "string", "enum": ALLOWED_SENTIMENTS},
+                        "intent": {"type": "string", "enum": ALLOWED_INTENTS},
+                        "emotion_intensity": {"type": "number", "minimum": 0.0, "maximum": 1.0},
+                        "key_topics": {"type": "array", "items": {"type": "string"}, "maxItems": 3},
+                    },
+                    "required": ["id", "sentiment", "intent", "emotion_intensity", "key_topics"],
+                },
+            }
+        },
+        "required": ["annotations"],
+    },
+}
+
+
+def build_compact_user_prompt(comments: List[Dict[str, Any]]) -> str:
+    payload = [{"id": c["comment_id"], "text": c.get("text", "")} for c in comments]
+    return (
+        "Classify every comment below and call record_annotations once.\n"
+        + json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    )
+
+
+def text_request_kwargs(batch: List[Dict[str, Any]], model: Optional[str] = None) -> Dict[str, Any]:
+    return dict(
+        model=model or CLAUDE_MODEL,
+        max_tokens=MAX_TOKENS,
+        temperature=0,
+        system=SYSTEM_PROMPT,
+        messages=[{"role": "user", "content": build_user_prompt(batch)}],
+    )
+
+
+def _tool_system_prompt() -> Any:
+    """
+    With PROMPT_CACHE_ENABLED, a cache breakpoint after tools + system prompt (identical
+    in every batch). The API only caches prefixes from the model's minimum length on
+    (1024 tokens, 2048 for Haiku models); below that the block is sent uncached.
+    """
+    if not PROMPT_CACHE_ENABLED:
+        return TOOL_SYSTEM_PROMPT
+    return [{"type": "text", "text": TOOL_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
+
+def tool_request_kwargs(batch: List[Dict[str, Any]], model: Optional[str] = None) -> Dict[str, Any]:
+    return dict(
+        model=model or CLAUDE_MODEL,
+        max_tokens=MAX_TOKENS,
+        temperature=0,
+        system=_tool_system_prompt(),
+        tools=[ANNOTATION_TOOL],
+        tool_choice={"type": "tool", "name": ANNOTATION_TOOL["name"]},
+        messages=[{"role": "user", "content": build_compact_user_prompt(batch)}],
+    )
+
+
 def _debug_dump(prefix: str, text: str) -> str:
     ts = int(time.time())
     path = DEBUG_DIR / f"{prefix}_{ts}.txt"
@@ -131,6 +264,87 @@ def _extract_json_array(text: str) -> str:
     return t[start:end + 1]
 
 
+class _IncrementalArrayParser:
+    """
+    Tolerant incremental parser for a JSON array of objects.
+    Feed text chunks as they arrive; every top-level object is returned as soon as
+    its closing brace is seen. Truncated tails and malformed objects are skipped.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0  # nesting depth inside the top-level array
+        self._in_array = False
+        self._in_string = False
+        self._escape = False
+        self._obj_start: Optional[int] = None
+        self.skipped = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._buf += chunk
+        buf = self._buf
+        found: List[Dict[str, Any]] = []
+
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif not self._in_array:
+                # ignore any preamble (code fences, prose) before the array
+                if ch == "[":
+                    self._in_array = True
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "{":
+                    self._obj_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # closing bracket of the top-level array
+                    self._in_array = False
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and self._obj_start is not None:
+                        obj = self._load(buf[self._obj_start:i + 1])
+                        if obj is not None:
+                            found.append(obj)
+                        self._obj_start = None
+            i += 1
+
+        # Keep only the unfinished object (if any) in the buffer
+        if self._obj_start is None:
+            self._buf, self._pos = "", 0
+        else:
+            self._buf = buf[self._obj_start:]
+            self._pos = i - self._obj_start
+            self._obj_start = 0
+        return found
+
+    def _load(self, text: str) -> Optional[Dict[str, Any]]:
+        for candidate in (text, re.sub(r",\s*([}\]])", r"\1", text)):
+            try:
+                obj = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(obj, dict):
+                return obj
+        self.skipped += 1
+        return None
+
+
+def _salvage_claude_json(raw_text: str) -> List[Dict[str, Any]]:
+    """Recover every complete annotation object from a truncated/malformed array."""
+    return _IncrementalArrayParser().feed(_strip_code_fences(raw_text))
+
+
 def _safe_parse_claude_json(raw_text: str) -> List[Dict[str, Any]]:
     json_text = _extract_json_array(raw_text)
     data = json.loads(json_text)
@@ -139,7 +353,7 @@ def _safe_parse_claude_json(raw_text: str) -> List[Dict[str, Any]]:
     return data
 
 
-def repair_json_with_claude(client: Anthropic, raw_text: str) -> List[Dict[str, Any]]:
+def repair_json_with_claude(client: Anthropic, raw_text: str, model: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Second-pass deterministic "format repair" only.
     We do not change semantics; we only enforce valid JSON.
@@ -156,7 +370,7 @@ Broken JSON:
 {raw_text}
 """
     msg = client.messages.create(
-        model=CLAUDE_MODEL,
+        model=model or CLAUDE_MODEL,
         max_tokens=MAX_TOKENS,
         temperature=0,
         system="You fix JSON formatting. Output only valid JSON.",
@@ -166,25 +380,116 @@ Broken JSON:
     return _safe_parse_claude_json(fixed)
 
 
-def annotate_batch(client: Anthropic, batch: List[Dict[str, Any]], attempt: int = 1) -> List[Dict[str, Any]]:
-    message = client.messages.create(
-        model=CLAUDE_MODEL,
-        max_tokens=MAX_TOKENS,
-        temperature=0,
-        system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": build_user_prompt(batch)}],
-    )
-    raw_text = message.content[0].text.strip()
+def _request_annotations(
+    client: Anthropic,
+    batch: List[Dict[str, Any]],
+    model: Optional[str] = None,
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Returns (raw_text, objects) where objects are the annotation objects
+    parsed incrementally while the response was arriving.
+    """
+    kwargs = text_request_kwargs(batch, model=model)
+    parser = _IncrementalArrayParser()
+
+    if not STREAM_ENABLED:
+        message = client.messages.create(**kwargs)
+        raw_text = message.content[0].text.strip()
+        return raw_text, parser.feed(raw_text)
+
+    chunks: List[str] = []
+    objects: List[Dict[str, Any]] = []
+    with client.messages.stream(**kwargs) as stream:
+        for text in stream.text_stream:
+            chunks.append(text)
+            objects.extend(parser.feed(text))
+    return "".join(chunks).strip(), objects
+
+
+def _reannotate_missing(
+    client: Anthropic,
+    batch: List[Dict[str, Any]],
+    recovered: List[Dict[str, Any]],
+    attempt: int,
+    model: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Re-request only the comments whose annotation could not be salvaged.
+    Failures are not fatal: unannotated ids are picked up by the next (resume) run.
+    """
+    got = {a.get("id") for a in recovered}
+    missing = [c for c in batch if c.get("comment_id") not in got]
+    if not missing:
+        return []
+
+    print(f"[salvage] recovered {len(recovered)}/{len(batch)} annotations, re-requesting {len(missing)}")
+    try:
+        return annotate_batch(client, missing, attempt=attempt, model=model)
+    except Exception as e:
+        print(f"[warn] re-request of {len(missing)} missing ids failed: {e}")
+        return []
+
+
+def _tool_annotations(message) -> Optional[List[Dict[str, Any]]]:
+    for block in message.content:
+        if getattr(block, "type", "") == "tool_use" and block.name == ANNOTATION_TOOL["name"]:
+            annotations = (block.input or {}).get("annotations")
+            if isinstance(annotations, list):
+                return [a for a in annotations if isinstance(a, dict)]
+    return None
+
+
+def annotate_batch_tool(
+    client: Anthropic,
+    batch: List[Dict[str, Any]],
+    attempt: int = 1,
+    model: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Schema-constrained annotation via a forced tool call.
+    No JSON repair pass needed; a truncated call only re-requests the missing ids.
+    """
+    message = client.messages.create(**tool_request_kwargs(batch, model=model))
+    annotations = _tool_annotations(message)
+
+    if annotations is None:
+        bad_path = _debug_dump(f"claude_no_tool_call_attempt{attempt}", str(message.content))
+        raise ValueError(f"Claude did not call {ANNOTATION_TOOL['name']} (dumped to {bad_path}).")
+
+    if message.stop_reason == "max_tokens":
+        batch_ids = {c.get("comment_id") for c in batch}
+        recovered = [a for a in annotations if a.get("id") in batch_ids]
+        return recovered + _reannotate_missing(client, batch, recovered, attempt, model=model)
+
+    return annotations
+
+
+def annotate_batch(
+    client: Anthropic,
+    batch: List[Dict[str, Any]],
+    attempt: int = 1,
+    model: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    if ANNOTATION_MODE == "tool":
+        return annotate_batch_tool(client, batch, attempt=attempt, model=model)
+
+    raw_text, objects = _request_annotations(client, batch, model=model)
 
     try:
         return _safe_parse_claude_json(raw_text)
     except Exception as e:
         bad_path = _debug_dump(f"claude_bad_json_attempt{attempt}", raw_text)
 
-        # Optional repair pass (highly effective in practice)
+        # Salvage every complete object; only the missing ids go back to Claude
+        batch_ids = {c.get("comment_id") for c in batch}
+        recovered = [a for a in objects if a.get("id") in batch_ids]
+        if recovered:
+            return recovered + _reannotate_missing(client, batch, recovered, attempt, model=model)
+
+        # Optional repair pass (nothing salvageable, e.g. broken from the first object)
         if REPAIR_ENABLED:
             try:
-                repaired = repair_json_with_claude(client, raw_text)
+                repaired = repair_json_with_claude(client, raw_text, model=model)
                 return repaired
             except Exception as repair_err:
                 rep_path = _debug_dump(f"claude_repair_failed_attempt{attempt}", str(repair_err))
@@ -241,8 +546,8 @@ def _normalize_topic(t: str) -> str:
 
 
 def _normalize_annotation_fields(ann: Dict[str, Any]) -> Dict[str, Any]:
-    allowed_sent = {"positive", "neutral", "negative"}
-    allowed_intent = {"praise", "question", "constructive_criticism", "aggressive_criticism", "discussion", "other"}
+    allowed_sent = set(ALLOWED_SENTIMENTS)
+    allowed_intent = set(ALLOWED_INTENTS)
 
     sent = str(ann.get("sentiment", "neutral")).strip().lower()
     intent = str(ann.get("intent", "other")).strip().lower()
@@ -282,44 +587,73 @@ def _normalize_annotation_fields(ann: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def main():
-    comments: List[Dict[str, Any]] = _load_json(INPUT_PATH, default=[])
-    if not comments:
-        print("No raw comments found. Aborting.")
-        return
+def make_client() -> Anthropic:
+    # ANTHROPIC_BASE_URL allows pointing the pipeline at a local stub server
+    return Anthropic(api_key=CLAUDE_API_KEY, base_url=_get_cfg("ANTHROPIC_BASE_URL", None) or None)
 
-    annotated: List[Dict[str, Any]] = _load_json(OUTPUT_PATH, default=[])
-    annotated_ids = _collect_annotated_ids(annotated)
 
-    # Optional test mode via config
-    TEST_LIMIT: Optional[int] = getattr(config, "TEST_LIMIT", None)
-    if TEST_LIMIT is not None:
-        comments = comments[:TEST_LIMIT]
+# Routed batches run in worker threads; merging/writing must not interleave
+_MERGE_LOCK = threading.Lock()
 
-    remaining = [c for c in comments if c.get("comment_id") and c.get("comment_id") not in annotated_ids]
 
-    print(f"Total raw comments (after TEST_LIMIT): {len(comments)}")
-    print(f"Annotated file rows: {len(annotated)}")
-    print(f"Recognized annotated_ids: {len(annotated_ids)}")
-    print(f"Remaining to annotate: {len(remaining)}")
-    print(f"[config] BATCH_SIZE={BATCH_SIZE} MAX_TOKENS={MAX_TOKENS} MAX_RETRIES={MAX_RETRIES} REPAIR={REPAIR_ENABLED}")
+def _write_output(annotated: List[Dict[str, Any]]) -> None:
+    # Crash-safe write (called after each step/batch)
+    with OUTPUT_PATH.open("w", encoding="utf-8") as f:
+        json.dump(annotated, f, ensure_ascii=False, indent=2)
 
-    if not remaining:
-        print("Nothing left to annotate.")
-        return
 
-    if not CLAUDE_MODEL:
-        raise ValueError("CLAUDE_MODEL missing in config.py")
-    client = Anthropic(api_key=CLAUDE_API_KEY)
+def _apply_preclassifier(
+    groups: Dict[str, List[Dict[str, Any]]],
+    annotated: List[Dict[str, Any]],
+    annotated_ids: set,
+) -> int:
+    """
+    Label confident groups locally (removed from `groups`); returns the number of comments labeled.
+    Local labels are marked with annotation_source="local" so they can be audited/excluded later.
+    """
+    keys = list(groups.keys())
+    preds = LocalClassifier.load().classify_many([groups[k][0].get("text", "") for k in keys])
+
+    n_local = 0
+    for key, pred in zip(keys, preds):
+        if pred["confidence"] < PRECLASSIFY_THRESHOLD:
+            continue
+        norm = _normalize_annotation_fields(pred)
+        for original in groups.pop(key):
+            annotated.append({**original, **norm, "annotation_source": "local", "local_confidence": pred["confidence"]})
+            annotated_ids.add(original["comment_id"])
+            n_local += 1
+    return n_local
+
+
+def _annotate_groups(
+    client: Anthropic,
+    groups: Dict[str, List[Dict[str, Any]]],
+    keys: List[str],
+    annotated: List[Dict[str, Any]],
+    annotated_ids: set,
+    cache: Optional[AnnotationCache],
+    model: Optional[str] = None,
+    route_reasons: Optional[Dict[str, str]] = None,
+    position: int = 0,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Send one representative comment per group key to Claude (in batches) and fan the
+    result out to every comment of the group. Returns key -> normalized annotation.
+    With routing, the model and route reason are recorded on every comment.
+    """
+    unique = [groups[k][0] for k in keys]
+    key_by_id = {groups[k][0]["comment_id"]: k for k in keys}
+    results: Dict[str, Dict[str, Any]] = {}
 
-    for i in tqdm(range(0, len(remaining), BATCH_SIZE)):
-        batch = remaining[i:i + BATCH_SIZE]
+    for i in tqdm(range(0, len(unique), BATCH_SIZE), desc=model, position=position):
+        batch = unique[i:i + BATCH_SIZE]
         batch_by_id = {c["comment_id"]: c for c in batch if "comment_id" in c}
 
         annotations: Optional[List[Dict[str, Any]]] = None
         for attempt in range(1, MAX_RETRIES + 2):
             try:
-                annotations = annotate_batch(client, batch, attempt=attempt)
+                annotations = annotate_batch(client, batch, attempt=attempt, model=model)
                 break
             except Exception as e:
                 print(f"Error in batch starting at index {i} (attempt {attempt}): {e}")
@@ -329,25 +663,196 @@ def main():
             # Skip batch if all retries fail
             continue
 
-        # Merge deterministically by id
-        for ann in annotations:
-            cid = ann.get("id")
-            if cid not in batch_by_id:
-                continue
+        # Merge deterministically by id (fan out to all comments with the same text)
+        with _MERGE_LOCK:
+            fresh: Dict[str, Dict[str, Any]] = {}
+            for ann in annotations:
+                cid = ann.get("id")
+                if cid not in batch_by_id or cid in annotated_ids:
+                    continue
 
-            original = batch_by_id[cid]
-            norm = _normalize_annotation_fields(ann)
+                norm = _normalize_annotation_fields(ann)
+                key = key_by_id[cid]
+                route = {"model": model, "route": route_reasons[key]} if route_reasons else {}
+                for original in groups[key]:
+                    annotated.append({**original, **norm, **route})
+                    annotated_ids.add(original["comment_id"])
+                fresh[key] = norm
 
-            annotated.append({**original, **norm})
-            annotated_ids.add(cid)
+            results.update(fresh)
 
-        # Crash-safe write after each batch
-        with OUTPUT_PATH.open("w", encoding="utf-8") as f:
-            json.dump(annotated, f, ensure_ascii=False, indent=2)
+            if cache is not None:
+                cache.put_many(fresh)
 
+            _write_output(annotated)
 
         time.sleep(SLEEP_SECONDS)
 
+    return results
+
+
+def _annotate_routed(
+    client: Anthropic,
+    groups: Dict[str, List[Dict[str, Any]]],
+    keys: List[str],
+    annotated: List[Dict[str, Any]],
+    annotated_ids: set,
+    cache: Optional[AnnotationCache],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Split keys into fast/strong routes and annotate both classes concurrently.
+    Without distinct fast/strong models this is a plain _annotate_groups call.
+    """
+    if not ROUTING_ENABLED:
+        return _annotate_groups(client, groups, keys, annotated, annotated_ids, cache)
+
+    reasons: Dict[str, str] = {}
+    by_route: Dict[str, List[str]] = {model_router.ROUTE_FAST: [], model_router.ROUTE_STRONG: []}
+    for k in keys:
+        route, reasons[k] = model_router.route_comment(groups[k][0].get("text", ""), ROUTER_MAX_FAST_CHARS)
+        by_route[route].append(k)
+    print(
+        f"[router] fast={len(by_route[model_router.ROUTE_FAST])} ({CLAUDE_MODEL_FAST}) "
+        f"strong={len(by_route[model_router.ROUTE_STRONG])} ({CLAUDE_MODEL_STRONG})"
+    )
+
+    models = {model_router.ROUTE_FAST: CLAUDE_MODEL_FAST, model_router.ROUTE_STRONG: CLAUDE_MODEL_STRONG}
+    results: Dict[str, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=len(by_route)) as pool:
+        futures = [
+            pool.submit(
+                _annotate_groups, client, groups, route_keys, annotated, annotated_ids, cache,
+                model=models[route], route_reasons=reasons, position=pos,
+            )
+            for pos, (route, route_keys) in enumerate(by_route.items())
+        ]
+        for fut in futures:
+            results.update(fut.result())
+    return results
+
+
+def _annotate_clustered(
+    client: Anthropic,
+    groups: Dict[str, List[Dict[str, Any]]],
+    annotated: List[Dict[str, Any]],
+    annotated_ids: set,
+    cache: Optional[AnnotationCache],
+) -> None:
+    """
+    Annotate cluster representatives first, propagate their labels to similar members,
+    then annotate the remaining (dissimilar) members normally.
+    """
+    keys = list(groups.keys())
+    X = cluster_annotate.vectorize([groups[k][0].get("text", "") for k in keys])
+    labels, dist = cluster_annotate.cluster(X, CLUSTER_AVG_SIZE)
+    reps = cluster_annotate.pick_representatives(labels, dist, CLUSTER_REPRESENTATIVES)
+    rep_rows = sorted(r for rows in reps.values() for r in rows)
+    print(f"[cluster] {len(keys)} texts -> {len(reps)} clusters, {len(rep_rows)} representatives")
+
+    rep_results = _annotate_routed(client, groups, [keys[r] for r in rep_rows], annotated, annotated_ids, cache)
+    rep_annotations = {r: rep_results[keys[r]] for r in rep_rows if keys[r] in rep_results}
+
+    assignments, stats = cluster_annotate.propagate(X, labels, reps, rep_annotations, CLUSTER_SIMILARITY)
+    for row, (rep_row, similarity) in assignments.items():
+        for original in groups[keys[row]]:
+            annotated.append({
+                **original,
+                **rep_annotations[rep_row],
+                "annotation_source": "cluster",
+                "cluster_id": int(labels[row]),
+                "cluster_similarity": round(similarity, 3),
+            })
+            annotated_ids.add(original["comment_id"])
+    _write_output(annotated)
+
+    with CLUSTER_STATS_PATH.open("w", encoding="utf-8") as f:
+        json.dump(
+            {"similarity_threshold": CLUSTER_SIMILARITY, "clusters": stats},
+            f, ensure_ascii=False, indent=2,
+        )
+    print(f"[cluster] propagated={sum(s['propagated'] for s in stats)} texts; stats → {CLUSTER_STATS_PATH}")
+
+    rep_set = set(rep_rows)
+    rest = [k for i, k in enumerate(keys) if i not in assignments and i not in rep_set]
+    _annotate_routed(client, groups, rest, annotated, annotated_ids, cache)
+
+
+def main():
+    comments: List[Dict[str, Any]] = _load_json(INPUT_PATH, default=[])
+    if not comments:
+        print("No raw comments found. Aborting.")
+        return
+
+    annotated: List[Dict[str, Any]] = _load_json(OUTPUT_PATH, default=[])
+    annotated_ids = _collect_annotated_ids(annotated)
+
+    # Optional test mode via config
+    TEST_LIMIT: Optional[int] = getattr(config, "TEST_LIMIT", None)
+    if TEST_LIMIT is not None:
+        comments = comments[:TEST_LIMIT]
+
+    remaining = [c for c in comments if c.get("comment_id") and c.get("comment_id") not in annotated_ids]
+
+    print(f"Total raw comments (after TEST_LIMIT): {len(comments)}")
+    print(f"Annotated file rows: {len(annotated)}")
+    print(f"Recognized annotated_ids: {len(annotated_ids)}")
+    print(f"Remaining to annotate: {len(remaining)}")
+    print(f"[config] BATCH_SIZE={BATCH_SIZE} MAX_TOKENS={MAX_TOKENS} MAX_RETRIES={MAX_RETRIES} REPAIR={REPAIR_ENABLED} STREAM={STREAM_ENABLED} MODE={ANNOTATION_MODE}")
+
+    if CLUSTER_ENABLED:
+        # Fail before any work is done, not when the first large run reaches clustering
+        cluster_annotate._require_sklearn()
+
+    if not remaining:
+        print("Nothing left to annotate.")
+        return
+
+    # Identical texts are annotated once and fanned back out to every comment_id;
+    # ANNOTATION_CACHE_ENABLED only controls the cross-run SQLite lookup/write
+    groups = group_by_text(remaining)
+    print(f"[dedup] unique texts={len(groups)} (from {len(remaining)} comments)")
+
+    cache: Optional[AnnotationCache] = None
+    if CACHE_ENABLED:
+        cache = AnnotationCache(CACHE_PATH, PROMPT_VERSION)
+        with profiling.span("cache lookup", texts=len(groups)):
+            hits = cache.get_many(groups.keys())
+        for key, norm in hits.items():
+            for original in groups.pop(key):
+                annotated.append({**original, **norm})
+                annotated_ids.add(original["comment_id"])
+        print(
+            f"[cache] hits={len(hits)} texts; "
+            f"unique texts to annotate={len(groups)} (from {len(remaining)} comments) version={PROMPT_VERSION}"
+        )
+        if hits:
+            _write_output(annotated)
+
+    if PRECLASSIFY_ENABLED:
+        with profiling.span("preclassify", texts=len(groups)):
+            n_local = _apply_preclassifier(groups, annotated, annotated_ids)
+        print(f"[preclassify] threshold={PRECLASSIFY_THRESHOLD} labeled locally={n_local} comments")
+        if n_local:
+            _write_output(annotated)
+
+    if not groups:
+        print(f"Annotated {len(annotated)} comments → {OUTPUT_PATH}")
+        return
+
+    if not CLAUDE_MODEL:
+        raise ValueError("CLAUDE_MODEL missing in config.py")
+    if ANNOTATION_MODE not in ("text", "tool"):
+        raise ValueError(f"ANNOTATION_MODE must be 'text' or 'tool', got {ANNOTATION_MODE!r}")
+    client = make_client()
+
+    with profiling.span("claude", texts=len(groups), clustered=CLUSTER_ENABLED and len(groups) >= CLUSTER_MIN_COMMENTS):
+        if CLUSTER_ENABLED and len(groups) >= CLUSTER_MIN_COMMENTS:
+            _annotate_clustered(client, groups, annotated, annotated_ids, cache)
+        else:
+            _annotate_routed(client, groups, list(groups.keys()), annotated, annotated_ids, cache)
+
+    if cache is not None:
+        cache.close()
     print(f"Annotated {len(annotated)} comments → {OUTPUT_PATH}")
 
 
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import re
+import sqlite3
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalization used for dedup keys:
+    - unicode NFKC + casefold ("First!" == "first!")
+    - whitespace collapsed
+    - runs of 3+ identical non-digit characters shortened to 2 ("soooo" == "sooo", "😂😂😂😂" == "😂😂😂")
+    """
+    t = unicodedata.normalize("NFKC", text or "").casefold()
+    t = re.sub(r"\s+", " ", t).strip()
+    t = re.sub(r"(\D)\1{2,}", r"\1\1", t)
+    return t
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class AnnotationCache:
+    """
+    Annotation results keyed by (normalized-text hash, prompt version).
+    One local SQLite file shared across runs and channels.
+    """
+
+    def __init__(self, path: Path, prompt_version: str) -> None:
+        self.path = path
+        self.prompt_version = prompt_version
+        # Callers serialize access; routed annotation writes from worker threads.
+        # Other channel processes (run_analysis --channels) may hold the write lock briefly.
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS annotations (
+                text_hash TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                annotation TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (text_hash, prompt_version)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[i:i + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT text_hash, annotation FROM annotations "
+                f"WHERE prompt_version = ? AND text_hash IN ({placeholders})",
+                [self.prompt_version, *chunk],
+            )
+            for text_hash, annotation in rows:
+                found[text_hash] = json.loads(annotation)
+        return found
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        if not items:
+            return
+        now = datetime.now().isoformat(timespec="seconds")
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO annotations (text_hash, prompt_version, annotation, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            [(k, self.prompt_version, json.dumps(v, ensure_ascii=False), now) for k, v in items.items()],
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def group_by_text(comments: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """key -> all comments sharing that normalized text (first one is the representative)."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for c in comments:
+        groups.setdefault(text_key(c.get("text", "")), []).append(c)
+    return groups
@@ -0,0 +1,300 @@
+"""
+Partitioned Parquet store for annotated comments (read side of compute_metrics).
+
+    python annotation_store.py export   # annotated_comments_<slug>.json -> data/annotations_parquet/channel=<slug>/
+    python annotation_store.py info
+
+Layout: data/annotations_parquet/channel=<slug>/week=<week start>/part-0.parquet,
+weeks in Europe/Berlin like the metrics. sentiment/intent/video ids are
+dictionary-encoded (pandas categoricals), key_topics is list<string>. The JSON
+file stays the source of truth; export only rewrites weeks whose fingerprint
+changed (same fingerprints as the per-week metrics partials, kept in _weeks.json).
+
+annotate_comments only ever appends to the JSON array. _source.json remembers
+where the last exported record ended and a hash of everything before it; if that
+prefix is unchanged, only the records after it are parsed and appended to their
+week partitions. Any other edit of the file falls back to a full comparison.
+"""
+import argparse
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import config
+
+DEFAULT_STORE = "json"
+
+
+def _slugify_channel(handle: str) -> str:
+    s = (handle or "").strip()
+    if s.startswith("@"):
+        s = s[1:]
+    s = s.lower()
+    s = "".join(ch for ch in s if ch.isalnum() or ch in ("-", "_"))
+    return s or "channel"
+
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+STORE_DIR = Path(getattr(config, "ANNOTATION_STORE_DIR", DATA_DIR / "annotations_parquet"))
+STORE = str(getattr(config, "ANNOTATION_STORE", DEFAULT_STORE)).strip().lower()
+
+CHANNEL_SLUG = _slugify_channel(getattr(config, "CHANNEL_HANDLE", ""))
+
+MANIFEST_NAME = "_weeks.json"
+SOURCE_NAME = "_source.json"  # rows, end offset and prefix hash of the last exported JSON
+PART_NAME = "part-0.parquet"
+
+SCHEMA = pa.schema([
+    ("source_row", pa.int64()),  # position in the JSON file (keeps topic tie order stable)
+    ("comment_id", pa.string()),
+    ("video_id", pa.dictionary(pa.int32(), pa.string())),
+    ("video_title", pa.dictionary(pa.int32(), pa.string())),
+    ("author", pa.string()),
+    ("like_count", pa.int64()),
+    ("published_at", pa.timestamp("us", tz="UTC")),
+    ("text", pa.string()),
+    ("has_text", pa.bool_()),
+    ("sentiment", pa.dictionary(pa.int32(), pa.string())),
+    ("intent", pa.dictionary(pa.int32(), pa.string())),
+    ("emotion_intensity", pa.float64()),
+    ("key_topics", pa.list_(pa.string())),
+    ("annotation_source", pa.dictionary(pa.int32(), pa.string())),
+    ("model", pa.dictionary(pa.int32(), pa.string())),
+])
+
+
+def channel_dir(slug: str, root: Path = STORE_DIR) -> Path:
+    return root / f"channel={slug}"
+
+
+def _week_dir(directory: Path, key: str) -> Path:
+    return directory / f"week={key.split('/')[0]}"
+
+
+def load_manifest(directory: Path) -> Dict[str, Dict[str, Any]]:
+    path = directory / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(directory: Path, manifest: Dict[str, Dict[str, Any]]) -> None:
+    tmp = directory / (MANIFEST_NAME + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(dict(sorted(manifest.items())), f, ensure_ascii=False, indent=2)
+    tmp.replace(directory / MANIFEST_NAME)
+
+
+def _load_source(directory: Path) -> Dict[str, Any]:
+    path = directory / SOURCE_NAME
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _source_state(data: bytes) -> Dict[str, Any]:
+    end = _array_end(data)
+    return {} if end is None else {"end": end, "sha256": hashlib.sha256(data[:end]).hexdigest()}
+
+
+def _save_source(directory: Path, state: Dict[str, Any], rows: int) -> None:
+    with (directory / SOURCE_NAME).open("w", encoding="utf-8") as f:
+        json.dump({**state, "rows": rows} if state else {}, f, indent=2)
+
+
+def _array_end(data: bytes) -> Optional[int]:
+    """Offset right after the last record of a JSON array (after "[" if empty); None for other files."""
+    body = data.rstrip()
+    if not body.endswith(b"]"):
+        return None
+    last = body.rfind(b"}")
+    return last + 1 if last >= 0 else body.index(b"[") + 1
+
+
+def _topic_list(topics: Any) -> Optional[List[Optional[str]]]:
+    if not isinstance(topics, list):
+        return None
+    return [t if t is None or isinstance(t, str) else str(t) for t in topics]
+
+
+def _to_table(df: pd.DataFrame, published_utc: pd.Series) -> pa.Table:
+    """Prepared comments -> Arrow table with SCHEMA (missing optional columns become null)."""
+    n = len(df)
+    columns: Dict[str, Any] = {
+        "source_row": df.index.to_numpy(dtype="int64"),
+        "published_at": published_utc,
+        "has_text": df["text"].notna().to_numpy() if "text" in df.columns else [True] * n,
+        "key_topics": [_topic_list(t) for t in df["key_topics"]] if "key_topics" in df.columns else [None] * n,
+        "like_count": pd.to_numeric(df["like_count"], errors="coerce").astype("Int64") if "like_count" in df.columns else [None] * n,
+    }
+    arrays = []
+    for field in SCHEMA:
+        if field.name in columns:
+            values = columns[field.name]
+        elif field.name in df.columns:
+            values = df[field.name].astype(object).where(df[field.name].notna(), None)
+            if field.name != "emotion_intensity":
+                values = values.map(lambda v: v if v is None else str(v))
+        else:
+            values = [None] * n
+        arrays.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+def _prepared(records: List[Dict[str, Any]], first_row: int = 0):
+    """JSON records -> (prepared DataFrame indexed by source row, UTC timestamps, week fingerprints)."""
+    # Lazy import: compute_metrics imports this module
+    from scripts import compute_metrics as cm
+    from scripts import metrics_partials as partials
+
+    df = pd.DataFrame(records, index=pd.RangeIndex(first_row, first_row + len(records)))
+    published_utc = cm.parse_published_at_utc(df["published_at"])
+    df["published_at"] = published_utc
+    df = cm.prepare_dataframe(df)
+    return df, published_utc, partials.week_fingerprints(df, cm.EMOTION_SCALE, cm._has_text(df))
+
+
+def _export_appended(data: bytes, directory: Path) -> Optional[List[str]]:
+    """
+    Append the records added after the last export to their week partitions.
+    Returns None if the file changed in any other way (caller falls back to a full comparison).
+    """
+    from scripts import metrics_partials as partials
+
+    source, manifest = _load_source(directory), load_manifest(directory)
+    # A run interrupted after the manifest but before _source.json was written
+    if not source or not manifest or sum(w["rows"] for w in manifest.values()) != source["rows"]:
+        return None
+    start, end = source["end"], _array_end(data)
+    if end is None or end < start or hashlib.sha256(data[:start]).hexdigest() != source["sha256"]:
+        return None
+    try:
+        records = json.loads(b"[" + data[start:end].lstrip(b", \t\r\n") + b"]")
+    except ValueError:
+        return None
+    if not records:
+        return []
+
+    df, published_utc, fingerprints = _prepared(records, source["rows"])
+    # ... or one interrupted while writing partitions
+    if any(pq.ParquetFile(_week_dir(directory, k) / PART_NAME).metadata.num_rows != manifest[k]["rows"]
+           for k in fingerprints if k in manifest):
+        return None
+
+    week_keys = df["week"].map(partials.week_key)
+    for key, part in df.groupby(week_keys.to_numpy()):
+        week_dir = _week_dir(directory, key)
+        week_dir.mkdir(exist_ok=True)
+        table = _to_table(part, published_utc.loc[part.index])
+        if key in manifest:
+            table = pa.concat_tables([pq.read_table(week_dir / PART_NAME).cast(SCHEMA), table])
+            fingerprints[key] = partials.add_fingerprints(manifest[key]["fingerprint"], fingerprints[key])
+        pq.write_table(table, week_dir / PART_NAME)
+        manifest[key] = {"fingerprint": fingerprints[key], "rows": table.num_rows, "path": week_dir.name}
+
+    _save_manifest(directory, manifest)
+    _save_source(directory, _source_state(data), source["rows"] + len(records))
+    return sorted(fingerprints)
+
+
+def export_json(input_path: Path, directory: Path, full: bool = False) -> List[str]:
+    """Write changed weeks of the annotated JSON to the store; returns the rewritten week keys."""
+    from scripts import metrics_partials as partials
+
+    data = input_path.read_bytes()
+    if not full:
+        appended = _export_appended(data, directory)
+        if appended is not None:
+            return appended
+
+    state = _source_state(data)
+    records = json.loads(data)
+    del data
+    df, published_utc, fingerprints = _prepared(records)
+    manifest = {} if full else load_manifest(directory)
+    changed = sorted(k for k, fp in fingerprints.items() if manifest.get(k, {}).get("fingerprint") != fp)
+    removed = sorted(set(load_manifest(directory)) - set(fingerprints))
+
+    directory.mkdir(parents=True, exist_ok=True)
+    week_keys = df["week"].map(partials.week_key)
+    todo = set(changed)
+    for key, part in df.groupby(week_keys.to_numpy()):
+        if key not in todo:
+            continue
+        week_dir = _week_dir(directory, key)
+        week_dir.mkdir(exist_ok=True)
+        pq.write_table(_to_table(part, published_utc.loc[part.index]), week_dir / PART_NAME)
+        manifest[key] = {"fingerprint": fingerprints[key], "rows": len(part), "path": week_dir.name}
+    for key in removed:
+        manifest.pop(key, None)
+        shutil.rmtree(_week_dir(directory, key), ignore_errors=True)
+
+    _save_manifest(directory, manifest)
+    _save_source(directory, state, len(records))
+    return changed
+
+
+def read_weeks(directory: Path, keys: Iterable[str], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read the given week partitions (only `columns`) into a DataFrame indexed by
+    source_row. Dictionary columns come back as categoricals, key_topics as lists.
+    """
+    manifest = load_manifest(directory)
+    read_columns = None if columns is None else list(dict.fromkeys(["source_row", *columns]))
+    tables = [pq.read_table(directory / manifest[k]["path"] / PART_NAME, columns=read_columns) for k in keys]
+    if not tables:
+        names = read_columns or SCHEMA.names
+        return pd.DataFrame(columns=[c for c in names if c != "source_row"])
+
+    return _to_frame(pa.concat_tables(tables))
+
+
+def iter_batches(
+    directory: Path, keys: Iterable[str], columns: Optional[List[str]] = None, batch_rows: int = 100_000
+) -> Iterator[pd.DataFrame]:
+    """Like read_weeks, but yields frames of at most batch_rows (bounded memory)."""
+    manifest = load_manifest(directory)
+    read_columns = None if columns is None else list(dict.fromkeys(["source_row", *columns]))
+    for key in keys:
+        parquet_file = pq.ParquetFile(directory / manifest[key]["path"] / PART_NAME)
+        for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=read_columns):
+            yield _to_frame(pa.Table.from_batches([batch]))
+
+
+def _to_frame(table: pa.Table) -> pd.DataFrame:
+    topics = table.column("key_topics").to_pylist() if "key_topics" in table.column_names else None
+    df = table.drop_columns(["key_topics"] if topics is not None else []).to_pandas()
+    if topics is not None:
+        df["key_topics"] = topics
+    return df.set_index("source_row").rename_axis(None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", choices=["export", "info"], default="export")
+    parser.add_argument("--full", action="store_true", help="rewrite every week partition")
+    args = parser.parse_args()
+
+    directory = channel_dir(CHANNEL_SLUG)
+    if args.command == "export":
+        input_path = DATA_DIR / f"annotated_comments_{CHANNEL_SLUG}.json"
+        changed = export_json(input_path, directory, full=args.full)
+        print(f"[store] rewrote {len(changed)} week partitions → {directory}")
+    else:
+        manifest = load_manifest(directory)
+        print(f"{directory}: {len(manifest)} weeks, {sum(w['rows'] for w in manifest.values())} comments")
+        for key, week in manifest.items():
+            print(f"  {key}: {week['rows']} comments")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Offline annotation via the Message Batches API (backfills at batch pricing).
+
+    python batch_annotate.py submit            # pack remaining comments into batch jobs
+    python batch_annotate.py poll [--wait]     # show (or wait for) job status
+    python batch_annotate.py collect           # merge finished results into annotated_comments_<slug>.json
+
+Job IDs and the comment ids of every request are persisted in
+data/batch_jobs_<slug>.json, so any step can be re-run/resumed. Set
+ANTHROPIC_BASE_URL in config.py to run against a local stub server
+(see dev/stub_batch_server.py).
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import annotate_comments as ac
+import model_router
+from annotation_cache import AnnotationCache, group_by_text, text_key
+
+JOBS_PATH = ac.DATA_DIR / f"batch_jobs_{ac.CHANNEL_SLUG}.json"
+
+DEFAULT_JOB_MAX_REQUESTS = 10000  # API limit is 100k requests / 256 MB per batch
+DEFAULT_POLL_SECONDS = 60
+
+JOB_MAX_REQUESTS = int(ac._get_cfg("BATCH_JOB_MAX_REQUESTS", DEFAULT_JOB_MAX_REQUESTS))
+POLL_SECONDS = float(ac._get_cfg("BATCH_POLL_SECONDS", DEFAULT_POLL_SECONDS))
+
+
+def _load_jobs() -> List[Dict[str, Any]]:
+    return ac._load_json(JOBS_PATH, default=[])
+
+
+def _save_jobs(jobs: List[Dict[str, Any]]) -> None:
+    with JOBS_PATH.open("w", encoding="utf-8") as f:
+        json.dump(jobs, f, ensure_ascii=False, indent=2)
+
+
+def _pending_ids(jobs: List[Dict[str, Any]]) -> set:
+    ids = set()
+    for job in jobs:
+        if job.get("collected"):
+            continue
+        for req in job["requests"].values():
+            for members in req["comment_ids"].values():
+                ids.update(members)
+    return ids
+
+
+def _request_params(batch: List[Dict[str, Any]], model: str, mode: str) -> Dict[str, Any]:
+    if mode == "tool":
+        return ac.tool_request_kwargs(batch, model=model)
+    return ac.text_request_kwargs(batch, model=model)
+
+
+def _message_annotations(message, mode: str) -> List[Dict[str, Any]]:
+    """
+    Parse a finished message in the mode its job was submitted with; salvage what we can
+    (missing ids are resubmitted next time).
+    """
+    if mode == "tool":
+        return ac._tool_annotations(message) or []
+    text = "".join(getattr(b, "text", "") for b in message.content)
+    try:
+        return ac._safe_parse_claude_json(text)
+    except Exception:
+        return ac._salvage_claude_json(text)
+
+
+def submit() -> None:
+    comments = ac._load_json(ac.INPUT_PATH, default=[])
+    annotated = ac._load_json(ac.OUTPUT_PATH, default=[])
+    jobs = _load_jobs()
+    skip = ac._collect_annotated_ids(annotated) | _pending_ids(jobs)
+
+    remaining = [c for c in comments if c.get("comment_id") and c["comment_id"] not in skip]
+    print(f"Remaining to annotate: {len(remaining)} (pending in open jobs: {len(_pending_ids(jobs))})")
+    if not remaining:
+        return
+
+    groups = group_by_text(remaining)
+    if ac.CACHE_ENABLED:
+        cache = AnnotationCache(ac.CACHE_PATH, ac.PROMPT_VERSION)
+        hits = cache.get_many(groups.keys())
+        cache.close()
+        for key, norm in hits.items():
+            annotated.extend({**original, **norm} for original in groups.pop(key))
+        if hits:
+            print(f"[cache] hits={len(hits)} texts")
+            ac._write_output(annotated)
+
+    # One request per BATCH_SIZE representatives, per model route
+    by_model: Dict[str, List[str]] = {}
+    routes: Dict[str, str] = {}
+    for key, members in groups.items():
+        model = ac.CLAUDE_MODEL
+        if ac.ROUTING_ENABLED:
+            route, routes[key] = model_router.route_comment(members[0].get("text", ""), ac.ROUTER_MAX_FAST_CHARS)
+            model = ac.CLAUDE_MODEL_FAST if route == model_router.ROUTE_FAST else ac.CLAUDE_MODEL_STRONG
+        by_model.setdefault(model, []).append(key)
+
+    requests: List[Dict[str, Any]] = []
+    for model, keys in by_model.items():
+        for i in range(0, len(keys), ac.BATCH_SIZE):
+            chunk = keys[i:i + ac.BATCH_SIZE]
+            requests.append({
+                "model": model,
+                "keys": chunk,
+                "params": _request_params([groups[k][0] for k in chunk], model, ac.ANNOTATION_MODE),
+            })
+
+    client = ac.make_client()
+    for j in range(0, len(requests), JOB_MAX_REQUESTS):
+        job_requests = requests[j:j + JOB_MAX_REQUESTS]
+        prefix = f"j{len(jobs)}"
+        batch = client.messages.batches.create(
+            requests=[{"custom_id": f"{prefix}-{n}", "params": r["params"]} for n, r in enumerate(job_requests)]
+        )
+        jobs.append({
+            "batch_id": batch.id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "processing_status": batch.processing_status,
+            # Results are parsed in this mode, even if ANNOTATION_MODE changes before collect
+            "mode": ac.ANNOTATION_MODE,
+            "collected": False,
+            "requests": {
+                f"{prefix}-{n}": {
+                    "model": r["model"],
+                    # representative comment_id -> all comment_ids sharing its text
+                    "comment_ids": {groups[k][0]["comment_id"]: [c["comment_id"] for c in groups[k]] for k in r["keys"]},
+                    "routes": {groups[k][0]["comment_id"]: routes[k] for k in r["keys"] if k in routes},
+                }
+                for n, r in enumerate(job_requests)
+            },
+        })
+        # Persist after every job so a crash never loses a submitted batch id
+        _save_jobs(jobs)
+        print(f"Submitted {batch.id} with {len(job_requests)} requests")
+
+
+def poll(wait: bool = False) -> bool:
+    """Refresh job status; returns True when every open job has ended."""
+    client = ac.make_client()
+    while True:
+        jobs = _load_jobs()
+        open_jobs = [job for job in jobs if not job.get("collected")]
+        for job in open_jobs:
+            batch = client.messages.batches.retrieve(job["batch_id"])
+            job["processing_status"] = batch.processing_status
+            job["request_counts"] = batch.request_counts.model_dump()
+            print(f"{job['batch_id']}: {batch.processing_status} {job['request_counts']}")
+        _save_jobs(jobs)
+
+        done = all(job["processing_status"] == "ended" for job in open_jobs)
+        if done or not wait:
+            return done
+        time.sleep(POLL_SECONDS)
+
+
+def collect() -> None:
+    comments = {c["comment_id"]: c for c in ac._load_json(ac.INPUT_PATH, default=[]) if c.get("comment_id")}
+    annotated = ac._load_json(ac.OUTPUT_PATH, default=[])
+    annotated_ids = ac._collect_annotated_ids(annotated)
+    jobs = _load_jobs()
+
+    client = ac.make_client()
+    cache: Optional[AnnotationCache] = AnnotationCache(ac.CACHE_PATH, ac.PROMPT_VERSION) if ac.CACHE_ENABLED else None
+
+    for job in jobs:
+        if job.get("collected"):
+            continue
+        if client.messages.batches.retrieve(job["batch_id"]).processing_status != "ended":
+            print(f"{job['batch_id']}: not finished yet, skipping")
+            continue
+
+        mode = job.get("mode", ac.ANNOTATION_MODE)  # jobs submitted before the mode was recorded
+        merged, succeeded, failed = 0, 0, 0
+        fresh: Dict[str, Dict[str, Any]] = {}
+        for entry in client.messages.batches.results(job["batch_id"]):
+            req = job["requests"].get(entry.custom_id)
+            if req is None:
+                continue
+            if entry.result.type != "succeeded":
+                failed += 1
+                continue
+            succeeded += 1
+
+            for ann in _message_annotations(entry.result.message, mode):
+                rep_id = ann.get("id")
+                if rep_id not in req["comment_ids"]:
+                    continue
+                norm = ac._normalize_annotation_fields(ann)
+                route = {"model": req["model"], "route": req["routes"][rep_id]} if rep_id in req["routes"] else {}
+                for cid in req["comment_ids"][rep_id]:
+                    if cid in annotated_ids or cid not in comments:
+                        continue
+                    annotated.append({**comments[cid], **norm, **route})
+                    annotated_ids.add(cid)
+                    merged += 1
+                if rep_id in comments:
+                    fresh[text_key(comments[rep_id].get("text", ""))] = norm
+
+        if cache is not None:
+            cache.put_many(fresh)
+        ac._write_output(annotated)
+
+        missing = [
+            cid for req in job["requests"].values() for members in req["comment_ids"].values()
+            for cid in members if cid in comments and cid not in annotated_ids
+        ]
+        if succeeded and not merged and missing:
+            # Nothing usable came out of successful requests (e.g. unparseable answers):
+            # keep the job open so its results can be collected again instead of being dropped
+            print(f"{job['batch_id']}: {succeeded} requests succeeded but nothing could be merged; job left open")
+            continue
+
+        job["collected"] = True
+        job["collected_at"] = datetime.now().isoformat(timespec="seconds")
+        _save_jobs(jobs)
+        print(f"{job['batch_id']}: merged {merged} comments ({failed} failed requests; resubmit to retry)")
+
+    if cache is not None:
+        cache.close()
+    print(f"Annotated {len(annotated)} comments → {ac.OUTPUT_PATH}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["submit", "poll", "collect"])
+    parser.add_argument("--wait", action="store_true", help="poll until all open jobs have ended")
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        submit()
+    elif args.command == "poll":
+        poll(wait=args.wait)
+    else:
+        collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: input tokens per comment and latency per batch, text mode vs. tool mode.
+
+Run from comment-sentiment/:
+    python -m benchmarks.annotation_modes               # token counts only (no generation)
+    python -m benchmarks.annotation_modes --live        # additionally run real batches
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from anthropic import Anthropic
+
+import annotate_comments as ac
+
+MODES: Dict[str, Callable[[List[Dict[str, Any]]], Dict[str, Any]]] = {
+    "text": ac.text_request_kwargs,
+    "tool": ac.tool_request_kwargs,
+}
+
+RESULTS_DIR = ac.DATA_DIR / "benchmarks"
+RESULTS_PATH = RESULTS_DIR / f"annotation_modes_{ac.CHANNEL_SLUG}.json"
+
+
+def _count_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    # count_tokens takes the prompt-shaping fields only
+    return {k: v for k, v in kwargs.items() if k in ("model", "system", "messages", "tools", "tool_choice")}
+
+
+def count_tokens(client: Anthropic, batches: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    n_comments = sum(len(b) for b in batches)
+    for mode, build in MODES.items():
+        total = 0
+        for batch in batches:
+            total += client.messages.count_tokens(**_count_kwargs(build(batch))).input_tokens
+        results[mode] = {
+            "input_tokens": total,
+            "input_tokens_per_comment": round(total / n_comments, 1),
+        }
+    return results
+
+
+def _parse_ok(mode: str, message) -> bool:
+    if mode == "tool":
+        return ac._tool_annotations(message) is not None
+    try:
+        ac._safe_parse_claude_json(message.content[0].text)
+        return True
+    except Exception:
+        return False
+
+
+def run_live(client: Anthropic, batches: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    n_comments = sum(len(b) for b in batches)
+    for mode, build in MODES.items():
+        latencies: List[float] = []
+        usage = {"input_tokens": 0, "output_tokens": 0, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+        parse_ok = 0
+        for batch in batches:
+            start = time.perf_counter()
+            message = client.messages.create(**build(batch))
+            latencies.append(time.perf_counter() - start)
+            for key in usage:
+                usage[key] += int(getattr(message.usage, key, 0) or 0)
+            parse_ok += int(_parse_ok(mode, message))
+            time.sleep(ac.SLEEP_SECONDS)
+
+        results[mode] = {
+            **usage,
+            "tokens_per_comment": round((usage["input_tokens"] + usage["output_tokens"]) / n_comments, 1),
+            "latency_per_batch_s": {
+                "mean": round(statistics.mean(latencies), 3),
+                "median": round(statistics.median(latencies), 3),
+                "max": round(max(latencies), 3),
+            },
+            "valid_batches": parse_ok,
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=5, help="number of batches to sample")
+    parser.add_argument("--batch-size", type=int, default=ac.BATCH_SIZE)
+    parser.add_argument("--live", action="store_true", help="run real requests to measure latency and output tokens")
+    args = parser.parse_args()
+
+    comments = [c for c in ac._load_json(ac.INPUT_PATH, default=[]) if c.get("comment_id")]
+    comments = comments[: args.batches * args.batch_size]
+    if not comments:
+        raise SystemExit(f"No raw comments found in {ac.INPUT_PATH}.")
+    batches = [comments[i:i + args.batch_size] for i in range(0, len(comments), args.batch_size)]
+
+    client = ac.make_client()
+    results: Dict[str, Any] = {
+        "model": ac.CLAUDE_MODEL,
+        "batch_size": args.batch_size,
+        "batches": len(batches),
+        "comments": len(comments),
+        "prompt_tokens": count_tokens(client, batches),
+    }
+    if args.live:
+        results["live"] = run_live(client, batches)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    with RESULTS_PATH.open("w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    for mode in MODES:
+        line = f"{mode:>4}: {results['prompt_tokens'][mode]['input_tokens_per_comment']} input tokens/comment"
+        if args.live:
+            live = results["live"][mode]
+            line += (
+                f", {live['tokens_per_comment']} total tokens/comment, "
+                f"{live['latency_per_batch_s']['mean']}s/batch, valid {live['valid_batches']}/{len(batches)}"
+            )
+        print(line)
+    print(f"Results written to {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
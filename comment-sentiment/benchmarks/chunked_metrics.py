@@ -0,0 +1,79 @@
+"""
+Benchmark: in-memory vs. chunked (streaming) compute_metrics.
+
+Run from comment-sentiment/:
+    python -m benchmarks.chunked_metrics                         # 100k, 1M rows
+    python -m benchmarks.chunked_metrics --sizes 10000 --chunk-rows 2000
+
+Each mode runs in its own subprocess (peak RSS via VmHWM); both outputs must be identical.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from benchmarks import synthetic
+from benchmarks.load_store import _peak_rss_kb
+from scripts import compute_metrics as cm
+
+
+def _measure(mode: str, path: Path, out_path: Path, chunk_rows: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    if mode == "memory":
+        df = cm.prepare_dataframe(cm.load_data(path))
+        cube = cm.build_weekly_cube(cm.restrict_to_latest_weeks(df, cm.LATEST_WEEKS))
+    else:
+        chunks = cm.iter_chunks(cm.iter_json_records(path), chunk_rows)
+        cube = cm.restrict_cube_to_latest_weeks(cm.chunked_cube(chunks), cm.LATEST_WEEKS)
+    output = cm.build_output(cube)
+    seconds = time.perf_counter() - start
+
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    return {"seconds": seconds, "peak_rss_mb": _peak_rss_kb() / 1024}
+
+
+def _run_measure(mode: str, path: Path, out_path: Path, chunk_rows: int) -> Dict[str, float]:
+    r = subprocess.run(
+        [sys.executable, "-m", "benchmarks.chunked_metrics", "--measure", mode,
+         "--path", str(path), "--out", str(out_path), "--chunk-rows", str(chunk_rows)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--measure", choices=["memory", "chunked"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--out", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(args.measure, args.path, args.out, args.chunk_rows)))
+        return
+
+    print(f"{'rows':>10}  {'mode':>8}  {'seconds':>8}  {'peak_rss_mb':>11}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "annotated.json"
+            synthetic.write_records(path, synthetic.comments(comments_per_week=max(1, n // 26)))
+
+            outputs = {}
+            for mode in ("memory", "chunked"):
+                outputs[mode] = Path(tmp) / f"metrics_{mode}.json"
+                m = _run_measure(mode, path, outputs[mode], args.chunk_rows)
+                print(f"{n:>10}  {mode:>8}  {m['seconds']:>8.2f}  {m['peak_rss_mb']:>11.0f}")
+
+            if outputs["memory"].read_bytes() != outputs["chunked"].read_bytes():
+                raise SystemExit(f"chunked output differs from in-memory output at {n} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: compute_issues from the weekly cube vs. the previous iterrows implementation.
+
+Run from comment-sentiment/:
+    python -m benchmarks.compute_issues                       # 10k, 100k, 1M rows
+    python -m benchmarks.compute_issues --sizes 10000 --skip-legacy-above 0
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.compute_metrics import INTENT_GROUPS, build_weekly_cube, compute_issues
+
+INTENTS = ["praise", "question", "constructive_criticism", "aggressive_criticism", "discussion", "other"]
+SENTIMENTS = ["positive", "neutral", "negative"]
+
+
+def synthetic_frame(n: int, n_weeks: int = 26, n_topics: int = 200, seed: int = 0) -> pd.DataFrame:
+    """A frame shaped like prepare_dataframe() output."""
+    rng = np.random.default_rng(seed)
+    weeks = pd.period_range("2025-01-06", periods=n_weeks, freq="W")
+    topic_names = np.array([f"topic_{i}" for i in range(n_topics)], dtype=object)
+
+    n_topics_per_row = rng.choice([0, 1, 2, 3], size=n, p=[0.2, 0.3, 0.3, 0.2])
+    picks = rng.zipf(1.5, size=(n, 3)) % n_topics
+    key_topics = [list(topic_names[picks[i, :k]]) for i, k in enumerate(n_topics_per_row)]
+
+    week_period = pd.Series(weeks[rng.integers(0, n_weeks, size=n)])
+    return pd.DataFrame({
+        "week_period": week_period,
+        "week": week_period.astype(str),
+        "sentiment": rng.choice(SENTIMENTS, size=n),
+        "intent": rng.choice(INTENTS, size=n),
+        "emotion_intensity": rng.choice([0.0, 0.3, 0.6, 0.9], size=n),
+        "key_topics": key_topics,
+        "text": [f"comment {i}" for i in range(n)],
+    })
+
+
+def compute_issues_iterrows(df: pd.DataFrame) -> pd.DataFrame:
+    """Previous row-by-row implementation (reference for output + timing)."""
+    records = []
+    for _, row in df.iterrows():
+        topics = row.get("key_topics", [])
+        if not isinstance(topics, list) or not topics:
+            continue
+        records.append({
+            "week_period": row["week_period"],
+            "week": row["week"],
+            "topic": topics[0],
+            "sentiment": row["sentiment"],
+            "intent_group": INTENT_GROUPS.get(row["intent"], "other"),
+            "emotion_intensity": row.get("emotion_intensity", 0.0),
+            "comment_text": row.get("text", ""),
+        })
+    issues_df = pd.DataFrame(records)
+    aggregated = (
+        issues_df
+        .groupby(["week_period", "week", "topic", "sentiment", "intent_group"])
+        .agg(comment_count=("comment_text", "count"), avg_emotion=("emotion_intensity", "mean"))
+        .reset_index()
+    )
+    aggregated["avg_emotion"] = aggregated["avg_emotion"].round(2)
+    return aggregated.sort_values(["week_period", "comment_count"], ascending=[True, False]).reset_index(drop=True)
+
+
+def compute_issues_cube(df: pd.DataFrame) -> pd.DataFrame:
+    return compute_issues(build_weekly_cube(df))
+
+
+def _timed(fn, df: pd.DataFrame):
+    start = time.perf_counter()
+    out = fn(df)
+    return out, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-legacy-above", type=int, default=1_000_000,
+                        help="don't run the iterrows version above this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'iterrows_s':>10}  {'vectorized_s':>12}  {'speedup':>8}")
+    for n in args.sizes:
+        df = synthetic_frame(n)
+        new, t_new = _timed(compute_issues_cube, df)
+
+        if n > args.skip_legacy_above:
+            print(f"{n:>10}  {'-':>10}  {t_new:>12.3f}  {'-':>8}")
+            continue
+
+        old, t_old = _timed(compute_issues_iterrows, df)
+        # Cube averages use exact sums; float summation order may flip an exact x.xx5 by one cent
+        pd.testing.assert_frame_equal(old.drop(columns="avg_emotion"), new.drop(columns="avg_emotion"))
+        assert (old["avg_emotion"] - new["avg_emotion"]).abs().max() <= 0.01 + 1e-9
+        print(f"{n:>10}  {t_old:>10.3f}  {t_new:>12.3f}  {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
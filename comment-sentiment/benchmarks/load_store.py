@@ -0,0 +1,91 @@
+"""
+Benchmark: loading annotations for compute_metrics, JSON vs. the Parquet store.
+
+Run from comment-sentiment/:
+    python -m benchmarks.load_store                       # 100k, 1M rows
+    python -m benchmarks.load_store --sizes 10000 --weeks 4
+
+Each load runs in its own subprocess so peak RSS (VmHWM) is per path.
+Measured: load + prepare_dataframe, i.e. everything before the weekly cube.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+import annotation_store
+from benchmarks import synthetic
+from scripts import compute_metrics as cm
+
+def _peak_rss_kb() -> int:
+    """Peak RSS of this process; VmHWM starts fresh at exec, ru_maxrss may carry the parent's."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+
+
+def _measure(source: str, path: Path) -> Dict[str, float]:
+    base_rss = _peak_rss_kb()
+    start = time.perf_counter()
+    if source == "json":
+        df = cm.prepare_dataframe(cm.load_data(path))
+    else:
+        keys = list(annotation_store.load_manifest(path).keys())
+        df = cm.prepare_dataframe(annotation_store.read_weeks(path, keys, cm.METRIC_COLUMNS))
+    seconds = time.perf_counter() - start
+    peak_rss = _peak_rss_kb()
+    return {"rows": len(df), "seconds": seconds, "peak_rss_mb": peak_rss / 1024, "delta_rss_mb": (peak_rss - base_rss) / 1024}
+
+
+def _run_measure(source: str, path: Path) -> Dict[str, float]:
+    r = subprocess.run(
+        [sys.executable, "-m", "benchmarks.load_store", "--measure", source, "--path", str(path)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--weeks", type=int, default=26)
+    parser.add_argument("--measure", choices=["json", "parquet"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(args.measure, args.path)))
+        return
+
+    print(f"{'rows':>10}  {'source':>8}  {'load_s':>8}  {'peak_rss_mb':>11}  {'delta_rss_mb':>12}  {'disk_mb':>8}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = Path(tmp) / "annotated.json"
+            synthetic.write_records(json_path, synthetic.comments(weeks=args.weeks, comments_per_week=max(1, n // args.weeks)))
+            store_dir = annotation_store.channel_dir("bench", root=Path(tmp) / "store")
+            annotation_store.export_json(json_path, store_dir)
+
+            sizes = {
+                "json": json_path.stat().st_size,
+                "parquet": sum(p.stat().st_size for p in store_dir.rglob("*.parquet")),
+            }
+            for source, path in (("json", json_path), ("parquet", store_dir)):
+                m = _run_measure(source, path)
+                print(
+                    f"{n:>10}  {source:>8}  {m['seconds']:>8.2f}  {m['peak_rss_mb']:>11.0f}  "
+                    f"{m['delta_rss_mb']:>12.0f}  {sizes[source] / 2**20:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
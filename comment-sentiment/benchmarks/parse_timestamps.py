@@ -0,0 +1,66 @@
+"""
+Microbenchmark: published_at parsing + week assignment in prepare_dataframe.
+
+Run from comment-sentiment/:
+    python -m benchmarks.parse_timestamps                  # 10k, 100k, 1M rows
+    python -m benchmarks.parse_timestamps --odd-share 0.01 # 1% rows that need the isoparse fallback
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from dateutil.parser import isoparse
+
+from scripts.compute_metrics import _period_labels, parse_published_at
+
+
+def synthetic_timestamps(n: int, odd_share: float = 0.0, seed: int = 0) -> pd.Series:
+    """YouTube-style UTC timestamps (some with fractional seconds); odd_share in ISO basic format."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-01-01", tz="UTC").value // 10**9
+    seconds = rng.integers(start, start + 180 * 86400, size=n)
+    stamps = pd.to_datetime(seconds, unit="s", utc=True)
+
+    values = stamps.strftime("%Y-%m-%dT%H:%M:%SZ").to_numpy(dtype=object)
+    fractional = rng.random(n) < 0.3
+    values[fractional] = stamps[fractional].strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    odd = rng.random(n) < odd_share
+    values[odd] = stamps[odd].strftime("%Y%m%dT%H%M%SZ")  # isoparse handles it, the vectorized path may not
+    return pd.Series(values)
+
+
+def weeks_isoparse_apply(values: pd.Series) -> pd.Series:
+    """Previous row-by-row implementation."""
+    parsed = pd.to_datetime(values.apply(isoparse), errors="coerce")
+    local = parsed.dt.tz_convert("Europe/Berlin").dt.tz_localize(None)
+    return local.dt.to_period("W").astype(str)
+
+
+def weeks_vectorized(values: pd.Series) -> pd.Series:
+    return _period_labels(parse_published_at(values).dt.to_period("W"))
+
+
+def _timed(fn, values: pd.Series):
+    start = time.perf_counter()
+    out = fn(values)
+    return out, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--odd-share", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'isoparse_s':>10}  {'vectorized_s':>12}  {'speedup':>8}")
+    for n in args.sizes:
+        values = synthetic_timestamps(n, odd_share=args.odd_share)
+        old, t_old = _timed(weeks_isoparse_apply, values)
+        new, t_new = _timed(weeks_vectorized, values)
+        pd.testing.assert_series_equal(old, new, check_names=False)
+        print(f"{n:>10}  {t_old:>10.3f}  {t_new:>12.3f}  {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark: the offline pipeline stages on synthetic annotated comments.
+
+Run from comment-sentiment/:
+    python -m benchmarks.pipeline                                  # 10k, 100k, 1M, 10M rows
+    python -m benchmarks.pipeline --sizes 10000 100000 --stages compute_metrics generate_report
+
+Stages: compute_metrics -> plot_trends, plot_intent_shift, generate_report (all on
+the metrics of the same run). Each stage runs in its own subprocess (peak RSS via
+VmHWM), on files in a temp directory; the real data/ and output/ are not touched.
+Above --chunk-above rows compute_metrics runs in chunked (bounded-memory) mode.
+
+Every run appends one line to data/benchmarks/pipeline.jsonl (git commit, parameters,
+seconds + peak RSS per size and stage) so runs can be compared over time.
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks import synthetic
+from benchmarks.load_store import _peak_rss_kb
+
+STAGES = ["compute_metrics", "plot_trends", "plot_intent_shift", "generate_report"]
+MODULES = {
+    "compute_metrics": "scripts.compute_metrics",
+    "plot_trends": "scripts.plot_trends",
+    "plot_intent_shift": "scripts.plot_intent_shift",
+    "generate_report": "generate_report",
+}
+RESULTS_PATH = Path(__file__).resolve().parent.parent / "data" / "benchmarks" / "pipeline.jsonl"
+
+
+def _measure(stage: str, workdir: Path, chunk_rows: int) -> Dict[str, Any]:
+    """Run one stage in this process with its paths redirected into workdir."""
+    module = importlib.import_module(MODULES[stage])
+    metrics_path = workdir / "aggregated_metrics.json"
+    argv = [stage]
+    if stage == "compute_metrics":
+        module.OUTPUT_PATH = metrics_path
+        module.COMMENT_CUBE_PATH = workdir / "comment_cube.npz"
+        module.TOPIC_INDEX_PATH = workdir / "topic_index.npz"
+        module.TOPIC_IDS_PATH = workdir / "topic_ids.sqlite"
+        argv += ["--input", str(workdir / "annotated.json"), "--chunk-rows", str(chunk_rows)]
+    else:
+        module.INPUT_PATH = metrics_path
+        module.OUTPUT_PATH = workdir / f"{stage}{Path(module.OUTPUT_PATH).suffix}"
+
+    sys.argv = argv
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        module.main()
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "cpu_seconds": round(time.process_time() - cpu_start, 3),
+        "peak_rss_mb": round(_peak_rss_kb() / 1024, 1),
+    }
+
+
+def _run_measure(stage: str, workdir: Path, chunk_rows: int) -> Dict[str, Any]:
+    r = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline", "--measure", stage,
+         "--workdir", str(workdir), "--chunk-rows", str(chunk_rows)],
+        capture_output=True, text=True,
+    )
+    if r.returncode != 0:
+        return {"error": (r.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+
+def _git_commit() -> str:
+    try:
+        r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return r.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--weeks", type=int, default=26)
+    parser.add_argument("--videos", type=int, default=50)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--topic-skew", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-above", type=int, default=1_000_000,
+                        help="run compute_metrics chunked above this many rows")
+    parser.add_argument("--chunk-rows", type=int, default=250_000)
+    parser.add_argument("--results", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--measure", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(args.measure, args.workdir, args.chunk_rows)))
+        return
+
+    results: List[Dict[str, Any]] = []
+    print(f"{'rows':>10}  {'stage':>17}  {'seconds':>8}  {'cpu_s':>8}  {'peak_rss_mb':>11}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            start = time.perf_counter()
+            rows = synthetic.write_records(workdir / "annotated.json", synthetic.comments(
+                args.weeks, args.videos, max(1, n // args.weeks), args.topics, args.topic_skew, args.seed,
+            ))
+            print(f"{rows:>10}  {'(generate)':>17}  {time.perf_counter() - start:>8.2f}")
+
+            chunk_rows = args.chunk_rows if n > args.chunk_above else 0
+            for stage in args.stages:
+                m = _run_measure(stage, workdir, chunk_rows)
+                mode = "chunked" if stage == "compute_metrics" and chunk_rows else "memory"
+                results.append({"rows": rows, "stage": stage, "mode": mode, **m})
+                if "error" in m:
+                    print(f"{rows:>10}  {stage:>17}  FAILED: {m['error']}")
+                    continue
+                print(f"{rows:>10}  {stage:>17}  {m['seconds']:>8.2f}  {m['cpu_seconds']:>8.2f}  {m['peak_rss_mb']:>11.0f}")
+
+    args.results.parent.mkdir(parents=True, exist_ok=True)
+    with args.results.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "run_at": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "params": {
+                "weeks": args.weeks, "videos": args.videos, "topics": args.topics,
+                "topic_skew": args.topic_skew, "seed": args.seed, "chunk_rows": args.chunk_rows,
+                "chunk_above": args.chunk_above,
+            },
+            "results": results,
+        }, ensure_ascii=False) + "\n")
+    print(f"Results appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Deterministic synthetic comments, raw (fetch_comments) or annotated (annotate_comments).
+
+Run from comment-sentiment/:
+    python -m benchmarks.synthetic --out data/synthetic_annotated.json --weeks 26 --comments-per-week 4000
+    python -m benchmarks.synthetic --raw --out data/synthetic_raw.jsonl --topic-skew 0
+
+Same parameters + seed -> same records, independent of how many are consumed.
+Records are generated in blocks and can be streamed to disk, so 10M rows fit in memory.
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+INTENTS = ["praise", "question", "constructive_criticism", "aggressive_criticism", "discussion", "other"]
+INTENT_P = [0.25, 0.15, 0.2, 0.1, 0.2, 0.1]
+SENTIMENTS = ["positive", "neutral", "negative"]
+SENTIMENT_P = [0.4, 0.3, 0.3]
+EMOTIONS = [0.0, 0.1, 0.3, 0.5, 0.7, 0.9]
+TOPICS_PER_COMMENT_P = [0.2, 0.3, 0.3, 0.2]  # 0..3 key topics
+FIRST_WEEK = "2025-01-06"  # a Monday
+
+BLOCK_ROWS = 100_000  # fixed, part of the determinism contract
+
+
+def _topic_picks(rng: np.random.Generator, n: int, topics: int, topic_skew: float) -> np.ndarray:
+    """topic_skew > 1: Zipf-distributed topic popularity; otherwise uniform."""
+    if topic_skew > 1:
+        return (rng.zipf(topic_skew, size=(n, 3)) - 1) % topics
+    return rng.integers(0, topics, size=(n, 3))
+
+
+def comments(
+    weeks: int = 26,
+    videos: int = 50,
+    comments_per_week: int = 1000,
+    topics: int = 200,
+    topic_skew: float = 1.5,
+    seed: int = 0,
+    annotated: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """Yield weeks * comments_per_week comments, week by week (timestamps in UTC)."""
+    total = weeks * comments_per_week
+    week_start = pd.Timestamp(FIRST_WEEK, tz="UTC").value // 10**9
+    topic_names = np.array([f"topic_{i}" for i in range(topics)], dtype=object)
+
+    for block, start in enumerate(range(0, total, BLOCK_ROWS)):
+        stop = min(start + BLOCK_ROWS, total)
+        n = stop - start
+        rng = np.random.default_rng([seed, block])
+
+        rows = np.arange(start, stop)
+        seconds = week_start + (rows // comments_per_week) * 7 * 86400 + rng.integers(0, 7 * 86400, size=n)
+        published = pd.to_datetime(seconds, unit="s", utc=True).strftime("%Y-%m-%dT%H:%M:%SZ").tolist()
+        video_ids = rng.integers(0, videos, size=n).tolist()
+        likes = rng.geometric(0.3, size=n).tolist()
+        base = [
+            {
+                "video_id": f"video_{v}",
+                "video_title": f"Video {v}",
+                "comment_id": f"c{row}",
+                "text": f"synthetic comment {row}",
+                "author": f"user_{row % 5000}",
+                "published_at": p,
+                "like_count": like - 1,
+            }
+            for row, v, p, like in zip(rows.tolist(), video_ids, published, likes)
+        ]
+        if not annotated:
+            yield from base
+            continue
+
+        sentiments = rng.choice(SENTIMENTS, size=n, p=SENTIMENT_P).tolist()
+        intents = rng.choice(INTENTS, size=n, p=INTENT_P).tolist()
+        emotions = rng.choice(EMOTIONS, size=n).tolist()
+        n_topics = rng.choice(len(TOPICS_PER_COMMENT_P), size=n, p=TOPICS_PER_COMMENT_P)
+        picks = topic_names[_topic_picks(rng, n, topics, topic_skew)]
+        for record, s, i, e, k, p in zip(base, sentiments, intents, emotions, n_topics.tolist(), picks):
+            record.update({
+                "sentiment": s,
+                "intent": i,
+                "emotion_intensity": e,
+                "key_topics": p[:k].tolist(),
+            })
+            yield record
+
+
+def write_records(path: Path, records: Iterable[Dict[str, Any]]) -> int:
+    """Stream records to a JSON array (.json) or JSON Lines (.jsonl) file; returns the row count."""
+    n = 0
+    with path.open("w", encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                n += 1
+            return n
+        f.write("[")
+        for record in records:
+            f.write(("," if n else "") + json.dumps(record, ensure_ascii=False))
+            n += 1
+        f.write("]")
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, required=True, help=".json (array) or .jsonl")
+    parser.add_argument("--raw", action="store_true", help="raw comments without annotation fields")
+    parser.add_argument("--weeks", type=int, default=26)
+    parser.add_argument("--videos", type=int, default=50)
+    parser.add_argument("--comments-per-week", type=int, default=1000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--topic-skew", type=float, default=1.5, help="Zipf exponent (<= 1: uniform topics)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n = write_records(args.out, comments(
+        args.weeks, args.videos, args.comments_per_week, args.topics, args.topic_skew, args.seed,
+        annotated=not args.raw,
+    ))
+    print(f"{n} {'raw' if args.raw else 'annotated'} comments written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
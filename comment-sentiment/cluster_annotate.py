@@ -0,0 +1,133 @@
+"""
+Cluster-representative annotation for large comment volumes.
+
+Comments are vectorized locally (hashed char n-grams + TF-IDF), reduced to
+SVD_COMPONENTS (128) dense dimensions (TruncatedSVD) and grouped with
+MiniBatchKMeans. Only a few representatives per cluster (closest to the centroid)
+go to Claude; their labels are propagated to cluster members that are similar
+enough to an annotated representative. Everything else is annotated normally.
+"""
+import math
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+HASH_FEATURES = 2 ** 14  # hashed n-gram columns of the sparse TF-IDF rows
+SVD_COMPONENTS = 128  # dense dimensions k-means runs on (centroids: clusters x SVD_COMPONENTS)
+
+
+def _require_sklearn():
+    try:
+        import sklearn  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Cluster annotation needs scikit-learn (pip install scikit-learn).") from e
+
+
+def vectorize(texts: List[str]):
+    """L2-normalized sparse TF-IDF rows; hashing keeps the vocabulary out of memory."""
+    _require_sklearn()
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.pipeline import make_pipeline
+
+    pipeline = make_pipeline(
+        HashingVectorizer(analyzer="char_wb", ngram_range=(3, 5), n_features=HASH_FEATURES, alternate_sign=False, norm=None),
+        TfidfTransformer(sublinear_tf=True),
+    )
+    return pipeline.fit_transform([t.lower() for t in texts])
+
+
+def reduce(X, n_components: int = SVD_COMPONENTS, seed: int = 0) -> np.ndarray:
+    """Dense, L2-normalized LSA rows (n x n_components) for clustering."""
+    _require_sklearn()
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.preprocessing import normalize
+
+    n_components = min(n_components, X.shape[0] - 1, X.shape[1] - 1)
+    if n_components < 1:
+        return normalize(X.toarray()).astype(np.float32)
+    Z = TruncatedSVD(n_components=n_components, random_state=seed).fit_transform(X)
+    return normalize(Z).astype(np.float32)
+
+
+def cluster(X, avg_cluster_size: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (labels, distance of every row to its own centroid), clustered in reduce(X) space."""
+    _require_sklearn()
+    from sklearn.cluster import MiniBatchKMeans
+
+    Z = reduce(X, seed=seed)
+    n_clusters = max(1, min(Z.shape[0], math.ceil(Z.shape[0] / max(1, avg_cluster_size))))
+    km = MiniBatchKMeans(n_clusters=n_clusters, random_state=seed, batch_size=2048, n_init=1)
+    labels = km.fit_predict(Z)
+    # Own centroid only (km.transform would be n x n_clusters)
+    dist = np.linalg.norm(Z - km.cluster_centers_[labels], axis=1)
+    return labels, dist
+
+
+def pick_representatives(labels: np.ndarray, dist: np.ndarray, per_cluster: int) -> Dict[int, List[int]]:
+    """cluster_id -> row indices of the `per_cluster` members closest to the centroid."""
+    reps: Dict[int, List[int]] = {}
+    order = np.lexsort((dist, labels))  # by cluster, then by distance
+    for idx in order:
+        members = reps.setdefault(int(labels[idx]), [])
+        if len(members) < per_cluster:
+            members.append(int(idx))
+    return reps
+
+
+def propagate(
+    X,
+    labels: np.ndarray,
+    reps: Dict[int, List[int]],
+    rep_annotations: Dict[int, Dict[str, Any]],
+    threshold: float,
+) -> Tuple[Dict[int, Tuple[int, float]], List[Dict[str, Any]]]:
+    """
+    Assign every non-representative row to its most similar *annotated* representative
+    in the same cluster if cosine similarity >= threshold.
+
+    Returns (row -> (rep_row, similarity), per-cluster stats).
+    """
+    assignments: Dict[int, Tuple[int, float]] = {}
+    stats: List[Dict[str, Any]] = []
+
+    rows_by_cluster: Dict[int, List[int]] = {}
+    for idx, lab in enumerate(labels):
+        rows_by_cluster.setdefault(int(lab), []).append(idx)
+
+    for cid in sorted(rows_by_cluster):
+        rows = rows_by_cluster[cid]
+        rep_rows = reps.get(cid, [])
+        annotated_reps = [r for r in rep_rows if r in rep_annotations]
+        rep_set = set(rep_rows)
+        members = [r for r in rows if r not in rep_set]
+
+        propagated, sims = 0, []
+        if annotated_reps and members:
+            # rows are L2-normalized -> dot product == cosine similarity
+            sim = (X[members] @ X[annotated_reps].T).toarray()
+            best = sim.argmax(axis=1)
+            best_sim = sim[np.arange(len(members)), best]
+            for m, b, s in zip(members, best, best_sim):
+                if s >= threshold:
+                    assignments[m] = (annotated_reps[int(b)], float(s))
+                    propagated += 1
+                    sims.append(float(s))
+
+        sent = Counter(rep_annotations[r]["sentiment"] for r in annotated_reps)
+        intent = Counter(rep_annotations[r]["intent"] for r in annotated_reps)
+        stats.append({
+            "cluster_id": cid,
+            "size": len(rows),
+            "representatives": len(rep_rows),
+            "annotated_representatives": len(annotated_reps),
+            "majority_sentiment": sent.most_common(1)[0][0] if sent else None,
+            "sentiment_agreement": round(sent.most_common(1)[0][1] / len(annotated_reps), 3) if sent else None,
+            "majority_intent": intent.most_common(1)[0][0] if intent else None,
+            "intent_agreement": round(intent.most_common(1)[0][1] / len(annotated_reps), 3) if intent else None,
+            "propagated": propagated,
+            "sent_to_llm": len(members) - propagated,
+            "mean_similarity": round(sum(sims) / len(sims), 3) if sims else None,
+        })
+
+    return assignments, stats
@@ -13,4 +13,36 @@ CLAUDE_API_KEY = "YOUR_API_KEY_HERE"
 CLAUDE_MODEL = "claude-3-haiku-20240307"
 
 BATCH_SIZE = 25
-TEST_LIMIT = None
\ No newline at end of file
+TEST_LIMIT = None
+
+# Annotation (optional)
+ANNOTATION_MODE = "text"  # "tool" = schema-constrained tool output + compact payload
+PROMPT_CACHE_ENABLED = True  # tool mode: cache tools + system prompt (once they reach the model's minimum cacheable length)
+ANNOTATION_CACHE_ENABLED = True  # reuse labels for identical texts across runs/channels (data/annotation_cache.sqlite)
+PRECLASSIFY_ENABLED = False  # label trivial comments (emoji/short praise) locally, only the rest goes to Claude
+PRECLASSIFY_THRESHOLD = 0.85
+# PRECLASSIFY_MODEL_PATH = "data/preclassifier.pkl"  # optional model (python preclassify.py train), needs scikit-learn
+CLUSTER_ANNOTATION_ENABLED = False  # annotate cluster representatives only, propagate to similar members
+CLUSTER_MIN_COMMENTS = 2000
+CLUSTER_SIMILARITY_THRESHOLD = 0.6
+# CLAUDE_MODEL_FAST = "claude-3-haiku-20240307"    # short/simple comments (routing is on when FAST != STRONG)
+# CLAUDE_MODEL_STRONG = "claude-3-5-sonnet-latest" # long or mixed-language comments
+ROUTER_MAX_FAST_CHARS = 280
+# ANTHROPIC_BASE_URL = "http://127.0.0.1:8765"  # e.g. dev/stub_batch_server.py
+
+# Metrics (optional)
+TREND_BASELINE_WEEKS = 1  # trend flags vs. previous week; 4 = vs. rolling mean of the previous 4 weeks
+METRICS_INCREMENTAL = True  # recompute only weeks with new/changed comments (data/metrics_partials_<slug>/); --full rebuilds
+METRICS_SNAPSHOTS = True  # append every changed week to data/metric_snapshots.sqlite (reports for past weeks: generate_report.py --weeks)
+ANNOTATION_STORE = "json"  # "parquet" = read metrics from data/annotations_parquet/ (python annotation_store.py export)
+METRICS_CHUNK_ROWS = 0  # > 0: stream annotations in chunks (bounded memory for very large channels)
+METRICS_TOPIC_TOP_K = 0  # > 0: keep only the top K topic votes per week while streaming (approximate)
+METRICS_GRANULARITY = "day"  # escalation/emotion timeline buckets: "hour", "day" or "week"
+METRICS_ROLLING_WINDOWS = ["24h", "7d"]  # rolling windows ending at each bucket (multiples of the granularity)
+
+# Pipeline (run_analysis.py)
+PIPELINE_FETCH_INTERVAL_MINUTES = 60  # --fetch: re-fetch at most once per interval; stages with unchanged inputs are skipped
+# CHANNEL_HANDLES = ["@channel_a", "@channel_b"]  # run_analysis.py: several channels, one process each
+PIPELINE_JOBS = 0  # processes (channels in parallel / stages of one channel); 0 = CPU count
+PIPELINE_API_CONCURRENCY = 2  # channels fetching/annotating at the same time (API quotas)
+PLOT_FORMAT = "png"  # charts (scripts/plots.py): "png" or "svg" (smaller, faster)
@@ -0,0 +1,90 @@
+"""
+Check: metric snapshots survive the LATEST_WEEKS window rolling forward.
+
+Run from comment-sentiment/:
+    python -m dev.check_snapshot_rollover
+    python -m dev.check_snapshot_rollover --latest-weeks 6 --baseline-weeks 4
+
+Synthetic comments arrive week by week; after every week compute_metrics' output
+(window of --latest-weeks) is appended to a snapshot store in a temp directory,
+as compute_metrics does. At the end, the latest snapshot of every week must equal
+that week in a run over the full history (LATEST_WEEKS=0), i.e. no week was
+overwritten with the trend-less / short-baseline version it has as the oldest
+week of the window. Also checks that shrinking the window adds no snapshots and
+that merged_metrics serves the full version of the window's oldest week.
+"""
+import argparse
+import json
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from benchmarks import synthetic
+from scripts import compute_metrics as cm
+from scripts.metric_snapshots import SnapshotStore, final_weeks, merged_metrics, week_sections
+
+CHANNEL = "rollover_check"
+
+
+def _output(df: pd.DataFrame, latest_weeks: int, baseline_weeks: int) -> Dict[str, Any]:
+    """compute_metrics' output as written to aggregated_metrics_<slug>.json (JSON types)."""
+    cm.TREND_BASELINE_WEEKS = baseline_weeks
+    cube = cm.build_weekly_cube(cm.restrict_to_latest_weeks(cm.prepare_dataframe(df.copy()), latest_weeks))
+    return json.loads(json.dumps(cm.build_output(cube)))
+
+
+def check(weeks: int, latest_weeks: int, baseline_weeks: int, per_week: int) -> List[str]:
+    """Problems found (empty if snapshots survive the rollover); also run by tests/test_metric_snapshots.py."""
+    records = list(synthetic.comments(weeks=weeks, comments_per_week=per_week, topics=30))
+    full = week_sections(_output(pd.DataFrame(records), 0, baseline_weeks))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(Path(tmp) / "metric_snapshots.sqlite")
+        try:
+            for week in range(1, weeks + 1):
+                output = _output(pd.DataFrame(records[:week * per_week]), latest_weeks, baseline_weeks)
+                store.append(CHANNEL, output, final_weeks(output, latest_weeks, baseline_weeks))
+
+            # Same data, one week less in the window
+            shrunk = _output(pd.DataFrame(records), latest_weeks - 1, baseline_weeks)
+            added = store.append(CHANNEL, shrunk, final_weeks(shrunk, latest_weeks - 1, baseline_weeks))
+            # Even if a caller passes it, the window's oldest week (no trend_flags) replaces nothing
+            added += store.append(CHANNEL, shrunk, sorted(week_sections(shrunk))[:1])
+            if added:
+                return [f"less complete weeks were snapshotted again: {added}"]
+
+            stored = week_sections(store.metrics(CHANNEL))
+            if sorted(stored) != sorted(full):
+                return [f"snapshotted weeks {sorted(stored)} != weeks {sorted(full)}"]
+            problems = []
+            wrong = [w for w in full if stored[w] != full[w]]
+            if wrong:
+                problems.append(f"latest snapshot differs from the full-history metrics for {wrong}")
+
+            merged = week_sections(merged_metrics(store, CHANNEL, output, latest_weeks, baseline_weeks))
+            wrong = [w for w in full if merged[w] != full[w]]
+            if wrong:
+                problems.append(f"merged_metrics differs from the full-history metrics for {wrong}")
+            return problems
+        finally:
+            store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, default=16)
+    parser.add_argument("--latest-weeks", type=int, default=6)
+    parser.add_argument("--baseline-weeks", type=int, default=1)
+    parser.add_argument("--comments-per-week", type=int, default=300)
+    args = parser.parse_args()
+
+    problems = check(args.weeks, args.latest_weeks, args.baseline_weeks, args.comments_per_week)
+    if problems:
+        raise SystemExit("\n".join(problems))
+    print(f"ok: {args.weeks} weeks, window {args.latest_weeks}, trend baseline {args.baseline_weeks}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Minimal local stand-in for the Message Batches API (no network, no costs).
+
+    python dev/stub_batch_server.py --port 8765
+    python dev/stub_batch_server.py --fail-every 3 --drop-every 4   # partial failures
+    # config.py: ANTHROPIC_BASE_URL = "http://127.0.0.1:8765"
+
+Batches end on the first retrieve. Every comment gets a deterministic dummy label
+(neutral / discussion), in text or tool-use form depending on the request.
+--fail-every N errors every Nth request of a batch; --drop-every N leaves every
+Nth comment of a request out of the answer (as a truncated response would).
+tests/test_batch_annotate.py runs the server in-process.
+"""
+import argparse
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+BATCHES: Dict[str, Dict[str, Any]] = {}
+FAIL_EVERY = 0
+DROP_EVERY = 0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _comment_ids(params: Dict[str, Any]) -> List[str]:
+    content = params["messages"][0]["content"]
+    payload = json.loads(content[content.index("["):content.rindex("]") + 1])
+    return [p["id"] for p in payload]
+
+
+def _message(params: Dict[str, Any]) -> Dict[str, Any]:
+    annotations = [
+        {"id": cid, "sentiment": "neutral", "intent": "discussion", "emotion_intensity": 0.1, "key_topics": ["stub_topic"]}
+        for i, cid in enumerate(_comment_ids(params))
+        if not DROP_EVERY or (i + 1) % DROP_EVERY
+    ]
+    if params.get("tools"):
+        content = [{
+            "type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:12]}",
+            "name": params["tools"][0]["name"], "input": {"annotations": annotations},
+        }]
+        stop_reason = "tool_use"
+    else:
+        content = [{"type": "text", "text": json.dumps(annotations)}]
+        stop_reason = "end_turn"
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:12]}", "type": "message", "role": "assistant",
+        "model": params["model"], "content": content, "stop_reason": stop_reason, "stop_sequence": None,
+        "usage": {"input_tokens": 0, "output_tokens": 0},
+    }
+
+
+def _result(n: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    if FAIL_EVERY and (n + 1) % FAIL_EVERY == 0:
+        error = {"type": "api_error", "message": "stub failure"}
+        return {"type": "errored", "error": {"type": "error", "error": error}}
+    return {"type": "succeeded", "message": _message(params)}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send(self, status: int, body: str, content_type: str = "application/json") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _batch_view(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in batch.items() if k != "requests"}
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/v1/messages/batches":
+            return self._send(404, json.dumps({"type": "error", "error": {"type": "not_found_error"}}))
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:16]}"
+        n = len(body["requests"])
+        BATCHES[batch_id] = {
+            "id": batch_id, "type": "message_batch", "processing_status": "in_progress",
+            "request_counts": {"processing": n, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": _now(), "expires_at": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat(),
+            "ended_at": None, "cancel_initiated_at": None, "archived_at": None, "results_url": None,
+            "requests": body["requests"],
+        }
+        self._send(200, json.dumps(self._batch_view(BATCHES[batch_id])))
+
+    def do_GET(self) -> None:
+        parts = self.path.split("?")[0].strip("/").split("/")  # v1/messages/batches/<id>[/results]
+        batch = BATCHES.get(parts[3]) if len(parts) >= 4 else None
+        if batch is None:
+            return self._send(404, json.dumps({"type": "error", "error": {"type": "not_found_error"}}))
+
+        if len(parts) == 5 and parts[4] == "results":
+            lines = [
+                json.dumps({"custom_id": r["custom_id"], "result": _result(n, r["params"])})
+                for n, r in enumerate(batch["requests"])
+            ]
+            return self._send(200, "\n".join(lines) + "\n", content_type="application/binary")
+
+        if batch["processing_status"] != "ended":
+            n = len(batch["requests"])
+            errored = n // FAIL_EVERY if FAIL_EVERY else 0
+            counts = {"processing": 0, "succeeded": n - errored, "errored": errored, "canceled": 0, "expired": 0}
+            batch.update({
+                "processing_status": "ended", "ended_at": _now(),
+                "request_counts": counts,
+                "results_url": f"http://{self.headers['Host']}/v1/messages/batches/{batch['id']}/results",
+            })
+        self._send(200, json.dumps(self._batch_view(batch)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-every", type=int, default=0, help="error every Nth request of a batch")
+    parser.add_argument("--drop-every", type=int, default=0, help="omit every Nth comment of a request")
+    args = parser.parse_args()
+    global FAIL_EVERY, DROP_EVERY
+    FAIL_EVERY, DROP_EVERY = args.fail_every, args.drop_every
+    print(f"Stub Message Batches API on http://127.0.0.1:{args.port}")
+    ThreadingHTTPServer(("127.0.0.1", args.port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
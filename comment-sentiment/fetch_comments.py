@@ -5,6 +5,8 @@ from typing import Any, Dict, List, Optional
 
 from googleapiclient.discovery import build
 
+import profiling
+
 
 YOUTUBE_API_KEY = getattr(config, "YOUTUBE_API_KEY", "")
 CHANNEL_HANDLE = getattr(config, "CHANNEL_HANDLE", "")
@@ -324,14 +326,16 @@ def main():
     window_desc = f"{days_back} days" if days_back is not None else f"{weeks_back} weeks"
     print(f"Fetching videos since {cutoff_rfc3339} (window: last {window_desc})...")
 
-    videos = get_recent_videos(youtube, channel_id, cutoff_dt=cutoff_dt)
+    with profiling.span("recent videos"):
+        videos = get_recent_videos(youtube, channel_id, cutoff_dt=cutoff_dt)
     print(f"Found {len(videos)} videos")
 
     all_comments: List[Dict[str, Any]] = []
 
     for idx, video in enumerate(videos, 1):
         print(f"[{idx}/{len(videos)}] Fetching comments for: {video.get('title','')}")
-        comments = fetch_comments_for_video(youtube, video, cutoff_dt=cutoff_dt)
+        with profiling.span("video comments", video_id=video.get("video_id")):
+            comments = fetch_comments_for_video(youtube, video, cutoff_dt=cutoff_dt)
         all_comments.extend(comments)
 
         if len(all_comments) >= MAX_COMMENTS:
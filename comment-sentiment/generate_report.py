@@ -1,8 +1,14 @@
+import argparse
+import base64
 import json
+import mimetypes
+import re
 from dataclasses import dataclass
 from datetime import date
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from string import Template
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import config
 
@@ -52,23 +58,6 @@ def safe_float(v: Any, default: float = 0.0) -> float:
         return float(v)
     except Exception:
         return default
-    
-def legend_block(escalation_scale_text: str) -> str:
-    return (
-        "## Skalen & Begriffe (Kurzlegende)\n\n"
-        "- **Aggressive Kritik (%):** Anteil von Kommentaren mit stark negativem oder eskalierendem Sprachmuster.\n"
-        f"- **Eskalations-Level:** Regelbasierte Einordnung auf Basis des Anteils aggressiver Kritik "
-        f"(Skala: {escalation_scale_text}).\n"
-        "- **Emotion (0–1):** Modellbasierter Emotionsscore (0 = neutral, 1 = stark emotional).\n"
-        "- **Ø negativ:** Durchschnittlicher Emotionswert ausschließlich negativer Kommentare.\n"
-        "- **Emotion Lift:** Differenz zwischen Gesamt- und Negativemotion "
-        "(höhere Werte = stärkere emotionale Aufladung).\n"
-        "- **Kritik-Struktur:** *focused* = ein dominantes Thema; "
-        "*fragmented* = mehrere gleichgewichtige Themen.\n"
-        "- **Dominanz (0–1):** Anteil des größten Kritik-Themas an allen kritischen Kommentaren "
-        "(focused > 0.40).\n"
-        "- **Trend (up / flat / down):** Veränderung ggü. Vorwoche relativ zu einer internen Signifikanzschwelle.\n"
-    )
 
 
 def safe_int(v: Any, default: int = 0) -> int:
@@ -143,15 +132,18 @@ def pick_focus_week(metrics: Dict[str, Any], weeks_for_range: List[str], min_com
     Pick a focus week that is recent AND has enough volume.
     Uses sentiment_trend counts (most reliable aggregate).
     """
-    if not weeks_for_range:
-        raise ValueError("weeks_for_range is empty.")
-
     totals: Dict[str, int] = {}
     for r in metrics.get("sentiment_trend", []) or []:
         w = r.get("week")
         c = r.get("count", 0)
         if w:
             totals[str(w)] = totals.get(str(w), 0) + safe_int(c)
+    return _focus_week(totals, weeks_for_range, min_comments)
+
+
+def _focus_week(totals: Dict[str, int], weeks_for_range: List[str], min_comments: int) -> str:
+    if not weeks_for_range:
+        raise ValueError("weeks_for_range is empty.")
 
     # 1) newest week in range with >= min_comments
     for w in reversed(weeks_for_range):
@@ -182,7 +174,12 @@ if not CHANNEL_HANDLE:
 CHANNEL_SLUG = slugify_channel(CHANNEL_HANDLE)
 
 INPUT_PATH = DATA_DIR / f"aggregated_metrics_{CHANNEL_SLUG}.json"
+SNAPSHOTS_PATH = DATA_DIR / "metric_snapshots.sqlite"  # past weeks, written by scripts/compute_metrics.py
 OUTPUT_PATH = OUTPUT_DIR / f"report_{CHANNEL_SLUG}_{date.today().isoformat()}.md"
+PLOT_FORMAT = str(getattr(config, "PLOT_FORMAT", "png")).strip().lower()  # charts from scripts/plots.py
+TEMPLATE_DIR = BASE_DIR / "templates"
+
+ESCALATION_SCALE_TEXT = "stable < 15%, watch < 30%, critical ≥ 30%"
 
 
 def load_metrics(path: Path) -> Dict[str, Any]:
@@ -191,62 +188,146 @@ def load_metrics(path: Path) -> Dict[str, Any]:
 
 
 # -----------------------------
-# Report builder
+# Templates (templates/*.md, *.html: string.Template, read + compiled once per process)
 # -----------------------------
-def build_report(metrics: Dict[str, Any]) -> str:
-    escalation_list = metrics.get("escalation", []) or []
-    if not escalation_list:
-        raise ValueError(f"No 'escalation' found in {INPUT_PATH.name} (expected new schema).")
+@lru_cache(maxsize=None)
+def load_template(name: str) -> Template:
+    return Template((TEMPLATE_DIR / name).read_text(encoding="utf-8"))
 
-    all_weeks = sorted_weeks(escalation_list)
-    if not all_weeks:
-        raise ValueError("No weeks found in 'escalation' records.")
 
-    latest_weeks_cfg = get_cfg_int("LATEST_WEEKS", 3)
-    weeks_for_range = all_weeks[-latest_weeks_cfg:] if latest_weeks_cfg > 0 else all_weeks
-    range_start, range_end = weeks_for_range[0], weeks_for_range[-1]
+@lru_cache(maxsize=1)
+def _markdown() -> Any:
+    import markdown  # only needed for HTML output
+
+    return markdown.Markdown(extensions=["tables", "fenced_code"])
+
+
+# Encoded images by (path, size, mtime): charts are shared by all reports of a batch
+_DATA_URIS: Dict[Tuple[str, int, int], str] = {}
+_IMG_SRC = re.compile(r'(<img\b[^>]*?\bsrc=")([^"]+)(")')
 
-    min_focus_week_comments = get_cfg_int("MIN_FOCUS_WEEK_COMMENTS", 50)
-    focus_week = pick_focus_week(metrics, weeks_for_range, min_comments=min_focus_week_comments)
 
-    escalation_by_week = index_by_week(escalation_list)
-    latest_esc = escalation_by_week.get(focus_week, {}) or {}
+def _data_uri(path: Path) -> Optional[str]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _DATA_URIS:
+        mime = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        _DATA_URIS[key] = f"data:{mime};base64," + base64.b64encode(path.read_bytes()).decode("ascii")
+    return _DATA_URIS[key]
+
+
+def render_html(report_md: str, image_dir: Path = OUTPUT_DIR, title: str = "Community Sentiment Report") -> str:
+    """Self-contained HTML: relative image links are inlined as data URIs (missing files stay links)."""
+    body = _markdown().reset().convert(report_md)
+
+    def inline(m: "re.Match[str]") -> str:
+        src = m.group(2)
+        if src.startswith(("data:", "http://", "https://")):
+            return m.group(0)
+        return m.group(1) + (_data_uri(image_dir / src) or src) + m.group(3)
 
-    # Optional blocks
-    cs_idx = index_by_week(metrics.get("criticism_structure", []) or [])
-    ec_idx = index_by_week(metrics.get("emotion_context", []) or [])
-    tf_idx = index_by_week(metrics.get("trend_flags", []) or [])
+    return load_template("report.html").substitute(title=title, body=_IMG_SRC.sub(inline, body))
 
-    cs = cs_idx.get(focus_week, {}) or {}
-    ec = ec_idx.get(focus_week, {}) or {}
-    tf = tf_idx.get(focus_week, {}) or {}
 
-    # Issues for this week
-    issues = metrics.get("issues", []) or []
-    issues_week = [i for i in issues if str(i.get("week")) == focus_week]
+# -----------------------------
+# Report context
+# -----------------------------
+class MetricsIndex:
+    """Per-week lookups over one metrics dict, built in a single pass and shared by all its reports."""
+
+    def __init__(self, metrics: Dict[str, Any]) -> None:
+        escalation_list = metrics.get("escalation", []) or []
+        if not escalation_list:
+            raise ValueError(f"No 'escalation' found in {INPUT_PATH.name} (expected new schema).")
+        self.weeks = sorted_weeks(escalation_list)
+        if not self.weeks:
+            raise ValueError("No weeks found in 'escalation' records.")
+
+        self.escalation = index_by_week(escalation_list)
+        self.criticism_structure = index_by_week(metrics.get("criticism_structure", []) or [])
+        self.emotion_context = index_by_week(metrics.get("emotion_context", []) or [])
+        self.trend_flags = index_by_week(metrics.get("trend_flags", []) or [])
+
+        self.totals: Dict[str, int] = {}
+        for r in metrics.get("sentiment_trend", []) or []:
+            w = r.get("week")
+            if w:
+                self.totals[str(w)] = self.totals.get(str(w), 0) + safe_int(r.get("count", 0))
+
+        self.issues: Dict[str, List[Dict[str, Any]]] = {}
+        for i in metrics.get("issues", []) or []:
+            self.issues.setdefault(str(i.get("week")), []).append(i)
+
+    def top_issues(self, week: str, intent_group: str, n: int = 5) -> List[Dict[str, Any]]:
+        return sorted(
+            (i for i in self.issues.get(week, []) if i.get("intent_group") == intent_group),
+            key=lambda x: safe_int(x.get("comment_count", 0)),
+            reverse=True,
+        )[:n]
+
+
+def _issue_lines(title: str, issues: List[Dict[str, Any]]) -> List[str]:
+    lines = [title, ""]  # wichtig: Liste startet nach Leerzeile
+    for i in issues:
+        lines.append(f"- **{i.get('topic')}**: {safe_int(i.get('comment_count'))} (Ø Emotion {i.get('avg_emotion')})")
+    lines.append("")
+    return lines
+
 
-    critical_issues = sorted(
-        (i for i in issues_week if i.get("intent_group") == "critical"),
-        key=lambda x: safe_int(x.get("comment_count", 0)),
-        reverse=True,
-    )[:5]
+def report_weeks(index: MetricsIndex, focus_week: Optional[str] = None) -> Tuple[List[str], str]:
+    """(weeks shown in the report, focus week): the LATEST_WEEKS weeks up to focus_week."""
+    latest_weeks_cfg = get_cfg_int("LATEST_WEEKS", 3)
+    weeks = index.weeks
+    if focus_week is not None:
+        if focus_week not in index.escalation:
+            raise ValueError(f"Week {focus_week!r} not in metrics (weeks: {weeks[0]} … {weeks[-1]}).")
+        weeks = weeks[:weeks.index(focus_week) + 1]
+    weeks_for_range = weeks[-latest_weeks_cfg:] if latest_weeks_cfg > 0 else weeks
+    if focus_week is None:
+        focus_week = _focus_week(index.totals, weeks_for_range, get_cfg_int("MIN_FOCUS_WEEK_COMMENTS", 50))
+    return weeks_for_range, focus_week
+
+
+def slice_weeks(metrics: Dict[str, Any], weeks: Iterable[str]) -> Dict[str, Any]:
+    """Week-keyed records of `weeks` only (e.g. the charts of a past-week report)."""
+    keep = set(weeks)
+    return {
+        k: [r for r in v if str(r.get("week")) in keep]
+        for k, v in metrics.items()
+        if isinstance(v, list) and v and isinstance(v[0], dict) and "week" in v[0]
+    }
+
+
+def report_context(
+    index: MetricsIndex,
+    channel_handle: str,
+    focus_week: Optional[str] = None,
+    plot_format: str = PLOT_FORMAT,
+    chart_suffix: str = "",
+) -> Dict[str, Any]:
+    """
+    Values for templates/report.md. focus_week=None picks the focus week among the
+    latest LATEST_WEEKS weeks; otherwise the range ends at the given week.
+    chart_suffix: charts rendered for this report only (see render_reports).
+    """
+    latest_weeks_cfg = get_cfg_int("LATEST_WEEKS", 3)
+    min_focus_week_comments = get_cfg_int("MIN_FOCUS_WEEK_COMMENTS", 50)
+    weeks_for_range, focus_week = report_weeks(index, focus_week)
 
-    supportive_issues = sorted(
-        (i for i in issues_week if i.get("intent_group") == "supportive"),
-        key=lambda x: safe_int(x.get("comment_count", 0)),
-        reverse=True,
-    )[:5]
+    latest_esc = index.escalation.get(focus_week, {}) or {}
+    cs = index.criticism_structure.get(focus_week, {}) or {}
+    ec = index.emotion_context.get(focus_week, {}) or {}
+    tf = index.trend_flags.get(focus_week, {}) or {}
 
     classification = classify_status_for_week(
         escalation_level=str(latest_esc.get("level", "")),
         criticism_structure=str(cs.get("structure", "")),
     )
 
-    escalation_scale_text = "stable < 15%, watch < 30%, critical ≥ 30%"
-    aggressive_ratio_pct = safe_float(latest_esc.get("aggressive_ratio", 0.0)) * 100.0
-
-    # Trend sentence (optional)
-    trend_sentence: Optional[str] = None
+    trend_sentence = "Trend-Signal: **n/a** (trend_flags fehlen oder nur 1 Woche im Datensatz)."
     if tf:
         trend_sentence = (
             "Trend-Signal (ggü. Vorwoche): "
@@ -254,127 +335,171 @@ def build_report(metrics: Dict[str, Any]) -> str:
             f"Kritik-Intent **{tf.get('critical_intent_trend','n/a')}** (Δ {tf.get('critical_intent_change','n/a')})."
         )
 
-    # Emotion context (optional)
-    emotion_sentence: Optional[str] = None
+    emotion_sentence = "Emotionskontext: **n/a**"
     if ec:
-        label = ec.get("emotion_label", "n/a")
         emotion_sentence = (
             "Emotionskontext: "
             f"Ø Emotion gesamt **{ec.get('avg_emotion_total','n/a')}**, "
             f"Ø negativ **{ec.get('avg_emotion_negative','n/a')}** "
-            f"(Lift {ec.get('emotion_lift','n/a')}, Label: **{label}**)."
+            f"(Lift {ec.get('emotion_lift','n/a')}, Label: **{ec.get('emotion_label', 'n/a')}**)."
         )
 
-    # Dominance/structure (optional)
-    dominance_sentence: Optional[str] = None
+    dominance_sentence = "Kritik-Struktur: **n/a**"
     if cs.get("structure"):
         dominance_sentence = (
             f"Kritik-Struktur: **{cs.get('structure')}** "
             f"(Dominanz {safe_float(cs.get('dominance', 0.0)):.2f}; Schwelle focused > 0.40)."
         )
 
-    channel_title = CHANNEL_HANDLE or CHANNEL_SLUG
-
-    lines: List[str] = []
-    lines.append(f"# Community Sentiment Report – {channel_title}\n")
-
-    # Kurzfazit
-    lines.append("## Kurzfazit\n")
-    lines.append(f"- **Bewertung:** {classification.status}")
-    lines.append(f"- **Empfehlung:** {classification.action}")
-    lines.append(f"- **Begründung:** {classification.reason}\n")
-
-    # Datengrundlage & Herleitung
-    lines.append("## Datengrundlage & Herleitung\n")
-    lines.append(
-        f"- **Analysezeitraum:** **{range_start}** bis **{range_end}** "
-        f"(Fokus-Woche: **{focus_week}**, Mindestvolumen: {min_focus_week_comments}, LATEST_WEEKS={latest_weeks_cfg})"
-    )
-    lines.append(
-        f"- **Aggressive Kritik (Fokus-Woche):** **{aggressive_ratio_pct:.1f}%** "
-        f"(Skala: {escalation_scale_text}; Level: **{latest_esc.get('level','n/a')}**)"
-    )
-    lines.append(f"- {dominance_sentence}" if dominance_sentence else "- Kritik-Struktur: **n/a**")
-    lines.append(f"- {emotion_sentence}" if emotion_sentence else "- Emotionskontext: **n/a**")
-
-    lines.append("")
-    lines.append(trend_sentence if trend_sentence else "Trend-Signal: **n/a** (trend_flags fehlen oder nur 1 Woche im Datensatz).")
-    lines.append("")
-
-    # Legende
-    lines.append(legend_block(escalation_scale_text))
-    lines.append("")
-    lines.append("") 
-
-    # Visuals
-    lines.append("## Sentiment-Entwicklung\n")
-    lines.append(f"![](sentiment_trend_{CHANNEL_SLUG}.png)\n")
-
-    lines.append("## Intent-Entwicklung\n")
-    lines.append(f"![](intent_shift_{CHANNEL_SLUG}.png)\n")
-
-    # Kritik- & Trigger-Themen
-    lines.append("## Kritik- & Trigger-Themen\n")
+    # Blocks end with the line break before the next heading
     top_topics = cs.get("top_topics") if cs else None
-
     if not top_topics:
-        lines.append("Keine klaren Kritik-Cluster in dieser Fokus-Woche (zu wenige kritische Kommentare oder keine Topics).")
-        lines.append("")  # Leerzeile nach Hinweis
+        topics = ["Keine klaren Kritik-Cluster in dieser Fokus-Woche (zu wenige kritische Kommentare oder keine Topics).", ""]
     else:
-        lines.append(format_top_topics(top_topics))
-        lines.append("")  # Leerzeile nach der Liste
-
+        topics = [format_top_topics(top_topics), ""]
         if cs.get("structure") == "focused":
-            lines.append("**Einordnung (regelbasiert):** Kritik ist fokussiert → beobachten.")
+            topics.append("**Einordnung (regelbasiert):** Kritik ist fokussiert → beobachten.")
         elif cs.get("structure") == "fragmented":
-            lines.append("**Einordnung (regelbasiert):** Kritik ist fragmentiert → kein einzelner Trigger dominiert.")
+            topics.append("**Einordnung (regelbasiert):** Kritik ist fragmentiert → kein einzelner Trigger dominiert.")
+        topics.append("")
 
-        lines.append("")  # Leerzeile nach Einordnung
-
-
-    # Issues
-    lines.append("## Top Issues (Fokus-Woche)\n")
-    if not issues_week:
-        lines.append("Keine Issues verfügbar (fehlende key_topics oder leerer Zeitraum).\n")
+    if not index.issues.get(focus_week):
+        issues = ["Keine Issues verfügbar (fehlende key_topics oder leerer Zeitraum).\n"]
     else:
+        issues = []
+        supportive_issues = index.top_issues(focus_week, "supportive")
+        critical_issues = index.top_issues(focus_week, "critical")
         if supportive_issues:
-            lines.append("**Supportive (Support/Lob):**")
-            lines.append("")  # wichtig: Liste startet nach Leerzeile
-            for i in supportive_issues:
-                lines.append(f"- **{i.get('topic')}**: {safe_int(i.get('comment_count'))} (Ø Emotion {i.get('avg_emotion')})")
-            lines.append("")
-
+            issues += _issue_lines("**Supportive (Support/Lob):**", supportive_issues)
         if critical_issues:
-            lines.append("**Kritisch (Constructive/Aggressive):**")
-            lines.append("")  # wichtig: Liste startet nach Leerzeile
-            for i in critical_issues:
-                lines.append(f"- **{i.get('topic')}**: {safe_int(i.get('comment_count'))} (Ø Emotion {i.get('avg_emotion')})")
-            lines.append("")
-
+            issues += _issue_lines("**Kritisch (Constructive/Aggressive):**", critical_issues)
         else:
-            lines.append("Keine signifikanten kritischen Issues in dieser Fokus-Woche.\n")
-
-    # Abschluss
-    lines.append("## Interpretation & Empfehlung\n")
-    lines.append(
-        f"Status **{classification.status}** (Fokus-Woche **{focus_week}**), weil:\n"
-        f"- Eskalation-Level = **{latest_esc.get('level','n/a')}** (aggressive Kritik {aggressive_ratio_pct:.1f}%)\n"
-        f"- Kritik-Struktur = **{cs.get('structure','n/a')}**\n"
-        f"- Trend-Signale = **{tf.get('negative_trend','n/a')}** (Sentiment), **{tf.get('critical_intent_trend','n/a')}** (Intent)\n"
-        f"\n**Empfehlung:** {classification.action}\n"
-    )
-
-    return "\n".join(lines)
+            issues.append("Keine signifikanten kritischen Issues in dieser Fokus-Woche.\n")
+
+    channel_slug = slugify_channel(channel_handle)
+    return {
+        "channel_title": channel_handle or channel_slug,
+        "status": classification.status,
+        "action": classification.action,
+        "reason": classification.reason,
+        "range_start": weeks_for_range[0],
+        "range_end": weeks_for_range[-1],
+        "focus_week": focus_week,
+        "min_focus_week_comments": min_focus_week_comments,
+        "latest_weeks": latest_weeks_cfg,
+        "aggressive_ratio_pct": f"{safe_float(latest_esc.get('aggressive_ratio', 0.0)) * 100.0:.1f}",
+        "escalation_scale": ESCALATION_SCALE_TEXT,
+        "escalation_level": latest_esc.get("level", "n/a"),
+        "dominance_sentence": dominance_sentence,
+        "emotion_sentence": emotion_sentence,
+        "trend_sentence": trend_sentence,
+        "sentiment_chart": f"sentiment_trend_{channel_slug}{chart_suffix}.{plot_format}",
+        "intent_chart": f"intent_shift_{channel_slug}{chart_suffix}.{plot_format}",
+        "topics_block": "".join(line + "\n" for line in topics),
+        "issues_block": "".join(line + "\n" for line in issues),
+        "structure": cs.get("structure", "n/a"),
+        "negative_trend": tf.get("negative_trend", "n/a"),
+        "critical_intent_trend": tf.get("critical_intent_trend", "n/a"),
+    }
 
 
-def main() -> None:
-    metrics = load_metrics(INPUT_PATH)
+# -----------------------------
+# Rendering
+# -----------------------------
+def build_report(metrics: Dict[str, Any], focus_week: Optional[str] = None, channel_handle: str = CHANNEL_HANDLE) -> str:
+    return load_template("report.md").substitute(report_context(MetricsIndex(metrics), channel_handle, focus_week))
+
+
+@dataclass
+class ReportJob:
+    channel_handle: str
+    metrics: Dict[str, Any]
+    weeks: Sequence[Optional[str]] = (None,)  # None: latest report (focus week picked automatically)
+    week_charts: bool = False  # week reports get charts of their own range (else: the current charts)
+
+
+def report_paths(channel_slug: str, week: Optional[str] = None, output_dir: Path = OUTPUT_DIR) -> Tuple[Path, Path]:
+    """(markdown, html); reports for a given week are named after the week's Monday."""
+    if week is None:
+        return output_dir / f"report_{channel_slug}_{date.today().isoformat()}.md", output_dir / f"report_{channel_slug}.html"
+    stem = f"week_report_{channel_slug}_{week[:10]}"
+    return output_dir / f"{stem}.md", output_dir / f"{stem}.html"
+
+
+def render_reports(jobs: Iterable[ReportJob], html: bool = True, output_dir: Path = OUTPUT_DIR) -> List[Path]:
+    """Markdown (+ self-contained HTML) for every channel x week; returns the written paths."""
+    template = load_template("report.md")
+    written: List[Path] = []
+    for job in jobs:
+        index = MetricsIndex(job.metrics)
+        channel_slug = slugify_channel(job.channel_handle)
+        for week in job.weeks:
+            chart_suffix = ""
+            if job.week_charts and week is not None:
+                from scripts import plots  # matplotlib only when charts are rendered
+
+                chart_suffix = f"_{week[:10]}"
+                weeks_for_range, _ = report_weeks(index, week)
+                plots.render_channel(
+                    job.channel_handle, slice_weeks(job.metrics, weeks_for_range), fmt=PLOT_FORMAT, suffix=chart_suffix,
+                )
+            report_md = template.substitute(report_context(index, job.channel_handle, week, chart_suffix=chart_suffix))
+            md_path, html_path = report_paths(channel_slug, week, output_dir)
+            md_path.write_text(report_md, encoding="utf-8")
+            written.append(md_path)
+            if html:
+                html_path.write_text(render_html(report_md, output_dir), encoding="utf-8")
+                written.append(html_path)
+    return written
+
+
+def write_report(metrics: Dict[str, Any], output_path: Optional[Path] = None) -> Path:
+    output_path = output_path or OUTPUT_PATH
     report_md = build_report(metrics)
 
-    with OUTPUT_PATH.open("w", encoding="utf-8") as f:
+    with output_path.open("w", encoding="utf-8") as f:
         f.write(report_md)
 
-    print(f"Report written to {OUTPUT_PATH}")
+    print(f"Report written to {output_path}")
+    return output_path
+
+
+def _channel_metrics(channel_handle: str, history: bool) -> Dict[str, Any]:
+    """Current metrics; with history, plus every past week from the snapshot store (scripts/metric_snapshots.py)."""
+    channel_slug = slugify_channel(channel_handle)
+    path = DATA_DIR / f"aggregated_metrics_{channel_slug}.json"
+    current = load_metrics(path) if path.exists() else None
+    if not history or not SNAPSHOTS_PATH.exists():
+        return current if current is not None else load_metrics(path)
+
+    from scripts.metric_snapshots import SnapshotStore, merged_metrics
+
+    store = SnapshotStore(SNAPSHOTS_PATH)
+    try:
+        return merged_metrics(store, channel_slug, current)
+    finally:
+        store.close()
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Render the community sentiment report (Markdown, optional HTML).")
+    parser.add_argument("--channels", nargs="+", metavar="HANDLE", help="default: CHANNEL_HANDLE from config.py")
+    parser.add_argument("--weeks", nargs="+", metavar="WEEK",
+                        help="focus weeks, e.g. 2025-05-19/2025-05-25 (default: latest report)")
+    parser.add_argument("--html", action="store_true", help="also write self-contained HTML (images inlined)")
+    parser.add_argument("--charts", action="store_true", help="render charts for each week report's own range")
+    args = parser.parse_args(argv)
+
+    if not args.channels and not args.weeks and not args.html:
+        write_report(load_metrics(INPUT_PATH))
+        return
+
+    jobs = [
+        ReportJob(h, _channel_metrics(h, bool(args.weeks)), args.weeks or [None], args.charts)
+        for h in (args.channels or [CHANNEL_HANDLE])
+    ]
+    for path in render_reports(jobs, html=args.html):
+        print(f"Report written to {path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+"""
+Length-based model routing for comment annotation.
+
+Short, single-language comments go to the fast/cheap model; long or mixed-language
+comments go to the strong model. Decisions are deterministic per text.
+"""
+import re
+import unicodedata
+from typing import Tuple
+
+ROUTE_FAST = "fast"
+ROUTE_STRONG = "strong"
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+# Function words only (topic words would make every loanword look "mixed")
+_EN_WORDS = {"the", "and", "is", "are", "this", "that", "you", "with", "what", "why", "how", "was", "have", "not"}
+_DE_WORDS = {"der", "die", "das", "und", "ist", "sind", "nicht", "ich", "du", "mit", "was", "wie", "warum", "auch"}
+_AMBIGUOUS = _EN_WORDS & _DE_WORDS
+
+# Japanese text mixes kana and kanji in every sentence; that is one writing system, not two
+_SCRIPT_FAMILIES = {"HIRAGANA": "CJK", "KATAKANA": "CJK", "KATAKANA-HIRAGANA": "CJK", "IDEOGRAPHIC": "CJK"}
+
+
+def _script(ch: str) -> str:
+    # First word of the unicode name is the script for letters ("LATIN", "CYRILLIC", "CJK", ...)
+    try:
+        script = unicodedata.name(ch).split(" ", 1)[0]
+    except ValueError:
+        return ""
+    if script == "MODIFIER":  # modifier letters (e.g. ʼ) belong to no script of their own
+        return ""
+    return _SCRIPT_FAMILIES.get(script, script)
+
+
+def is_mixed_language(text: str, min_hits: int = 2) -> bool:
+    """Several scripts (e.g. Latin + Cyrillic), or both English and German function words."""
+    # NFKC folds styled/fullwidth letters (𝐁𝐨𝐥𝐝, Ｆｕｌｌ, ｶﾀｶﾅ) into their base script; digits/symbols aren't letters
+    scripts = {_script(ch) for ch in unicodedata.normalize("NFKC", text) if ch.isalpha()}
+    scripts.discard("")
+    if len(scripts) > 1:
+        return True
+
+    words = [w.lower() for w in _WORD_RE.findall(text)]
+    en = sum(w in _EN_WORDS and w not in _AMBIGUOUS for w in words)
+    de = sum(w in _DE_WORDS and w not in _AMBIGUOUS for w in words)
+    return en >= min_hits and de >= min_hits
+
+
+def route_comment(text: str, max_fast_chars: int) -> Tuple[str, str]:
+    """Returns (route, reason)."""
+    text = text or ""
+    if len(text) > max_fast_chars:
+        return ROUTE_STRONG, "long"
+    if is_mixed_language(text):
+        return ROUTE_STRONG, "mixed_language"
+    return ROUTE_FAST, "short"
@@ -0,0 +1,322 @@
+"""
+In-process stage runner for run_analysis.
+
+A stage is a function that receives the results of the stages it depends on
+({dependency name: result}) and returns its own result. Stages run in
+dependency order inside one interpreter, so pandas/matplotlib are imported once
+and metrics are handed over in memory instead of being re-read from disk.
+
+Stages that declare their output files are skipped when nothing they depend on
+changed: the fingerprint over input file contents, params (config values) and
+the stage's source files matches the last run, and the outputs are still the
+files that run wrote. State lives in one JSON file per channel.
+
+With workers > 1, independent stages (e.g. the plots and the report, which
+only need the metrics) run concurrently in a process pool.
+"""
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+from profiling import ProfileOptions, profile_call
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    deps: Sequence[str] = ()
+    inputs: Sequence[Path] = ()  # files the result depends on
+    outputs: Sequence[Path] = ()  # files the stage writes (none: always runs)
+    params: Dict[str, Any] = field(default_factory=dict)  # config values etc., JSON-serializable
+    code: Sequence[Path] = ()  # source files; editing them invalidates the stage
+    load: Optional[Callable[[], Any]] = None  # result of a skipped stage, for dependents that do run
+
+
+class StageFailed(RuntimeError):
+    def __init__(self, stage: str, output: str) -> None:
+        super().__init__(f"Stage failed: {stage}")
+        self.stage = stage
+        self.output = output
+
+    def __reduce__(self):  # raised in pool processes, re-raised here
+        return StageFailed, (self.stage, self.output)
+
+
+class _Tee(io.TextIOBase):
+    """Writes through to the console and keeps a copy (stage output is captured on the first run)."""
+
+    def __init__(self, stream: Optional[TextIO]) -> None:
+        self.stream = stream  # None: capture only
+        self.buffer_ = io.StringIO()
+
+    def write(self, s: str) -> int:
+        if self.stream is not None:
+            self.stream.write(s)
+        return self.buffer_.write(s)
+
+    def flush(self) -> None:
+        if self.stream is not None:
+            self.stream.flush()
+
+    def isatty(self) -> bool:  # keeps tqdm progress bars working
+        return self.stream is not None and self.stream.isatty()
+
+    def getvalue(self) -> str:
+        return self.buffer_.getvalue()
+
+
+class StageState:
+    """
+    {stage: fingerprint + output hashes of its last successful run}, plus a
+    (size, mtime) -> sha256 cache so unchanged large files are not re-hashed.
+    """
+
+    def __init__(self, path: Optional[Path]) -> None:
+        self.path = path
+        self.data: Dict[str, Any] = {"stages": {}, "files": {}}
+        if path is not None and path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def file_hash(self, path: Path) -> Optional[str]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        key = str(path)
+        cached = self.data["files"].get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.data["files"][key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def fingerprint(self, stage: Stage) -> str:
+        payload = {
+            "inputs": {str(p): self.file_hash(Path(p)) for p in stage.inputs},
+            "params": stage.params,
+            "code": {Path(p).name: self.file_hash(Path(p)) for p in stage.code},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def is_current(self, stage: Stage, fingerprint: str) -> bool:
+        last = self.data["stages"].get(stage.name)
+        if not last or last["fingerprint"] != fingerprint:
+            return False
+        return all(self.file_hash(Path(p)) == last["outputs"].get(str(p)) for p in stage.outputs)
+
+    def record(self, stage: Stage, fingerprint: str) -> None:
+        self.data["stages"][stage.name] = {
+            "fingerprint": fingerprint,
+            "outputs": {str(p): self.file_hash(Path(p)) for p in stage.outputs},
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self.save()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        tmp.replace(self.path)
+
+
+class Pipeline:
+    def __init__(self, stages: Iterable[Stage], state_path: Optional[Path] = None) -> None:
+        self.state = StageState(state_path)
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage {stage.name!r}")
+            self.stages[stage.name] = stage
+        self.order = self._topological_order()
+        self.trace_events: List[Dict[str, Any]] = []  # of the last run(profile=...)
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, str] = {}  # name -> "visiting" | "done"
+
+        def visit(name: str, path: List[str]) -> None:
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Stage dependency cycle: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name!r} (required by {path[-1] if path else '?'})")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def run(
+        self,
+        only: Optional[Iterable[str]] = None,
+        force: Collection[str] = (),
+        workers: int = 1,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: Tuple[Any, ...] = (),
+        profile: Optional[ProfileOptions] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run all stages (or `only` those + their dependencies); returns {stage: result}.
+        Stages in `force` run even if unchanged (force=self.stages forces everything).
+
+        workers > 1: stages whose dependencies are done run concurrently in a process
+        pool (started only once two stages are ready at the same time; a lone ready
+        stage runs in this process). Stage functions, their inputs and results must be
+        picklable; `initializer(*initargs)` prepares each pool process.
+
+        profile: stages that run are profiled (see profiling.py); the trace events
+        of this run are collected in self.trace_events.
+        """
+        wanted = set(self.order)
+        if only is not None:
+            wanted = set()
+            todo = list(only)
+            while todo:
+                name = todo.pop()
+                if name not in self.stages:
+                    raise ValueError(f"Unknown stage {name!r}")
+                if name not in wanted:
+                    wanted.add(name)
+                    todo.extend(self.stages[name].deps)
+
+        results: Dict[str, Any] = {}
+        skipped: Dict[str, Stage] = {}
+        fingerprints: Dict[str, Optional[str]] = {}
+        pending = [n for n in self.order if n in wanted]
+        done: set = set()
+        running: Dict[Future, str] = {}
+        pool: Optional[ProcessPoolExecutor] = None
+        self.trace_events = []
+
+        def result(name: str) -> Any:
+            if name in skipped:  # loaded on demand: only if a dependent actually runs
+                load = skipped.pop(name).load
+                results[name] = load() if load else None
+            return results.get(name)
+
+        def finish(name: str, value: Any) -> None:
+            results[name] = value
+            done.add(name)
+            if fingerprints[name]:
+                # Outputs were produced from exactly these inputs (inputs are hashed before the run)
+                self.state.record(self.stages[name], fingerprints[name])
+
+        try:
+            while pending or running:
+                ready = []
+                for name in [n for n in pending if all(d in done for d in self.stages[n].deps)]:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    fingerprint = self.state.fingerprint(stage) if stage.outputs else None
+                    if fingerprint and name not in force and self.state.is_current(stage, fingerprint):
+                        print(f"\n== {name}: unchanged, skipped")
+                        if profile is not None:
+                            self.trace_events.append({
+                                "name": f"{name} (skipped)", "ph": "i", "s": "p", "ts": time.time_ns() / 1000,
+                                "pid": os.getpid(), "tid": 0,
+                            })
+                        skipped[name] = stage
+                        done.add(name)
+                        continue
+                    fingerprints[name] = fingerprint
+                    ready.append(name)
+                if not ready and not running:
+                    continue  # only skips this round; their dependents are ready now
+
+                if pool is None and workers > 1 and len(ready) + len(running) > 1:
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+                if pool is None:
+                    for name in ready:
+                        stage = self.stages[name]
+                        print(f"\n== {name}")
+                        inputs = {d: result(d) for d in stage.deps}
+                        value, _, seconds, events = _run_stage(name, stage.func, inputs, profile=profile)
+                        print(f"   {name} done in {seconds:.1f}s")
+                        self.trace_events += events
+                        finish(name, value)
+                    continue
+
+                for name in ready:
+                    stage = self.stages[name]
+                    print(f"\n== {name} (started)")
+                    inputs = {d: result(d) for d in stage.deps}
+                    running[pool.submit(_run_stage, name, stage.func, inputs, False, profile)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    value, output, seconds, events = future.result()
+                    print(f"\n== {name}\n{output}   {name} done in {seconds:.1f}s")
+                    self.trace_events += events
+                    finish(name, value)
+        finally:
+            if pool is not None:
+                # On failure: let stages already running finish (they may be writing files)
+                pool.shutdown(wait=True, cancel_futures=True)
+        return results
+
+
+def _run_stage(
+    name: str,
+    func: Callable[[Dict[str, Any]], Any],
+    inputs: Dict[str, Any],
+    echo: bool = True,
+    profile: Optional[ProfileOptions] = None,
+) -> Tuple[Any, str, float, List[Dict[str, Any]]]:
+    """
+    Run one stage; returns (result, captured output, seconds, trace events). echo=False (pool
+    processes): capture only, the caller prints the output in one piece so parallel stages
+    do not interleave.
+    """
+    events: List[Dict[str, Any]] = []
+    out, err = _Tee(sys.stdout if echo else None), _Tee(sys.stderr if echo else None)
+    saved = sys.stdout, sys.stderr
+    start = time.perf_counter()
+    sys.stdout, sys.stderr = out, err
+    try:
+        if profile is None:
+            result = func(inputs)
+        else:
+            result, events = profile_call(name, lambda: func(inputs), profile)
+    except BaseException as e:
+        if isinstance(e, SystemExit) and not e.code:
+            result = None  # stage exited cleanly (e.g. nothing to do)
+        elif isinstance(e, KeyboardInterrupt):
+            raise
+        else:
+            raise StageFailed(name, out.getvalue() + err.getvalue()) from e
+    finally:
+        sys.stdout, sys.stderr = saved
+    return result, out.getvalue() + err.getvalue(), time.perf_counter() - start, events
+
+
+def report_failure(error: StageFailed) -> None:
+    """Readable error report from the output captured during the failed run."""
+    print(f"\nERROR: Stage failed: {error.stage}")
+    print(f"Python: {sys.executable}")
+    if error.output.strip():
+        print("\n--- OUTPUT ---")
+        print(error.output.strip())
+    print("\n--- TRACEBACK ---")
+    traceback.print_exception(error.__cause__, file=sys.stdout)
@@ -0,0 +1,314 @@
+"""
+Local fast-path pre-classifier.
+
+Cheap lexicon + emoji rules (optionally backed by a small scikit-learn model trained
+on our own past annotated_comments_*.json). Emits the annotation schema plus a
+confidence score; annotate_comments only forwards low-confidence comments to Claude.
+
+    python preclassify.py train     # train the optional model from past LLM labels
+    python preclassify.py report    # agreement vs. LLM labels per confidence threshold
+
+The model is never trained on the hold-out part (HOLDOUT_PERCENT of the distinct
+texts, picked by text hash), and the report only scores that part, so its figures
+are out-of-sample.
+"""
+import argparse
+import hashlib
+import json
+import pickle
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from annotation_cache import normalize_text
+
+ROOT_DIR = Path(__file__).resolve().parent
+DATA_DIR = ROOT_DIR / "data"
+DATA_DIR.mkdir(exist_ok=True)
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_MODEL_PATH = DATA_DIR / "preclassifier.pkl"
+REPORT_PATH = DATA_DIR / "preclassifier_agreement.json"
+REPORT_THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95]
+HOLDOUT_PERCENT = 20  # share of distinct texts kept out of training, scored by the report
+
+THRESHOLD = float(getattr(config, "PRECLASSIFY_THRESHOLD", DEFAULT_THRESHOLD))
+MODEL_PATH = Path(getattr(config, "PRECLASSIFY_MODEL_PATH", DEFAULT_MODEL_PATH))
+
+# Only short comments are decided by rules; anything longer needs the LLM (topics, nuance)
+MAX_RULE_WORDS = 8
+
+POSITIVE_WORDS = {
+    # en
+    "great", "awesome", "amazing", "love", "loved", "nice", "cool", "best", "perfect", "excellent",
+    "fantastic", "brilliant", "beautiful", "thanks", "thank", "thx", "wow", "legend", "goat", "fire",
+    "good", "helpful", "underrated", "respect", "congrats", "congratulations", "bravo",
+    # de
+    "super", "toll", "klasse", "geil", "mega", "stark", "genial", "hammer", "danke", "dankeschön",
+    "dank", "top", "spitze", "gut", "schön", "großartig", "liebe", "glückwunsch", "ehrenmann", "ehrenfrau",
+    "sympathisch", "hilfreich",
+}
+NEGATIVE_WORDS = {
+    # en
+    "bad", "worst", "hate", "boring", "trash", "garbage", "cringe", "clickbait", "fake", "stupid",
+    "terrible", "awful", "disappointed", "disappointing", "unsubscribed", "dislike", "lame",
+    # de
+    "schlecht", "langweilig", "müll", "mist", "scheiße", "scheisse", "peinlich", "dumm", "enttäuscht",
+    "enttäuschend", "nervig", "deabonniert", "schwach", "lächerlich",
+}
+NEGATIONS = {"not", "no", "never", "dont", "don't", "isn't", "nicht", "kein", "keine", "nie", "niemals"}
+# Words that carry no signal of their own (don't lower confidence)
+FILLER_WORDS = {
+    "the", "a", "an", "this", "that", "video", "videos", "is", "was", "so", "very", "really", "as", "always",
+    "again", "you", "your", "guys", "bro", "man", "one", "of", "and", "for", "it", "its", "content",
+    "das", "der", "die", "ein", "eine", "ist", "war", "echt", "wie", "immer", "wieder", "du", "ihr",
+    "dein", "euer", "und", "für", "sehr", "vielen", "weiter", "mal", "einfach", "richtig", "voll", "ja",
+    "hey", "hi", "first", "erster", "erste",
+}
+POSITIVE_EMOJI = set("😂🤣😍🥰😊😁😄😃😀😆🤗👍👏🙌🔥💪🙏💯😎🤩❤💖💕💙💚💛🧡💜♥✨🎉🥳")
+NEGATIVE_EMOJI = set("👎😡😠🤬🤮💩🙄😒😤😞😢😭")
+# Variation selectors, skin tones and ZWJ don't change meaning
+_EMOJI_MODIFIERS = re.compile("[\ufe0f\u200d\U0001F3FB-\U0001F3FF]")
+_WORD_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+# Confidence of comments the rules refuse to judge (long, questions, negations): always go to Claude
+REFUSED = 0.0
+
+
+def _result(sentiment: str, intent: str, emotion: float, confidence: float) -> Dict[str, Any]:
+    return {
+        "sentiment": sentiment,
+        "intent": intent,
+        "emotion_intensity": round(emotion, 2),
+        "key_topics": [],  # topics are left to the LLM; locally decided comments are low-substance
+        "confidence": round(confidence, 3),
+    }
+
+
+def classify_rules(text: str) -> Dict[str, Any]:
+    """
+    Conservative rules: only short praise/emoji comments get a high confidence.
+    Short negative comments stay below the default threshold on purpose, because
+    the constructive vs. aggressive split drives escalation metrics.
+    """
+    t = _EMOJI_MODIFIERS.sub("", normalize_text(text))
+    words = _WORD_RE.findall(t)
+    pos_e = sum(ch in POSITIVE_EMOJI for ch in t)
+    neg_e = sum(ch in NEGATIVE_EMOJI for ch in t)
+
+    emotion = 0.3 + (0.1 if "!" in t else 0.0) + (0.1 if pos_e + neg_e >= 3 else 0.0)
+
+    if not t:
+        return _result("neutral", "other", 0.0, 0.5)
+
+    if not words:
+        if pos_e and not neg_e:
+            return _result("positive", "praise", emotion, 0.9)
+        if neg_e and not pos_e:
+            return _result("negative", "other", emotion, 0.7)
+        return _result("neutral", "other", 0.0, 0.4)
+
+    if len(words) > MAX_RULE_WORDS or "?" in t or any(w in NEGATIONS for w in words):
+        return _result("neutral", "discussion", 0.0, REFUSED)
+
+    pos_w = sum(w in POSITIVE_WORDS for w in words)
+    neg_w = sum(w in NEGATIVE_WORDS for w in words)
+    known = sum(w in POSITIVE_WORDS or w in NEGATIVE_WORDS or w in FILLER_WORDS for w in words)
+    coverage = known / len(words)
+
+    if pos_w and not neg_w and not neg_e:
+        return _result("positive", "praise", emotion, 0.5 + 0.45 * coverage)
+    if neg_w and not pos_w and not pos_e:
+        return _result("negative", "other", emotion, min(0.7, 0.4 + 0.3 * coverage))
+    return _result("neutral", "other", 0.0, 0.2)
+
+
+# -----------------------------
+# Optional scikit-learn model
+# -----------------------------
+def _require_sklearn():
+    try:
+        import sklearn  # noqa: F401
+    except ImportError as e:
+        raise ImportError("The pre-classifier model needs scikit-learn (pip install scikit-learn).") from e
+
+
+def _llm_labeled(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Only LLM labels are ground truth: records with an annotation_source were labeled
+    by us (local pre-classifier, cluster propagation) and never count.
+    """
+    return [
+        r for r in records
+        if isinstance(r, dict) and r.get("text") and r.get("sentiment") and not r.get("annotation_source")
+    ]
+
+
+def load_annotated_records(paths: Optional[List[Path]] = None) -> List[Dict[str, Any]]:
+    paths = paths or sorted(DATA_DIR.glob("annotated_comments_*.json"))
+    records: List[Dict[str, Any]] = []
+    for p in paths:
+        with p.open("r", encoding="utf-8") as f:
+            records.extend(json.load(f))
+    return _llm_labeled(records)
+
+
+def is_holdout(text: str) -> bool:
+    """Stable split by normalized text, so duplicates of a comment never end up on both sides."""
+    digest = hashlib.sha1(normalize_text(text).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % 100 < HOLDOUT_PERCENT
+
+
+def split_holdout(records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(train, holdout)"""
+    train: List[Dict[str, Any]] = []
+    holdout: List[Dict[str, Any]] = []
+    for r in records:
+        (holdout if is_holdout(r["text"]) else train).append(r)
+    return train, holdout
+
+
+def _emotion(v: Any) -> float:
+    """Malformed intensities count as 0.0, as in compute_metrics."""
+    try:
+        return float(v or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def train_model(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fits on the records as given; main() passes only the training part of split_holdout()."""
+    _require_sklearn()
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression, Ridge
+    from sklearn.pipeline import make_pipeline
+
+    texts = [normalize_text(r["text"]) for r in records]
+    y_sent = [r["sentiment"] for r in records]
+    y_intent = [r.get("intent", "other") for r in records]
+    y_emo = [_emotion(r.get("emotion_intensity")) for r in records]
+    if len(set(y_sent)) < 2 or len(set(y_intent)) < 2:
+        raise ValueError("Need at least two sentiment and two intent classes to train the pre-classifier.")
+
+    def features():
+        return TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), min_df=2, sublinear_tf=True)
+
+    return {
+        "sentiment": make_pipeline(features(), LogisticRegression(max_iter=1000)).fit(texts, y_sent),
+        "intent": make_pipeline(features(), LogisticRegression(max_iter=1000)).fit(texts, y_intent),
+        "emotion": make_pipeline(features(), Ridge(alpha=1.0)).fit(texts, y_emo),
+        "n_train": len(records),
+    }
+
+
+class LocalClassifier:
+    """
+    Rules first; if a trained model is available, it wins wherever it is more confident,
+    except on comments the rules refuse (those stay with Claude).
+    """
+
+    def __init__(self, model: Optional[Dict[str, Any]] = None) -> None:
+        self.model = model
+
+    @classmethod
+    def load(cls, path: Path = MODEL_PATH) -> "LocalClassifier":
+        if not path.exists():
+            return cls()
+        _require_sklearn()
+        with path.open("rb") as f:
+            return cls(pickle.load(f))
+
+    def classify_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        results = [classify_rules(t) for t in texts]
+        if self.model is None or not texts:
+            return results
+
+        norm = [normalize_text(t) for t in texts]
+        sent_proba = self.model["sentiment"].predict_proba(norm)
+        intent_proba = self.model["intent"].predict_proba(norm)
+        emo = self.model["emotion"].predict(norm)
+        sent_classes = self.model["sentiment"].classes_
+        intent_classes = self.model["intent"].classes_
+
+        for i, rule in enumerate(results):
+            s, n = sent_proba[i].argmax(), intent_proba[i].argmax()
+            confidence = float(min(sent_proba[i][s], intent_proba[i][n]))
+            if rule["confidence"] > REFUSED and confidence > rule["confidence"]:
+                results[i] = _result(
+                    str(sent_classes[s]), str(intent_classes[n]), min(max(float(emo[i]), 0.0), 1.0), confidence
+                )
+        return results
+
+
+# -----------------------------
+# Agreement report
+# -----------------------------
+def agreement_report(
+    records: List[Dict[str, Any]],
+    classifier: LocalClassifier,
+    thresholds: List[float] = REPORT_THRESHOLDS,
+) -> Dict[str, Any]:
+    """
+    For each threshold: share of comments that would skip the LLM (coverage) and how
+    often the local labels agree with the LLM labels on exactly those comments.
+    """
+    preds = classifier.classify_many([r["text"] for r in records])
+    rows = []
+    for th in thresholds:
+        taken = [(r, p) for r, p in zip(records, preds) if p["confidence"] >= th]
+        n = len(taken)
+        sent_ok = sum(r["sentiment"] == p["sentiment"] for r, p in taken)
+        intent_ok = sum(r.get("intent") == p["intent"] for r, p in taken)
+        both_ok = sum(r["sentiment"] == p["sentiment"] and r.get("intent") == p["intent"] for r, p in taken)
+        rows.append({
+            "threshold": th,
+            "local_comments": n,
+            "coverage": round(n / len(records), 3) if records else 0.0,
+            "sentiment_agreement": round(sent_ok / n, 3) if n else None,
+            "intent_agreement": round(intent_ok / n, 3) if n else None,
+            "full_agreement": round(both_ok / n, 3) if n else None,
+        })
+    return {
+        "comments": len(records),
+        "holdout_percent": HOLDOUT_PERCENT,
+        "model": classifier.model is not None,
+        "configured_threshold": THRESHOLD,
+        "thresholds": rows,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["train", "report"])
+    parser.add_argument("files", nargs="*", type=Path, help="annotated_comments_*.json (default: all in data/)")
+    args = parser.parse_args()
+
+    records = load_annotated_records(args.files or None)
+    if not records:
+        raise SystemExit("No LLM-annotated comments found.")
+    train, holdout = split_holdout(records)
+
+    if args.command == "train":
+        model = train_model(train)
+        with MODEL_PATH.open("wb") as f:
+            pickle.dump(model, f)
+        print(f"Pre-classifier trained on {model['n_train']} comments ({len(holdout)} held out) → {MODEL_PATH}")
+        return
+
+    if not holdout:
+        raise SystemExit("No held-out comments to score (too few annotated comments).")
+    report = agreement_report(holdout, LocalClassifier.load())
+    with REPORT_PATH.open("w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{'threshold':>9}  {'coverage':>8}  {'sentiment':>9}  {'intent':>6}  {'both':>5}")
+    for row in report["thresholds"]:
+        print(
+            f"{row['threshold']:>9}  {row['coverage']:>8}  {row['sentiment_agreement']!s:>9}  "
+            f"{row['intent_agreement']!s:>6}  {row['full_agreement']!s:>5}"
+        )
+    print(f"Agreement report written to {REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Opt-in profiling of pipeline stages (python run_analysis.py --profile).
+
+Per stage: wall and CPU seconds, Python allocation peak (tracemalloc), peak RSS
+of the stage's process and, with a dump directory, one cProfile file per stage
+(python -m pstats data/profiles/<slug>/compute_metrics.prof). All stages of a run
+go into one Chrome trace file, open it in chrome://tracing or ui.perfetto.dev.
+
+Code inside a stage can mark sub-steps; outside a profiled stage this is a no-op:
+
+    with profiling.span("load"):
+        df = load_data(path)
+"""
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@dataclass(frozen=True)
+class ProfileOptions:
+    memory: bool = True  # tracemalloc; makes allocation-heavy stages noticeably slower
+    dump_dir: Optional[Path] = None  # cProfile dumps (<stage>.prof)
+
+
+# Events of the stage currently profiled in this process (None: profiling off)
+_events: Optional[List[Dict[str, Any]]] = None
+
+
+def _now_us() -> float:
+    # Epoch-based so events from pool processes line up with the main process
+    return time.time_ns() / 1000
+
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM (Linux), so the next reading is this stage's peak and not the process's."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux, bytes on macOS
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """Nested trace event inside the running stage (args: shown in the trace viewer)."""
+    if _events is None:
+        yield
+        return
+    start = _now_us()
+    try:
+        yield
+    finally:
+        _events.append({
+            "name": name, "cat": "span", "ph": "X", "ts": start, "dur": _now_us() - start,
+            "pid": os.getpid(), "tid": 0, "args": args,
+        })
+
+
+def profile_call(
+    name: str, func: Callable[[], Any], options: ProfileOptions,
+) -> Tuple[Any, List[Dict[str, Any]]]:
+    """Run func() as stage `name`; returns (result, trace events). Raises what func raises."""
+    global _events
+    _events = []
+    rss_reset = _reset_peak_rss()
+    if options.memory:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if options.dump_dir is not None else None
+    start, cpu_start = _now_us(), time.process_time()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            result = func()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    finally:
+        stats: Dict[str, Any] = {"cpu_s": round(time.process_time() - cpu_start, 3)}
+        if options.memory:
+            stats["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            tracemalloc.stop()
+        peak = _peak_rss_mb()
+        if peak is not None:
+            # Without a reset (non-Linux) this is the process's peak so far
+            stats["peak_rss_mb" if rss_reset else "process_peak_rss_mb"] = round(peak, 1)
+        if profiler is not None:
+            options.dump_dir.mkdir(parents=True, exist_ok=True)
+            path = options.dump_dir / f"{name}.prof"
+            profiler.dump_stats(str(path))
+            stats["cprofile"] = str(path)
+        end = _now_us()
+        events, _events = _events, None
+    pid = os.getpid()
+    events.append({
+        "name": name, "cat": "stage", "ph": "X", "ts": start, "dur": end - start, "pid": pid, "tid": 0,
+        "args": stats,
+    })
+    memory = {k: v for k, v in stats.items() if k.endswith("_mb")}
+    if memory:
+        events.append({"name": "memory (MB)", "ph": "C", "ts": end, "pid": pid, "tid": 0, "args": memory})
+    return result, events
+
+
+def stage_summary(events: List[Dict[str, Any]]) -> List[str]:
+    """One line per profiled stage, slowest first."""
+    stages = sorted((e for e in events if e.get("cat") == "stage"), key=lambda e: -e["dur"])
+    lines = []
+    for e in stages:
+        args = e["args"]
+        memory = " ".join(f"{k[:-3]}={v:.0f}MB" for k, v in args.items() if k.endswith("_mb"))
+        lines.append(f"{e['name']:>18}  wall={e['dur'] / 1e6:.2f}s  cpu={args['cpu_s']:.2f}s  {memory}")
+    return lines
+
+
+def write_trace(path: Path, events: List[Dict[str, Any]], process_names: Dict[int, str], metadata: Dict[str, Any]) -> None:
+    """Chrome trace event format (JSON object form); processes without a name are pool workers."""
+    labels = {e["pid"]: f"stage worker {e['pid']}" for e in events}
+    labels.update(process_names)
+    names = [
+        {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": label}}
+        for pid, label in labels.items()
+    ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump({
+            "traceEvents": names + sorted(events, key=lambda e: e["ts"]),
+            "displayTimeUnit": "ms",
+            "otherData": metadata,
+        }, f, ensure_ascii=False)
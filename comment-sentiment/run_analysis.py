@@ -1,11 +1,46 @@
+import argparse
+import json
+import multiprocessing
 import os
-import subprocess
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import partial
 from pathlib import Path
+from typing import Any, Collection, Dict, Iterator, List, Optional, Tuple
 
 import config
+from pipeline import Pipeline, Stage, StageFailed, report_failure
+from profiling import ProfileOptions, stage_summary, write_trace
 
 BASE_DIR = Path(__file__).resolve().parent  # .../comment-sentiment
+DATA_DIR = BASE_DIR / "data"
+OUTPUT_DIR = BASE_DIR / "output"
+SCRIPTS_DIR = BASE_DIR / "scripts"
+
+LOG_DIR = DATA_DIR / "logs"
+PROFILE_DIR = DATA_DIR / "profiles"
+
+DEFAULT_FETCH_INTERVAL_MINUTES = 60
+DEFAULT_API_CONCURRENCY = 2  # channels fetching/annotating at the same time (YouTube + Claude quotas)
+
+# Config names each stage depends on (secrets are never part of a fingerprint)
+FETCH_CONFIG = ["CHANNEL_HANDLE", "WEEKS_BACK", "DAYS_BACK", "MAX_VIDEOS", "MAX_COMMENTS"]
+ANNOTATE_CONFIG = [
+    "CLAUDE_MODEL", "CLAUDE_MODEL_FAST", "CLAUDE_MODEL_STRONG", "BATCH_SIZE", "CLAUDE_MAX_TOKENS", "MAX_RETRIES",
+    "REPAIR_JSON_ENABLED", "CLAUDE_STREAM_ENABLED", "ANNOTATION_MODE", "ANNOTATION_PROMPT_VERSION",
+    "ANNOTATION_CACHE_ENABLED", "PRECLASSIFY_ENABLED", "PRECLASSIFY_THRESHOLD", "PRECLASSIFY_MODEL_PATH",
+    "CLUSTER_ANNOTATION_ENABLED", "CLUSTER_MIN_COMMENTS", "CLUSTER_AVG_SIZE", "CLUSTER_REPRESENTATIVES",
+    "CLUSTER_SIMILARITY_THRESHOLD", "ROUTER_MAX_FAST_CHARS", "TEST_LIMIT",
+]
+METRICS_CONFIG = [
+    "LATEST_WEEKS", "TREND_BASELINE_WEEKS", "METRICS_INCREMENTAL", "METRICS_CHUNK_ROWS", "METRICS_TOPIC_TOP_K",
+    "METRICS_GRANULARITY", "METRICS_ROLLING_WINDOWS", "ANNOTATION_STORE", "ANNOTATION_STORE_DIR",
+]
+REPORT_CONFIG = ["LATEST_WEEKS", "MIN_FOCUS_WEEK_COMMENTS", "PLOT_FORMAT"]
+CHARTS = ["sentiment_trend", "intent_shift"]  # scripts/plots.py (not imported here: matplotlib)
 
 
 def _slugify_channel(handle: str) -> str:
@@ -17,67 +52,308 @@ def _slugify_channel(handle: str) -> str:
     return s or "channel"
 
 
-def run(module: str) -> None:
+def _config(names: List[str]) -> Dict[str, Any]:
+    return {name: getattr(config, name, None) for name in names}
+
+
+# Semaphore shared by all channel processes (None: single channel, no cap needed)
+_API_SLOTS = None
+
+
+def _init_process(channel_handle: str, api_slots: Any = None) -> None:
     """
-    Robust runner:
-    - always uses the current venv interpreter (sys.executable)
-    - forces cwd to the project folder (BASE_DIR), no matter where you run this from
-    - ensures BASE_DIR is on PYTHONPATH so `-m scripts.*` and `import config` work reliably
-    - prints only essentials; on failure prints stdout/stderr and key context
+    Channel / stage process setup. The stage modules derive their paths from
+    config.CHANNEL_HANDLE at import time, so it is set before any of them is imported.
     """
-    cmd = [sys.executable, "-m", module]
+    global _API_SLOTS
+    config.CHANNEL_HANDLE = channel_handle
+    _API_SLOTS = api_slots
+
+
+@contextmanager
+def _api_slot() -> Iterator[None]:
+    if _API_SLOTS is None:
+        yield
+        return
+    with _API_SLOTS:
+        yield
+
+
+# -----------------------------
+# Stages (modules are imported lazily, once per process)
+# -----------------------------
+def fetch(inputs: Dict[str, Any]) -> None:
+    import fetch_comments
+
+    with _api_slot():
+        fetch_comments.main()
+
+
+def annotate(inputs: Dict[str, Any]) -> None:
+    import annotate_comments
+
+    with _api_slot():
+        annotate_comments.main()
+
+
+def sync_store(channel_slug: str, inputs: Dict[str, Any]) -> List[str]:
+    """
+    Sync the Parquet store with the annotated JSON (records appended since the last sync
+    are parsed and added on their own; any other change rewrites only the changed weeks).
+    The slug is bound in build_pipeline: annotation_store.CHANNEL_SLUG is fixed when the
+    module is first imported, which may be before _init_process set the channel.
+    """
+    import annotation_store
+
+    directory = annotation_store.channel_dir(channel_slug)
+    input_path = annotation_store.DATA_DIR / f"annotated_comments_{channel_slug}.json"
+    changed = annotation_store.export_json(input_path, directory)
+    print(f"[store] rewrote {len(changed)} week partitions → {directory}")
+    return changed
+
+
+def compute_metrics(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    from scripts import compute_metrics as cm
+
+    return cm.main([])
+
+
+def plots(inputs: Dict[str, Any]) -> Dict[str, Path]:
+    from scripts import plots as charts
+
+    return charts.render_channel(config.CHANNEL_HANDLE, inputs["compute_metrics"])
+
 
-    env = os.environ.copy()
-    existing = env.get("PYTHONPATH", "")
-    env["PYTHONPATH"] = str(BASE_DIR) + (os.pathsep + existing if existing else "")
+def report(inputs: Dict[str, Any]) -> Path:
+    import generate_report
 
+    return generate_report.write_report(inputs["compute_metrics"])
+
+
+def html(inputs: Dict[str, Any]) -> Path:
+    import generate_html
+
+    return generate_html.main(inputs["report"])
+
+
+def build_pipeline(channel_slug: str, with_fetch: bool = False) -> Pipeline:
+    raw_path = DATA_DIR / f"raw_comments_{channel_slug}.json"
+    annotated_path = DATA_DIR / f"annotated_comments_{channel_slug}.json"
+    metrics_path = DATA_DIR / f"aggregated_metrics_{channel_slug}.json"
+    report_path = OUTPUT_DIR / f"report_{channel_slug}_{date.today().isoformat()}.md"
+    plot_format = str(getattr(config, "PLOT_FORMAT", "png")).strip().lower()
+    chart_paths = [OUTPUT_DIR / f"{chart}_{channel_slug}.{plot_format}" for chart in CHARTS]
+
+    def load_metrics() -> Dict[str, Any]:
+        with metrics_path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    stages: List[Stage] = []
+    metrics_deps: List[str] = []
+    metrics_input = annotated_path
+
+    if with_fetch:
+        interval = 60 * int(getattr(config, "PIPELINE_FETCH_INTERVAL_MINUTES", DEFAULT_FETCH_INTERVAL_MINUTES))
+        stages += [
+            # YouTube is the input: fetch again once per interval, downstream stages skip if nothing changed
+            Stage("fetch", fetch, outputs=[raw_path],
+                  params={**_config(FETCH_CONFIG), "interval": int(time.time() // interval) if interval > 0 else time.time()},
+                  code=[BASE_DIR / "fetch_comments.py"]),
+            Stage("annotate", annotate, ("fetch",), inputs=[raw_path], outputs=[annotated_path],
+                  params=_config(ANNOTATE_CONFIG),
+                  code=[BASE_DIR / m for m in ("annotate_comments.py", "annotation_cache.py", "model_router.py",
+                                               "preclassify.py", "cluster_annotate.py")]),
+        ]
+        metrics_deps.append("annotate")
+
+    if str(getattr(config, "ANNOTATION_STORE", "json")).strip().lower() == "parquet":
+        import annotation_store
+
+        manifest = annotation_store.channel_dir(channel_slug) / annotation_store.MANIFEST_NAME
+        stages.append(Stage("sync_store", partial(sync_store, channel_slug), tuple(metrics_deps), inputs=[annotated_path], outputs=[manifest],
+                            params=_config(["ANNOTATION_STORE_DIR"]), code=[BASE_DIR / "annotation_store.py"]))
+        metrics_deps, metrics_input = ["sync_store"], manifest
+
+    stages += [
+        Stage("compute_metrics", compute_metrics, tuple(metrics_deps), inputs=[metrics_input],
+              outputs=[metrics_path, DATA_DIR / f"comment_cube_{channel_slug}.npz",
+                       DATA_DIR / f"topic_index_{channel_slug}.npz"],
+              params=_config(METRICS_CONFIG),
+              code=[SCRIPTS_DIR / m for m in ("compute_metrics.py", "metrics_partials.py", "comment_cube.py",
+                                              "topic_index.py")] + [BASE_DIR / "annotation_store.py"],
+              load=load_metrics),
+        Stage("plots", plots, ("compute_metrics",), inputs=[metrics_path],
+              outputs=chart_paths,
+              params=_config(["CHANNEL_HANDLE", "PLOT_FORMAT"]), code=[SCRIPTS_DIR / "plots.py"]),
+        Stage("report", report, ("compute_metrics",), inputs=[metrics_path], outputs=[report_path],
+              params=_config(REPORT_CONFIG), code=[BASE_DIR / "generate_report.py", BASE_DIR / "templates" / "report.md"],
+              load=lambda: report_path),
+        # Charts are inlined into the HTML, so it waits for both
+        Stage("html", html, ("report", "plots"), inputs=[report_path] + chart_paths,
+              outputs=[OUTPUT_DIR / f"report_{channel_slug}.html"],
+              code=[BASE_DIR / "generate_html.py", BASE_DIR / "generate_report.py", BASE_DIR / "templates" / "report.html"]),
+    ]
+    return Pipeline(stages, state_path=DATA_DIR / f"pipeline_state_{channel_slug}.json")
+
+
+def run_channel(
+    channel_handle: str,
+    with_fetch: bool = False,
+    force: Optional[Collection[str]] = None,
+    workers: int = 1,
+    api_slots: Any = None,
+    only: Optional[List[str]] = None,
+    profile: Optional[ProfileOptions] = None,
+) -> Dict[str, Any]:
+    """
+    Run one channel's pipeline (force=None: all stages); independent stages use `workers`
+    processes. With `profile`, a Chrome trace of the run goes to data/profiles/<slug>/.
+    """
+    _init_process(channel_handle, api_slots)
+    channel_slug = _slugify_channel(channel_handle)
+    pipeline = build_pipeline(channel_slug, with_fetch=with_fetch)
+    if profile is not None and profile.dump_dir is not None:
+        profile = ProfileOptions(profile.memory, PROFILE_DIR / channel_slug)
+    started = datetime.now()
     try:
-        subprocess.run(
-            cmd,
-            cwd=str(BASE_DIR),
-            env=env,
-            check=True,
-            text=True,
-        )
-    except subprocess.CalledProcessError as e:
-        print(f"\nERROR: Module failed: {module}")
-        print(f"Command: {' '.join(cmd)}")
-        print(f"CWD: {BASE_DIR}")
-        print(f"Python: {sys.executable}")
-        print(f"PYTHONPATH: {env.get('PYTHONPATH', '')}")
-
-        # Re-run with captured output for a readable error report
-        r = subprocess.run(
-            cmd,
-            cwd=str(BASE_DIR),
-            env=env,
-            text=True,
-            capture_output=True,
+        return pipeline.run(
+            only=only,
+            force=set(pipeline.stages) if force is None else force,
+            workers=workers,
+            initializer=_init_process,
+            initargs=(channel_handle, api_slots),
+            profile=profile,
         )
-        if r.stdout:
-            print("\n--- STDOUT ---")
-            print(r.stdout.strip())
-        if r.stderr:
-            print("\n--- STDERR ---")
-            print(r.stderr.strip())
+    finally:
+        if profile is not None and pipeline.trace_events:
+            trace_path = PROFILE_DIR / channel_slug / f"trace_{started:%Y%m%d-%H%M%S}.json"
+            write_trace(trace_path, pipeline.trace_events, {os.getpid(): f"run_analysis {channel_handle}"}, {
+                "channel": channel_handle,
+                "started_at": started.isoformat(timespec="seconds"),
+                "workers": workers,
+                "tracemalloc": profile.memory,
+            })
+            print("\n[profile] " + "\n[profile] ".join(stage_summary(pipeline.trace_events)))
+            print(f"[profile] trace written to {trace_path} (chrome://tracing, ui.perfetto.dev)")
 
-        raise SystemExit(e.returncode)
+
+def _run_channel_logged(
+    channel_handle: str,
+    with_fetch: bool,
+    force: Optional[Collection[str]],
+    workers: int,
+    only: Optional[List[str]],
+    profile: Optional[ProfileOptions],
+) -> Tuple[str, Optional[str], float, Path]:
+    """Channel process entry point: output goes to a log file; returns (handle, failed stage, seconds, log)."""
+    log_path = LOG_DIR / f"run_analysis_{_slugify_channel(channel_handle)}.log"
+    start = time.perf_counter()
+    failed = None
+    with log_path.open("w", encoding="utf-8") as log:
+        sys.stdout = sys.stderr = log
+        print(f"Channel: {channel_handle} ({date.today().isoformat()})")
+        try:
+            run_channel(channel_handle, with_fetch, force, workers, _API_SLOTS, only, profile)
+        except StageFailed as e:
+            report_failure(e)
+            failed = e.stage
+        except Exception as e:  # e.g. a broken config for this channel; the other channels go on
+            print(f"ERROR: {e!r}")
+            failed = "?"
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    return channel_handle, failed, time.perf_counter() - start, log_path
+
+
+def run_channels(
+    channel_handles: List[str],
+    with_fetch: bool,
+    force: Optional[Collection[str]],
+    jobs: int,
+    api_concurrency: int,
+    only: Optional[List[str]] = None,
+    profile: Optional[ProfileOptions] = None,
+) -> List[str]:
+    """
+    One process per channel (at most `jobs` at a time, each a fresh interpreter so
+    module-level paths match its channel); API stages share `api_concurrency` slots.
+    Returns the handles of failed channels.
+    """
+    jobs = max(1, min(jobs, len(channel_handles)))
+    workers = max(1, (os.cpu_count() or 1) // jobs)  # spare cores go to stages within a channel
+    context = multiprocessing.get_context("spawn")
+    api_slots = context.BoundedSemaphore(max(1, api_concurrency))
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    print(f"{len(channel_handles)} channels, {jobs} at a time, {api_concurrency} API slots, logs: {LOG_DIR}")
+
+    failed: List[str] = []
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=context, max_tasks_per_child=1,
+        initializer=_init_process, initargs=("", api_slots),
+    ) as pool:
+        futures = [pool.submit(_run_channel_logged, h, with_fetch, force, workers, only, profile) for h in channel_handles]
+        for future in as_completed(futures):
+            handle, stage, seconds, log_path = future.result()
+            if stage:
+                failed.append(handle)
+                print(f"[FAILED] {handle}: stage {stage} after {seconds:.1f}s (see {log_path.name})")
+            else:
+                print(f"[ok] {handle} in {seconds:.1f}s")
+    return failed
 
 
 def main() -> None:
-    channel_handle = getattr(config, "CHANNEL_HANDLE", "")
-    if not channel_handle:
+    parser = argparse.ArgumentParser(description="Run the analysis pipeline (stages whose inputs are unchanged are skipped).")
+    parser.add_argument("--channels", nargs="+", metavar="HANDLE",
+                        help="channels to analyse (default: CHANNEL_HANDLES or CHANNEL_HANDLE from config.py)")
+    parser.add_argument("--fetch", action="store_true", help="fetch + annotate new comments first (YouTube / Claude API)")
+    parser.add_argument("--force", nargs="*", metavar="STAGE",
+                        help="re-run stages even if unchanged (no names: all stages)")
+    parser.add_argument("--only", nargs="+", metavar="STAGE", help="run only these stages (+ their dependencies)")
+    parser.add_argument("--profile", action="store_true",
+                        help="per-stage wall/CPU time + memory peaks, Chrome trace in data/profiles/<slug>/")
+    parser.add_argument("--cprofile", action="store_true", help="with --profile: also dump cProfile stats per stage")
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="with --profile: skip Python allocation tracking (lower overhead, RSS only)")
+    parser.add_argument("--jobs", type=int, default=int(getattr(config, "PIPELINE_JOBS", 0) or os.cpu_count() or 1),
+                        help="processes: channels in parallel, or stages of a single channel")
+    parser.add_argument("--api-concurrency", type=int,
+                        default=int(getattr(config, "PIPELINE_API_CONCURRENCY", DEFAULT_API_CONCURRENCY)),
+                        help="channels fetching/annotating at the same time")
+    args = parser.parse_args()
+
+    channel_handles = args.channels or list(getattr(config, "CHANNEL_HANDLES", None) or [])
+    if not channel_handles:
+        channel_handles = [getattr(config, "CHANNEL_HANDLE", "")]
+    if not all(channel_handles):
         raise ValueError("CHANNEL_HANDLE missing in config.py")
+    # One pipeline per slug (state and output files are per slug)
+    channel_handles = list({_slugify_channel(h): h for h in channel_handles}.values())
 
-    channel_slug = _slugify_channel(channel_handle)
-    print(f"Channel: {channel_handle} (slug: {channel_slug})")
+    stage_names = build_pipeline(_slugify_channel(channel_handles[0]), with_fetch=args.fetch).order
+    force = None if args.force == [] else set(args.force or ())
+    for option, names in (("--force", force), ("--only", args.only)):
+        unknown = set(names or ()) - set(stage_names)
+        if unknown:
+            parser.error(f"unknown stage(s) for {option}: {', '.join(sorted(unknown))} (stages: {', '.join(stage_names)})")
+    profile = None
+    if args.profile or args.cprofile:
+        profile = ProfileOptions(memory=not args.no_tracemalloc, dump_dir=PROFILE_DIR if args.cprofile else None)
 
-    # 1) compute metrics
-    run("scripts.compute_metrics")
+    if len(channel_handles) > 1:
+        failed = run_channels(channel_handles, args.fetch, force, args.jobs, args.api_concurrency, args.only, profile)
+        if failed:
+            raise SystemExit(1)
+        print("Done.")
+        return
 
-    # 2) plots
-    run("scripts.plot_trends")
-    run("scripts.plot_intent_shift")
+    channel_handle = channel_handles[0]
+    print(f"Channel: {channel_handle} (slug: {_slugify_channel(channel_handle)})")
+    try:
+        run_channel(channel_handle, args.fetch, force, max(1, args.jobs), only=args.only, profile=profile)
+    except StageFailed as e:
+        report_failure(e)
+        raise SystemExit(1)
 
     print("Done.")
 
@@ -0,0 +1,155 @@
+"""
+Array-backed comment cube for drill-downs without touching raw comments.
+
+compute_metrics writes data/comment_cube_<slug>.npz: a sparse (COO) cube over
+week x video x sentiment x intent_group x topic (primary topic, like issues),
+with comment counts and emotion sums per non-empty cell.
+
+    python -m scripts.comment_cube --intent-group critical --by week video
+    python -m scripts.comment_cube --week 2025-03-03/2025-03-09 --intent-group critical --by video --top 5
+
+    cube = CommentCube.load(path)
+    cube.slice(by=["video"], week="2025-03-03/2025-03-09", intent_group="critical")
+"""
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+DIMS = ("week", "video", "sentiment", "intent_group", "topic")
+MISSING = ""  # label for missing video / topic
+
+
+class CommentCube:
+    """COO layout: coords[i, d] indexes labels[DIMS[d]], one row per non-empty cell."""
+
+    def __init__(self, labels: Dict[str, np.ndarray], coords: np.ndarray, count: np.ndarray,
+                 emo_units: np.ndarray, emotion_scale: int):
+        self.labels = labels
+        self.coords = coords
+        self.count = count
+        self.emo_units = emo_units
+        self.emotion_scale = emotion_scale
+        self._codes = {dim: {label: i for i, label in enumerate(labels[dim])} for dim in DIMS}
+
+    @classmethod
+    def from_cells(cls, cells: pd.DataFrame, intent_groups: pd.Series, emotion_scale: int) -> "CommentCube":
+        """Weekly cube cells (compute_metrics) -> COO cube; intents are folded into their group."""
+        cells = cells[cells["week_period"].notna()]
+        grouped = (
+            pd.DataFrame({
+                "week": cells["week_period"].astype(str),
+                "video": cells["video_id"].fillna(MISSING).astype(str),
+                "sentiment": cells["sentiment"].astype(str),
+                "intent_group": intent_groups.loc[cells.index].astype(str),
+                "topic": cells["topic"].fillna(MISSING).astype(str),
+                "count": cells["count"],
+                "emo_units": cells["emo_units"],
+            })
+            .groupby(list(DIMS))[["count", "emo_units"]]  # several intents share a group
+            .sum()
+            .reset_index()
+        )
+
+        labels: Dict[str, np.ndarray] = {}
+        codes = []
+        for dim in DIMS:
+            dim_codes, uniques = pd.factorize(grouped[dim], sort=True)
+            labels[dim] = np.asarray(uniques, dtype=str)
+            codes.append(dim_codes.astype(np.int32))
+        coords = np.column_stack(codes).reshape(-1, len(DIMS))
+        return cls(
+            labels, coords,
+            grouped["count"].to_numpy(dtype=np.int64), grouped["emo_units"].to_numpy(dtype=np.int64),
+            emotion_scale,
+        )
+
+    def save(self, path: Path) -> None:
+        np.savez_compressed(
+            path,
+            coords=self.coords,
+            count=self.count,
+            emo_units=self.emo_units,
+            emotion_scale=np.int64(self.emotion_scale),
+            **{f"labels_{dim}": self.labels[dim] for dim in DIMS},
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "CommentCube":
+        with np.load(path) as data:
+            return cls(
+                {dim: data[f"labels_{dim}"] for dim in DIMS},
+                data["coords"], data["count"], data["emo_units"], int(data["emotion_scale"]),
+            )
+
+    def _mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(len(self.count), dtype=bool)
+        for dim, value in filters.items():
+            if dim not in DIMS:
+                raise ValueError(f"Unknown dimension {dim!r} (expected one of {DIMS})")
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            wanted = [self._codes[dim][v] for v in values if v in self._codes[dim]]
+            mask &= np.isin(self.coords[:, DIMS.index(dim)], wanted)
+        return mask
+
+    def slice(self, by: Sequence[str] = (), **filters: Any) -> pd.DataFrame:
+        """
+        Sum over every dimension not in `by`, keeping cells that match `filters`
+        (dim=label or dim=[labels]). Returns by-columns + comments, avg_emotion, share.
+        """
+        by = list(by)
+        mask = self._mask(filters)
+        count, emo = self.count[mask], self.emo_units[mask]
+        total = int(count.sum())
+
+        if by:
+            sub = self.coords[mask][:, [DIMS.index(d) for d in by]]
+            groups, inverse = np.unique(sub, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            count = np.bincount(inverse, weights=count, minlength=len(groups)).astype(np.int64)
+            emo = np.bincount(inverse, weights=emo, minlength=len(groups))
+            out = pd.DataFrame({d: self.labels[d][groups[:, i]] for i, d in enumerate(by)})
+        else:
+            count, emo = np.array([total], dtype=np.int64), np.array([emo.sum()])
+            out = pd.DataFrame(index=[0])
+
+        out["comments"] = count
+        out["avg_emotion"] = np.where(count > 0, emo / np.maximum(count, 1) / self.emotion_scale, 0.0).round(2)
+        out["share"] = (count / total).round(3) if total else 0.0
+        return out.sort_values("comments", ascending=False, kind="stable").reset_index(drop=True)
+
+    def top(self, dim: str, n: int = 5, **filters: Any) -> pd.DataFrame:
+        return self.slice(by=[dim], **filters).head(n)
+
+    def to_sparse(self, row_dim: str, col_dim: str, **filters: Any):
+        """2-D scipy.sparse count matrix (row_dim x col_dim) for matrix-style analysis."""
+        from scipy import sparse
+
+        mask = self._mask(filters)
+        r, c = DIMS.index(row_dim), DIMS.index(col_dim)
+        shape = (len(self.labels[row_dim]), len(self.labels[col_dim]))
+        return sparse.coo_matrix((self.count[mask], (self.coords[mask, r], self.coords[mask, c])), shape=shape).tocsr()
+
+
+def main() -> None:
+    from scripts.compute_metrics import COMMENT_CUBE_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", type=Path, default=COMMENT_CUBE_PATH)
+    parser.add_argument("--by", nargs="*", default=["week"], choices=DIMS)
+    parser.add_argument("--top", type=int, default=20)
+    for dim in DIMS:
+        parser.add_argument(f"--{dim.replace('_', '-')}", nargs="+", dest=dim, help=f"filter on {dim}")
+    args = parser.parse_args()
+
+    cube = CommentCube.load(args.path)
+    filters: Dict[str, Optional[List[str]]] = {dim: getattr(args, dim) for dim in DIMS}
+    print(cube.slice(by=args.by, **filters).head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
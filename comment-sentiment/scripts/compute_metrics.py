@@ -1,12 +1,20 @@
+import argparse
 import json
 import config
+import numpy as np
 import pandas as pd
-from collections import Counter
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
-from pandas.api.types import DatetimeTZDtype
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 from dateutil.parser import isoparse
 
+import annotation_store
+import profiling
+from scripts import metrics_partials as partials
+from scripts.comment_cube import CommentCube
+from scripts.metric_snapshots import SnapshotStore, final_weeks
+from scripts.topic_index import TopicIndex, TopicVocabulary
+
 # --- Intent Shift mapping (MVP-stable) ---
 INTENT_GROUPS = {
     "praise": "supportive",
@@ -17,7 +25,20 @@ INTENT_GROUPS = {
 }
 
 CRITICAL_INTENTS = {"constructive_criticism", "aggressive_criticism"}
+
+# Emotion sums are kept as integer micro-units: exact and order-independent,
+# so week/issue averages don't depend on how the cube was summed up.
+EMOTION_SCALE = 1_000_000
+VOTE_POSITION_STRIDE = 1_000  # topic vote position = source row * stride + rank within the comment
+CELL_KEYS = ["week_period", "video_id", "sentiment", "intent", "topic"]
+PRUNED_TOPIC = "\x00pruned"  # placeholder for topic votes dropped by prune_topic_votes()
 DEFAULT_LATEST_WEEKS = 3
+DEFAULT_TREND_BASELINE_WEEKS = 1  # 1 = week-over-week
+DEFAULT_GRANULARITY = "day"
+DEFAULT_ROLLING_WINDOWS = ["24h", "7d"]
+GRANULARITY_HOURS = {"hour": 1, "day": 24, "week": 168}
+WINDOW_UNIT_HOURS = {"h": 1, "d": 24, "w": 168}
+TIMELINE_MEASURES = ["count", "emo_units", "aggressive", "critical", "negative", "negative_emo_units"]
 
 def _get_cfg_int(name: str, default: int) -> int:
     try:
@@ -26,6 +47,17 @@ def _get_cfg_int(name: str, default: int) -> int:
         return default
 
 LATEST_WEEKS = _get_cfg_int("LATEST_WEEKS", DEFAULT_LATEST_WEEKS)
+TREND_BASELINE_WEEKS = max(1, _get_cfg_int("TREND_BASELINE_WEEKS", DEFAULT_TREND_BASELINE_WEEKS))
+INCREMENTAL = bool(getattr(config, "METRICS_INCREMENTAL", True))  # reuse per-week partials of unchanged weeks
+SNAPSHOTS = bool(getattr(config, "METRICS_SNAPSHOTS", True))  # keep every week's metrics (past-week reports)
+CHUNK_ROWS = _get_cfg_int("METRICS_CHUNK_ROWS", 0)  # > 0: bounded-memory streaming mode
+TOPIC_TOP_K = _get_cfg_int("METRICS_TOPIC_TOP_K", 0)  # > 0: prune topic votes per week in streaming mode
+STORE = annotation_store.STORE  # "json" | "parquet"
+GRANULARITY = str(getattr(config, "METRICS_GRANULARITY", DEFAULT_GRANULARITY)).strip().lower()  # timeline buckets
+ROLLING_WINDOWS = list(getattr(config, "METRICS_ROLLING_WINDOWS", DEFAULT_ROLLING_WINDOWS))
+
+# Columns compute_metrics needs from the Parquet store (text is replaced by has_text)
+METRIC_COLUMNS = ["published_at", "video_id", "sentiment", "intent", "emotion_intensity", "key_topics", "has_text"]
 
 def _slugify_channel(handle: str) -> str:
     s = (handle or "").strip()
@@ -47,6 +79,12 @@ DATA_DIR.mkdir(exist_ok=True)
 
 INPUT_PATH = DATA_DIR / f"annotated_comments_{CHANNEL_SLUG}.json"
 OUTPUT_PATH = DATA_DIR / f"aggregated_metrics_{CHANNEL_SLUG}.json"
+COMMENT_CUBE_PATH = DATA_DIR / f"comment_cube_{CHANNEL_SLUG}.npz"
+TOPIC_INDEX_PATH = DATA_DIR / f"topic_index_{CHANNEL_SLUG}.npz"
+TOPIC_IDS_PATH = DATA_DIR / "topic_ids.sqlite"  # shared across channels
+SNAPSHOTS_PATH = DATA_DIR / "metric_snapshots.sqlite"  # shared across channels, see scripts/metric_snapshots.py
+PARTIALS_DIR = DATA_DIR / f"metrics_partials_{CHANNEL_SLUG}"
+CHANGELOG_PATH = DATA_DIR / f"metrics_changelog_{CHANNEL_SLUG}.jsonl"
 
 
 def load_data(path: Path) -> pd.DataFrame:
@@ -55,32 +93,104 @@ def load_data(path: Path) -> pd.DataFrame:
     return pd.DataFrame(data)
 
 
-def prepare_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    # Parse published_at
-    df["published_at"] = df["published_at"].apply(isoparse)
+def iter_json_records(path: Path, block_size: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+    """
+    Stream objects from a JSON array file or a JSONL file without loading it
+    as a whole (the annotated JSON is one big array).
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    with path.open("r", encoding="utf-8") as f:
+        eof = False
+        while not eof:
+            block = f.read(block_size)
+            eof = not block
+            buffer += block
+            pos = 0
+            while True:
+                # skip array brackets, separators and whitespace between objects
+                while pos < len(buffer) and buffer[pos] in "[], \t\r\n":
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                try:
+                    obj, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    break  # object continues in the next block
+                yield obj
+                pos = end
+            buffer = buffer[pos:]
+
+
+def iter_chunks(records: Iterable[Dict[str, Any]], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Records -> DataFrames of chunk_rows, indexed by their position in the source."""
+    offset = 0
+    batch: List[Dict[str, Any]] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= chunk_rows:
+            yield pd.DataFrame(batch, index=pd.RangeIndex(offset, offset + len(batch)))
+            offset += len(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, index=pd.RangeIndex(offset, offset + len(batch)))
+
+
+def _parse_iso_fallback(value: Any):
+    try:
+        return isoparse(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
 
-    # Ensure pandas datetime dtype
-    df["published_at"] = pd.to_datetime(df["published_at"], errors="coerce")
 
-    # Normalize timezone handling to avoid Period tz-drop warning:
-    # 1) convert to Europe/Berlin if tz-aware
-    # 2) drop tz info (PeriodIndex has no timezone)
-    # If tz-aware -> convert and drop tz
-    if isinstance(df["published_at"].dtype, DatetimeTZDtype):
-        df["published_at"] = df["published_at"].dt.tz_convert("Europe/Berlin").dt.tz_localize(None)
+def parse_published_at_utc(values: pd.Series) -> pd.Series:
+    """
+    ISO-8601 strings (or already parsed timestamps) -> tz-aware UTC.
+    Vectorized parse; only rows it can't handle go through isoparse. Naive
+    timestamps are read as UTC (the YouTube API always sends UTC).
+    """
+    parsed = pd.to_datetime(values, utc=True, format="ISO8601", errors="coerce")
 
-    else:
-        # if tz-naive, keep as-is (already local-naive)
-        df["published_at"] = df["published_at"]
+    failed = parsed.isna() & values.notna()
+    if failed.any():
+        parsed.loc[failed] = pd.to_datetime(values[failed].map(_parse_iso_fallback), utc=True, errors="coerce")
+    return parsed
+
+
+def parse_published_at(values: pd.Series) -> pd.Series:
+    """Europe/Berlin local time, tz-naive (PeriodIndex has no timezone)."""
+    return parse_published_at_utc(values).dt.tz_convert("Europe/Berlin").dt.tz_localize(None)
+
+
+def _period_labels(periods: pd.Series) -> pd.Series:
+    """Same as periods.astype(str), but formats each distinct week only once."""
+    codes, uniques = pd.factorize(periods)
+    labels = np.array([str(p) for p in uniques] + [np.nan], dtype=object)  # code -1 = NaT
+    return pd.Series(labels[codes], index=periods.index, dtype=str)
+
+
+def _normalize_labels(values: pd.Series) -> pd.Series:
+    """strip + lower; categoricals (Parquet store) are normalized per category, not per row."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories.astype(str).str.strip().str.lower()
+        labels = np.append(categories.to_numpy(dtype=object), np.nan)  # code -1 = missing
+        return pd.Series(labels[values.cat.codes.to_numpy()], index=values.index, dtype=str)
+    return values.astype(str).str.strip().str.lower()
+
+
+def prepare_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    df["published_at"] = parse_published_at(df["published_at"])
 
     # Keep a real time key for sorting/grouping
     df["week_period"] = df["published_at"].dt.to_period("W")
-    df["week"] = df["week_period"].astype(str)  # label only
+    df["week"] = _period_labels(df["week_period"])  # label only
 
 
     # Normalize strings
-    df["sentiment"] = df["sentiment"].astype(str).str.strip().str.lower()
-    df["intent"] = df["intent"].astype(str).str.strip().str.lower()
+    df["sentiment"] = _normalize_labels(df["sentiment"])
+    df["intent"] = _normalize_labels(df["intent"])
 
     # Ensure emotion intensity exists and is numeric
     if "emotion_intensity" not in df.columns:
@@ -106,159 +216,318 @@ def restrict_to_latest_weeks(df: pd.DataFrame, n_weeks: int) -> pd.DataFrame:
     return df[df["week_period"].isin(keep)].copy()
 
 
-def sentiment_trend(df: pd.DataFrame) -> pd.DataFrame:
-    trend = (
-        df.groupby(["week_period", "sentiment"])
-        .size()
-        .reset_index(name="count")
-    )
-    trend["ratio"] = trend["count"] / trend.groupby("week_period")["count"].transform("sum")
+def _has_text(df: pd.DataFrame):
+    if "has_text" in df.columns:  # Parquet store: text itself is not read for metrics
+        return df["has_text"].astype(bool)
+    return df["text"].notna() if "text" in df.columns else True
 
-    # Stable sort + label for plotting/reporting
-    trend = trend.sort_values(["week_period", "sentiment"]).reset_index(drop=True)
-    trend["week"] = trend["week_period"].astype(str)
-    return trend
 
+def build_weekly_cube(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Single pass over the comments. Every JSON section is derived from this cube:
+    - cells: (week_period, video_id, sentiment, intent, primary topic) -> count, text_count, emo_units
+    - topic_votes: critical-intent topic votes per week (1 vote per topic per comment),
+      with the position of the first vote so ties keep Counter.most_common order
+    - topic_pairs: (week_period, topic_a < topic_b) -> comments of any intent mentioning both
+    - timeline: (week_period, local hour) -> counts + emotion sums for the escalation/emotion
+      signals, the base of every finer granularity and rolling window (see timeline())
+
+    The index must be the row position in the source file, so that cubes built from
+    different subsets (weeks, chunks) can be concatenated.
+    """
+    topics = df["key_topics"] if "key_topics" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    has_topics = topics.map(lambda t: isinstance(t, list) and len(t) > 0).astype(bool)
+
+    frame = pd.DataFrame({
+        "week_period": df["week_period"],
+        "video_id": df["video_id"].astype(object) if "video_id" in df.columns else None,
+        "sentiment": df["sentiment"],
+        "intent": df["intent"],
+        "topic": topics[has_topics].str[0].reindex(df.index),
+        "has_text": _has_text(df),
+        "emo_units": (df["emotion_intensity"] * EMOTION_SCALE).round().astype("int64"),
+    })
+    cells = (
+        frame
+        .groupby(CELL_KEYS, dropna=False)
+        .agg(
+            count=("emo_units", "size"),
+            text_count=("has_text", "sum"),
+            emo_units=("emo_units", "sum"),
+        )
+        .reset_index()
+    )
+
+    unique_topics = topics[has_topics].map(lambda t: list(set(t))).explode()
+    unique_topics = unique_topics[unique_topics.notna()]
+
+    critical = df["intent"].isin(CRITICAL_INTENTS)
+    votes = unique_topics[critical.reindex(unique_topics.index).to_numpy(dtype=bool)]
+    rank = votes.groupby(level=0).cumcount().to_numpy()
+    votes = pd.DataFrame({
+        "week_period": df["week_period"].reindex(votes.index).to_numpy(),
+        "topic": votes.to_numpy(),
+        "position": votes.index.to_numpy(dtype="int64") * VOTE_POSITION_STRIDE + rank,
+    })
+    topic_votes = (
+        votes
+        .groupby(["week_period", "topic"], dropna=False)
+        .agg(count=("position", "size"), first=("position", "min"))
+        .reset_index()
+    )
 
-def intent_distribution(df: pd.DataFrame) -> pd.DataFrame:
-    dist = (
-        df.groupby(["week_period", "intent"])
+    mentions = pd.DataFrame({"row": unique_topics.index, "topic": unique_topics.astype(str).to_numpy()})
+    pairs = mentions.merge(mentions, on="row", suffixes=("_a", "_b"))
+    pairs = pairs[pairs["topic_a"] < pairs["topic_b"]]
+    topic_pairs = (
+        pairs
+        .assign(week_period=df["week_period"].reindex(pairs["row"]).to_numpy())
+        .groupby(["week_period", "topic_a", "topic_b"], dropna=False)
         .size()
         .reset_index(name="count")
     )
-    dist["ratio"] = dist["count"] / dist.groupby("week_period")["count"].transform("sum")
+    timed = df["published_at"].notna().to_numpy()
+    negative = (df["sentiment"] == "negative").to_numpy()
+    emo_units = frame["emo_units"].to_numpy()
+    hours = pd.DataFrame({
+        "week_period": df["week_period"],
+        "hour": df["published_at"].to_numpy(dtype="datetime64[h]").astype(np.int64),  # hours since epoch (local)
+        "count": 1,
+        "emo_units": emo_units,
+        "aggressive": (df["intent"] == "aggressive_criticism").to_numpy(dtype=np.int64),
+        "critical": df["intent"].isin(CRITICAL_INTENTS).to_numpy(dtype=np.int64),
+        "negative": negative.astype(np.int64),
+        "negative_emo_units": np.where(negative, emo_units, 0),
+    })
+    timeline = hours[timed].groupby(["week_period", "hour"]).sum().reset_index()
+
+    return {"cells": cells, "topic_votes": topic_votes, "topic_pairs": topic_pairs, "timeline": timeline}
+
+
+def merge_cubes(cubes: Iterable[Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    """Combine cubes of disjoint comment subsets (chunks, weeks): counts/sums add up, first votes take the min."""
+    cubes = list(cubes)
+    cells = pd.concat([c["cells"] for c in cubes], ignore_index=True)
+    votes = pd.concat([c["topic_votes"] for c in cubes], ignore_index=True)
+    pairs = pd.concat([c["topic_pairs"] for c in cubes], ignore_index=True)
+    return {
+        "cells": (
+            cells
+            .groupby(CELL_KEYS, dropna=False)[["count", "text_count", "emo_units"]]
+            .sum()
+            .reset_index()
+        ),
+        "topic_votes": (
+            votes
+            .groupby(["week_period", "topic"], dropna=False)
+            .agg(count=("count", "sum"), first=("first", "min"))
+            .reset_index()
+        ),
+        "topic_pairs": pairs.groupby(["week_period", "topic_a", "topic_b"], dropna=False)["count"].sum().reset_index(),
+        "timeline": pd.concat([c["timeline"] for c in cubes], ignore_index=True)
+        .groupby(["week_period", "hour"]).sum().reset_index(),
+    }
+
+
+def prune_topic_votes(votes: pd.DataFrame, top_k: int) -> pd.DataFrame:
+    """
+    Keep the top_k topics per week; the rest is folded into one PRUNED_TOPIC row so
+    totals (dominance) stay exact. Rankings are exact as long as no pruned topic
+    would have climbed back into the top later on.
+    """
+    ranked = votes.sort_values(["week_period", "count", "first"], ascending=[True, False, True])
+    rank = ranked.groupby("week_period", dropna=False).cumcount()
+    keep = ranked[(rank < top_k) & (ranked["topic"] != PRUNED_TOPIC)]
+    rest = ranked.drop(index=keep.index)
+    if rest.empty:
+        return votes
+    folded = (
+        rest.groupby("week_period", dropna=False)
+        .agg(count=("count", "sum"), first=("first", "max"))
+        .reset_index()
+        .assign(topic=PRUNED_TOPIC)
+    )
+    return pd.concat([keep, folded[votes.columns]], ignore_index=True)
 
-    # Stable sort + label
-    dist = dist.sort_values(["week_period", "intent"]).reset_index(drop=True)
-    dist["week"] = dist["week_period"].astype(str)
-    return dist
 
+def restrict_cube_to_latest_weeks(cube: Dict[str, pd.DataFrame], n_weeks: int) -> Dict[str, pd.DataFrame]:
+    """restrict_to_latest_weeks() applied to an aggregated cube."""
+    weeks = sorted(cube["cells"]["week_period"].dropna().unique())
+    if n_weeks <= 0 or len(weeks) <= n_weeks:
+        return cube
+    keep = set(weeks[-n_weeks:])
+    return {name: frame[frame["week_period"].isin(keep)] for name, frame in cube.items()}
 
-def intent_shift(df: pd.DataFrame) -> pd.DataFrame:
-    temp = df.copy()
-    temp["intent_group"] = temp["intent"].map(INTENT_GROUPS).fillna("other")
 
-    grouped = (
-        temp.groupby(["week_period", "intent_group"])
-        .size()
+def chunked_cube(chunks: Iterable[pd.DataFrame], topic_top_k: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    Bounded-memory cube: one chunk of raw comments at a time (indexed by source
+    row), merged into a running cube whose size depends on weeks x labels x
+    topics, not on the number of comments.
+    """
+    cube = None
+    for chunk in chunks:
+        part = build_weekly_cube(prepare_dataframe(chunk))
+        cube = part if cube is None else merge_cubes([cube, part])
+        if topic_top_k > 0:
+            cube["topic_votes"] = prune_topic_votes(cube["topic_votes"], topic_top_k)
+    if cube is None:
+        raise ValueError("No comments to aggregate")
+    return cube
+
+
+def _avg_emotion(emo_units, count):
+    return emo_units / (count * EMOTION_SCALE)
+
+
+def _weekly_cells(cube: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    cells = cube["cells"]
+    return cells[cells["week_period"].notna()]
+
+
+def _weekly_counts(cube: Dict[str, pd.DataFrame], key: str, values: pd.Series = None) -> pd.DataFrame:
+    """Per-week counts + ratios for one dimension of the cube (values overrides the key column)."""
+    cells = _weekly_cells(cube)
+    keys = cells[key] if values is None else values.loc[cells.index].rename(key)
+    counts = (
+        cells["count"]
+        .groupby([cells["week_period"], keys])
+        .sum()
         .reset_index(name="count")
     )
-    grouped["ratio"] = grouped["count"] / grouped.groupby("week_period")["count"].transform("sum")
+    counts["ratio"] = counts["count"] / counts.groupby("week_period")["count"].transform("sum")
 
-    # Stable sort + label
-    grouped = grouped.sort_values(["week_period", "intent_group"]).reset_index(drop=True)
-    grouped["week"] = grouped["week_period"].astype(str)
-    return grouped
+    # Stable sort + label for plotting/reporting
+    counts = counts.sort_values(["week_period", key]).reset_index(drop=True)
+    counts["week"] = counts["week_period"].astype(str)
+    return counts
+
+
+def sentiment_trend(cube: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    return _weekly_counts(cube, "sentiment")
+
+
+def intent_distribution(cube: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    return _weekly_counts(cube, "intent")
+
+
+def intent_shift(cube: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    cells = cube["cells"]
+    return _weekly_counts(cube, "intent_group", _intent_groups(cells["intent"]))
 
 
-def compute_issues(df: pd.DataFrame) -> pd.DataFrame:
+def _intent_groups(intent: pd.Series) -> pd.Series:
+    """Vectorized INTENT_GROUPS lookup (unknown intents -> "other")."""
+    cat = intent.astype("category")
+    lookup = {c: INTENT_GROUPS.get(c, "other") for c in cat.cat.categories}
+    return cat.map(lookup).astype(object).fillna("other")
+
+
+def compute_issues(cube: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     """
     Issue = (primary_topic, sentiment, intent_group)
     Deterministic: 1 comment -> exactly one issue (primary topic only).
     """
-    records = []
-
-    for _, row in df.iterrows():
-        topics = row.get("key_topics", [])
-        if not isinstance(topics, list) or not topics:
-            continue
-
-        records.append({
-            "week_period": row["week_period"],
-            "week": row["week"],
-            "topic": topics[0],  # primary topic
-            "sentiment": row["sentiment"],
-            "intent_group": INTENT_GROUPS.get(row["intent"], "other"),
-            "emotion_intensity": row.get("emotion_intensity", 0.0),
-            "comment_text": row.get("text", ""),
-        })
-
-    issues_df = pd.DataFrame(records)
-    if issues_df.empty:
+    cells = _weekly_cells(cube)
+    cells = cells[cells["topic"].notna()]
+    if cells.empty:
         return pd.DataFrame(columns=["week", "topic", "sentiment", "intent_group", "comment_count", "avg_emotion"])
 
+    issues = cells.assign(week=cells["week_period"].astype(str), intent_group=_intent_groups(cells["intent"]))
     aggregated = (
-        issues_df
+        issues
         .groupby(["week_period", "week", "topic", "sentiment", "intent_group"])
-        .agg(
-            comment_count=("comment_text", "count"),
-            avg_emotion=("emotion_intensity", "mean"),
-        )
+        .agg(comment_count=("text_count", "sum"), rows=("count", "sum"), emo_units=("emo_units", "sum"))
         .reset_index()
     )
 
-    aggregated["avg_emotion"] = aggregated["avg_emotion"].round(2)
+    aggregated["avg_emotion"] = _avg_emotion(aggregated["emo_units"], aggregated["rows"]).round(2)
+    aggregated = aggregated.drop(columns=["rows", "emo_units"])
     aggregated = aggregated.sort_values(["week_period", "comment_count"], ascending=[True, False]).reset_index(drop=True)
     # keep output compatible: week stays as label; week_period stays as extra key (harmless)
     return aggregated
 
 
-def trigger_topics(df: pd.DataFrame, top_n: int = 5):
+def topic_index(cube: Dict[str, pd.DataFrame], vocabulary: TopicVocabulary = None) -> TopicIndex:
+    return TopicIndex.from_cube(cube, vocabulary, pruned_topic=PRUNED_TOPIC)
+
+
+def trigger_topics(index: TopicIndex, top_n: int = 5):
     """
     Trigger topics are derived from CRITICAL intents (not sentiment).
     Each comment can contribute max 1 vote per topic.
+    Ordered like Counter.most_common: count desc, ties by first appearance.
     """
-    critical = df[df["intent"].isin(CRITICAL_INTENTS)]
+    return index.trigger_topics(top_n)
+
+
+def _week_totals(cube: Dict[str, pd.DataFrame], mask: pd.Series = None) -> pd.DataFrame:
+    """Per-week row count + emotion sum, optionally restricted to a subset of cells."""
+    cells = _weekly_cells(cube)
+    if mask is not None:
+        cells = cells[mask.loc[cells.index]]
+    return cells.groupby("week_period")[["count", "emo_units"]].sum()
 
-    topics: List[str] = []
-    for tlist in critical.get("key_topics", []):
-        if isinstance(tlist, list) and tlist:
-            topics.extend(set(tlist))
 
-    return Counter(topics).most_common(top_n)
+ESCALATION_THRESHOLDS = {"stable_lt": 0.15, "watch_lt": 0.30, "critical_ge": 0.30}
+EMOTION_THRESHOLDS = {"normal_lt": 0.05, "elevated_lt": 0.15, "high_ge": 0.15}
 
 
-def escalation_score(df: pd.DataFrame):
+def _escalation_level(ratio: float) -> str:
+    if ratio < 0.15:
+        return "stable"
+    if ratio < 0.30:
+        return "watch"
+    return "critical"
+
+
+def _emotion_label(lift: float) -> str:
+    if lift < 0.05:
+        return "normal"
+    if lift < 0.15:
+        return "elevated"
+    return "high"
+
+
+def escalation_score(cube: Dict[str, pd.DataFrame]):
     """
     Escalation = share of aggressive_criticism comments.
     """
-    results = []
-
-    for week_period, g in df.groupby("week_period"):
-        total = len(g)
-        if total == 0:
-            continue
+    cells = cube["cells"]
+    totals = _week_totals(cube)["count"]
+    aggressive = _week_totals(cube, cells["intent"] == "aggressive_criticism")["count"].reindex(totals.index, fill_value=0)
 
-        aggressive = g[g["intent"] == "aggressive_criticism"]
-        ratio = len(aggressive) / total
-
-        if ratio < 0.15:
-            level = "stable"
-        elif ratio < 0.30:
-            level = "watch"
-        else:
-            level = "critical"
+    results = []
+    for week_period, total, agg_count in zip(totals.index, totals, aggressive):
+        ratio = agg_count / total
 
         results.append({
             "week": str(week_period),
             "week_period": str(week_period),
             "aggressive_ratio": round(ratio, 3),
-            "level": level,
-            "thresholds": {"stable_lt": 0.15, "watch_lt": 0.30, "critical_ge": 0.30},
+            "level": _escalation_level(ratio),
+            "thresholds": ESCALATION_THRESHOLDS,
         })
 
-    # Ensure chronological order
-    results = sorted(results, key=lambda x: x["week_period"])
     return results
 
 
-def criticism_structure_by_week(df: pd.DataFrame, top_n: int = 5):
+def criticism_structure_by_week(cube: Dict[str, pd.DataFrame], index: TopicIndex, top_n: int = 5):
     """
     Dominance vs escalation separation:
     - structure: focused if one topic dominates critical mentions (dominance > 0.40), else fragmented
     - dominance: max(topic_count) / total_topic_mentions within critical intents
     """
-    results = []
+    cells = cube["cells"]
+    critical_weeks = _week_totals(cube, cells["intent"].isin(CRITICAL_INTENTS)).index
+    totals = index.week_totals()
+    dominances = index.dominance()
+    top_topics = index.weekly_top(top_n)
 
-    critical = df[df["intent"].isin(CRITICAL_INTENTS)]
-    for week_period, g in critical.groupby("week_period"):
-        topics: List[str] = []
-        for tlist in g.get("key_topics", []):
-            if isinstance(tlist, list) and tlist:
-                topics.extend(set(tlist))  # 1 vote per topic per comment
-
-        counts = Counter(topics)
-        total_mentions = sum(counts.values())
+    results = []
+    for week_period in critical_weeks:
+        row = index.week_row(str(week_period))
+        total_mentions = int(totals[row]) if row is not None else 0
 
         if total_mentions == 0:
             results.append({
@@ -271,7 +540,7 @@ def criticism_structure_by_week(df: pd.DataFrame, top_n: int = 5):
             })
             continue
 
-        dominance = max(counts.values()) / total_mentions
+        dominance = float(dominances[row])
         structure = "focused" if dominance > 0.40 else "fragmented"
 
         results.append({
@@ -280,14 +549,13 @@ def criticism_structure_by_week(df: pd.DataFrame, top_n: int = 5):
             "structure": structure,
             "dominance": round(dominance, 3),
             "threshold_focused_gt": 0.40,
-            "top_topics": counts.most_common(top_n),
+            "top_topics": top_topics.get(str(week_period), []),
         })
 
-    results = sorted(results, key=lambda x: x["week_period"])
     return results
 
 
-def emotion_context_by_week(df: pd.DataFrame):
+def emotion_context_by_week(cube: Dict[str, pd.DataFrame]):
     """
     Adds baseline comparison:
     - avg_emotion_total
@@ -295,79 +563,179 @@ def emotion_context_by_week(df: pd.DataFrame):
     - lift = neg - total
     - label based on lift thresholds
     """
-    results = []
+    cells = cube["cells"]
+    totals = _week_totals(cube)
+    negative = _week_totals(cube, cells["sentiment"] == "negative").reindex(totals.index, fill_value=0)
 
-    for week_period, g in df.groupby("week_period"):
-        if len(g) == 0:
-            continue
-
-        total_avg = float(g["emotion_intensity"].mean())
-        neg = g[g["sentiment"] == "negative"]
-        neg_avg = float(neg["emotion_intensity"].mean()) if len(neg) else 0.0
+    results = []
+    for week_period in totals.index:
+        total_avg = float(_avg_emotion(totals.at[week_period, "emo_units"], totals.at[week_period, "count"]))
+        neg_count = negative.at[week_period, "count"]
+        neg_avg = float(_avg_emotion(negative.at[week_period, "emo_units"], neg_count)) if neg_count else 0.0
 
         lift = neg_avg - total_avg
 
-        if lift < 0.05:
-            label = "normal"
-        elif lift < 0.15:
-            label = "elevated"
-        else:
-            label = "high"
-
         results.append({
             "week": str(week_period),
             "week_period": str(week_period),
             "avg_emotion_total": round(total_avg, 2),
             "avg_emotion_negative": round(neg_avg, 2),
             "emotion_lift": round(lift, 2),
-            "emotion_label": label,
-            "thresholds": {"normal_lt": 0.05, "elevated_lt": 0.15, "high_ge": 0.15},
+            "emotion_label": _emotion_label(lift),
+            "thresholds": EMOTION_THRESHOLDS,
         })
 
-    results = sorted(results, key=lambda x: x["week_period"])
     return results
 
 
-def trend_flags(sentiment_df: pd.DataFrame, intent_shift_df: pd.DataFrame):
+def _window_hours(spec: str) -> int:
+    """'24h' / '7d' / '2w' -> hours."""
+    value, unit = spec.strip()[:-1], spec.strip()[-1:].lower()
+    if not value.isdigit() or int(value) <= 0 or unit not in WINDOW_UNIT_HOURS:
+        raise ValueError(f"Invalid rolling window {spec!r} (expected e.g. 24h, 7d, 2w)")
+    return int(value) * WINDOW_UNIT_HOURS[unit]
+
+
+def _rolling_sums(values: np.ndarray, width: int) -> np.ndarray:
+    """Sum over the last `width` buckets (incl. the current one) via one cumulative sum."""
+    cumulative = np.concatenate([[0], np.cumsum(values)])
+    end = np.arange(1, len(values) + 1)
+    return cumulative[end] - cumulative[np.maximum(end - width, 0)]
+
+
+def _signals(sums: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    count, negative = sums["count"], sums["negative"]
+    safe_count, safe_negative = np.maximum(count, 1), np.maximum(negative, 1)
+    avg_emotion = np.where(count > 0, sums["emo_units"] / safe_count / EMOTION_SCALE, 0.0)
+    avg_negative = np.where(negative > 0, sums["negative_emo_units"] / safe_negative / EMOTION_SCALE, 0.0)
+    return {
+        "comments": count,
+        "aggressive_ratio": np.where(count > 0, sums["aggressive"] / safe_count, 0.0),
+        "critical_ratio": np.where(count > 0, sums["critical"] / safe_count, 0.0),
+        "negative_ratio": np.where(count > 0, negative / safe_count, 0.0),
+        "avg_emotion_total": avg_emotion,
+        "avg_emotion_negative": avg_negative,
+        "emotion_lift": avg_negative - avg_emotion,
+    }
+
+
+def _signal_record(signals: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    ratio, lift = float(signals["aggressive_ratio"][i]), float(signals["emotion_lift"][i])
+    return {
+        "comments": int(signals["comments"][i]),
+        "aggressive_ratio": round(ratio, 3),
+        "critical_ratio": round(float(signals["critical_ratio"][i]), 3),
+        "negative_ratio": round(float(signals["negative_ratio"][i]), 3),
+        "avg_emotion_total": round(float(signals["avg_emotion_total"][i]), 2),
+        "avg_emotion_negative": round(float(signals["avg_emotion_negative"][i]), 2),
+        "emotion_lift": round(lift, 2) + 0.0,  # no -0.0
+        "level": _escalation_level(ratio) if signals["comments"][i] else "none",
+        "emotion_label": _emotion_label(lift),
+    }
+
+
+def timeline(cube: Dict[str, pd.DataFrame], granularity: str = None, windows: List[str] = None) -> Dict[str, Any]:
+    """
+    Escalation + emotion signals per hour / day / week bucket (local time), plus rolling
+    windows ending at each bucket (e.g. last 24h, last 7d). Windows run over a dense time
+    axis; every window is a difference of one cumulative sum per measure, so the cost
+    does not grow with the window length or the number of windows. Only buckets with
+    comments are written. A window that reaches back before the first bucket (data
+    before LATEST_WEEKS is not loaded) has complete=False.
+    """
+    granularity = granularity or GRANULARITY
+    windows = ROLLING_WINDOWS if windows is None else windows
+    if granularity not in GRANULARITY_HOURS:
+        raise ValueError(f"Unknown granularity {granularity!r} (expected one of {list(GRANULARITY_HOURS)})")
+    step = GRANULARITY_HOURS[granularity]
+    widths = {}
+    for spec in windows:
+        hours = _window_hours(spec)
+        if hours % step:
+            raise ValueError(f"Rolling window {spec!r} is not a multiple of one {granularity}")
+        widths[spec] = hours // step
+
+    hours = cube["timeline"]
+    if hours.empty:
+        return {"granularity": granularity, "windows": list(windows), "buckets": [], "latest": None}
+
+    # Weeks start on Monday; hour 0 of the epoch was a Thursday
+    offset = 72 if granularity == "week" else 0
+    bucket = (hours["hour"].to_numpy() + offset) // step
+    first = int(bucket.min())
+    index = bucket - first
+    n = int(index.max()) + 1
+    sums = {
+        col: np.bincount(index, weights=hours[col].to_numpy(), minlength=n).astype(np.int64)
+        for col in TIMELINE_MEASURES
+    }
+
+    bucket_signals = _signals(sums)
+    rolling = {spec: _signals({col: _rolling_sums(v, width) for col, v in sums.items()}) for spec, width in widths.items()}
+    starts = (np.arange(first, first + n) * step - offset).astype("datetime64[h]")
+
+    buckets = []
+    for i in np.flatnonzero(sums["count"]).tolist():
+        record = {"start": str(starts[i].astype("datetime64[m]")), **_signal_record(bucket_signals, i)}
+        record["rolling"] = {
+            spec: {**_signal_record(signals, i), "complete": i + 1 >= widths[spec]} for spec, signals in rolling.items()
+        }
+        buckets.append(record)
+
+    return {
+        "granularity": granularity,
+        "windows": list(windows),
+        "buckets": buckets,
+        "latest": {"start": buckets[-1]["start"], **buckets[-1]["rolling"]},
+        "thresholds": {"escalation": ESCALATION_THRESHOLDS, "emotion": EMOTION_THRESHOLDS},
+    }
+
+
+def _ratio_pivot(df: pd.DataFrame, key: str, weeks: List) -> pd.DataFrame:
+    """week_period x label ratio table (missing labels -> 0.0)."""
+    return df.pivot(index="week_period", columns=key, values="ratio").reindex(weeks).fillna(0.0)
+
+
+def _trend_label(delta: float) -> str:
+    if delta > 0.05:
+        return "rising"
+    if delta < -0.05:
+        return "falling"
+    return "flat"
+
+
+def trend_flags(sentiment_df: pd.DataFrame, intent_shift_df: pd.DataFrame, baseline_weeks: int = None):
     """
     Uses week_period for ordering (fixes KW order).
-    Produces per-week change flags vs previous week:
+    Produces per-week change flags vs a baseline of the previous N weeks
+    (TREND_BASELINE_WEEKS: 1 = week-over-week, 4 = rolling 4-week mean):
     - negative_trend (rising/flat/falling)
     - critical_intent_trend (rising/flat/falling)
     """
+    baseline_weeks = max(1, baseline_weeks or TREND_BASELINE_WEEKS)
     weeks = sorted(sentiment_df["week_period"].unique())
     if len(weeks) < 2:
         return []
 
-    def ratio_sent(wp, sent: str) -> float:
-        r = sentiment_df[(sentiment_df.week_period == wp) & (sentiment_df.sentiment == sent)]["ratio"]
-        return float(r.iloc[0]) if len(r) else 0.0
-
-    def ratio_intent(wp, grp: str) -> float:
-        r = intent_shift_df[(intent_shift_df.week_period == wp) & (intent_shift_df.intent_group == grp)]["ratio"]
-        return float(r.iloc[0]) if len(r) else 0.0
-
-    def label(delta: float) -> str:
-        if delta > 0.05:
-            return "rising"
-        if delta < -0.05:
-            return "falling"
-        return "flat"
+    ratios = pd.DataFrame({
+        "negative": _ratio_pivot(sentiment_df, "sentiment", weeks).get("negative", 0.0),
+        "critical": _ratio_pivot(intent_shift_df, "intent_group", weeks).get("critical", 0.0),
+    }, index=weeks)
+    # baseline_weeks=1 -> shift(1), i.e. a plain diff()
+    baseline = ratios.shift(1).rolling(baseline_weeks, min_periods=1).mean()
+    changes = (ratios - baseline).iloc[1:]
 
     flags = []
-    for i in range(1, len(weeks)):
-        w_prev, w_cur = weeks[i - 1], weeks[i]
-        neg_change = ratio_sent(w_cur, "negative") - ratio_sent(w_prev, "negative")
-        crit_change = ratio_intent(w_cur, "critical") - ratio_intent(w_prev, "critical")
-
+    for w_cur, neg_change, crit_change in zip(changes.index, changes["negative"], changes["critical"]):
         flags.append({
             "week": str(w_cur),
             "week_period": str(w_cur),
-            "negative_trend": label(neg_change),
+            "negative_trend": _trend_label(neg_change),
             "negative_change": round(neg_change, 3),
-            "critical_intent_trend": label(crit_change),
+            "critical_intent_trend": _trend_label(crit_change),
             "critical_intent_change": round(crit_change, 3),
             "threshold_flat_pp": 0.05,
+            "baseline_weeks": baseline_weeks,
         })
 
     return flags
@@ -379,35 +747,171 @@ def df_json_safe(df: pd.DataFrame) -> pd.DataFrame:
         df["week_period"] = df["week_period"].astype(str)
     return df
 
-def main():
-    df = prepare_dataframe(load_data(INPUT_PATH))
-    df = restrict_to_latest_weeks(df, LATEST_WEEKS)
+def build_output(cube: Dict[str, pd.DataFrame], index: TopicIndex = None,
+                 granularity: str = None, windows: List[str] = None) -> Dict[str, Any]:
+    if index is None:
+        index = topic_index(cube)
+    sentiment_df = sentiment_trend(cube)
+    intent_dist_df = intent_distribution(cube)
+    intent_shift_df = intent_shift(cube)
 
-    sentiment_df = sentiment_trend(df)
-    intent_dist_df = intent_distribution(df)
-    intent_shift_df = intent_shift(df)
+    issues_df = compute_issues(cube)
 
-    issues_df = compute_issues(df)
-
-    output: Dict[str, Any] = {
+    return {
         "sentiment_trend": df_json_safe(sentiment_df).to_dict(orient="records"),
         "intent_distribution": df_json_safe(intent_dist_df).to_dict(orient="records"),
         "intent_shift": df_json_safe(intent_shift_df).to_dict(orient="records"),
 
-        "top_trigger_topics": trigger_topics(df),
+        "top_trigger_topics": trigger_topics(index),
         "issues": df_json_safe(issues_df).to_dict(orient="records"),
 
-        "escalation": escalation_score(df),
-        "criticism_structure": criticism_structure_by_week(df),
-        "emotion_context": emotion_context_by_week(df),
+        "escalation": escalation_score(cube),
+        "criticism_structure": criticism_structure_by_week(cube, index),
+        "emotion_context": emotion_context_by_week(cube),
         "trend_flags": trend_flags(sentiment_df, intent_shift_df),
+        "timeline": timeline(cube, granularity, windows),
     }
 
-    with OUTPUT_PATH.open("w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
 
-    print(f"[config] LATEST_WEEKS={LATEST_WEEKS}")
+def _latest_week_keys(keys: Iterable[str], n_weeks: int) -> List[str]:
+    """restrict_to_latest_weeks() on partial keys (week-less comments only survive if nothing is cut)."""
+    weeks = sorted((k for k in keys if k != partials.UNKNOWN_WEEK), key=lambda k: k.split("/")[0])
+    if n_weeks <= 0 or len(weeks) <= n_weeks:
+        return weeks + [k for k in keys if k == partials.UNKNOWN_WEEK]
+    return weeks[-n_weeks:]
+
+
+def update_partials(
+    fingerprints: Dict[str, str],
+    load_weeks: Callable[[List[str]], pd.DataFrame],
+    rebuild: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Recompute only weeks whose comments changed since the last run (load_weeks
+    returns the prepared comments of the given week keys), then assemble the
+    cube of the latest weeks from the stored partials.
+    """
+    manifest = partials.load_manifest(PARTIALS_DIR)
+
+    touched = sorted(
+        k for k, fp in fingerprints.items()
+        if rebuild or manifest.get(k, {}).get("fingerprint") != fp or manifest[k].get("version") != partials.VERSION
+    )
+    removed = sorted(set(manifest) - set(fingerprints))
+    partials.remove_weeks(PARTIALS_DIR, manifest, removed)
+
+    if touched:
+        files = partials.save_weeks(PARTIALS_DIR, build_weekly_cube(load_weeks(touched)), touched)
+        for key in touched:
+            manifest[key] = {
+                "fingerprint": fingerprints[key],
+                "version": partials.VERSION,
+                "rows": int(fingerprints[key].split(":")[0]),
+                "file": files[key],
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+            }
+    partials.save_manifest(PARTIALS_DIR, manifest)
+
+    with CHANGELOG_PATH.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "run_at": datetime.now().isoformat(timespec="seconds"),
+            "rows": sum(int(fp.split(":")[0]) for fp in fingerprints.values()),
+            "rebuild": rebuild,
+            "touched_weeks": touched,
+            "removed_weeks": removed,
+        }, ensure_ascii=False) + "\n")
+    print(f"[partials] weeks={len(manifest)} recomputed={len(touched)} removed={len(removed)}")
+
+    return partials.load_weeks(PARTIALS_DIR, manifest, _latest_week_keys(manifest.keys(), LATEST_WEEKS))
+
+
+def _streamed_cube(input_path: Path, chunk_rows: int, topic_top_k: int) -> Dict[str, pd.DataFrame]:
+    if STORE == "parquet" and input_path == INPUT_PATH:
+        store_dir = annotation_store.channel_dir(CHANNEL_SLUG)
+        weeks = annotation_store.load_manifest(store_dir)
+        chunks = annotation_store.iter_batches(store_dir, _latest_week_keys(weeks.keys(), LATEST_WEEKS), METRIC_COLUMNS, chunk_rows)
+    else:
+        chunks = iter_chunks(iter_json_records(input_path), chunk_rows)
+    return restrict_cube_to_latest_weeks(chunked_cube(chunks, topic_top_k), LATEST_WEEKS)
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Aggregate annotated comments into weekly metrics.")
+    parser.add_argument("--full", action="store_true", help="recompute every week (rebuild stored partials)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="stream the annotations in chunks of N rows (bounded memory, no partials)")
+    parser.add_argument("--topic-top-k", type=int, default=TOPIC_TOP_K,
+                        help="streaming mode: keep only the top K topic votes per week (0 = exact)")
+    parser.add_argument("--input", type=Path, default=INPUT_PATH, help="annotated comments (.json array or .jsonl)")
+    parser.add_argument("--granularity", choices=list(GRANULARITY_HOURS), default=GRANULARITY,
+                        help="bucket size of the escalation/emotion timeline")
+    parser.add_argument("--windows", nargs="*", default=ROLLING_WINDOWS, help="rolling windows, e.g. 24h 7d")
+    args = parser.parse_args(argv)
+
+    with profiling.span("weekly cube", chunk_rows=args.chunk_rows, store=STORE, incremental=INCREMENTAL):
+        if args.chunk_rows > 0:
+            cube = _streamed_cube(args.input, args.chunk_rows, args.topic_top_k)
+        elif STORE == "parquet" and args.input == INPUT_PATH:
+            # Only the metric columns of the needed week partitions are read
+            store_dir = annotation_store.channel_dir(CHANNEL_SLUG)
+
+            def read_weeks(keys: List[str]) -> pd.DataFrame:
+                return prepare_dataframe(annotation_store.read_weeks(store_dir, keys, METRIC_COLUMNS))
+
+            weeks = annotation_store.load_manifest(store_dir)
+            if not weeks:
+                raise FileNotFoundError(f"No Parquet store at {store_dir} (run: python annotation_store.py export)")
+            if INCREMENTAL:
+                cube = update_partials({k: w["fingerprint"] for k, w in weeks.items()}, read_weeks, rebuild=args.full)
+            else:
+                cube = build_weekly_cube(read_weeks(_latest_week_keys(weeks.keys(), LATEST_WEEKS)))
+        else:
+            with profiling.span("load + prepare"):
+                df = prepare_dataframe(load_data(args.input))
+            if INCREMENTAL and args.input == INPUT_PATH:
+                fingerprints = partials.week_fingerprints(df, EMOTION_SCALE, _has_text(df))
+                week_keys = df["week"].map(partials.week_key)
+                cube = update_partials(fingerprints, lambda keys: df[week_keys.isin(keys)], rebuild=args.full)
+            else:
+                cube = build_weekly_cube(restrict_to_latest_weeks(df, LATEST_WEEKS))
+
+    with profiling.span("topic index"):
+        vocabulary = TopicVocabulary(TOPIC_IDS_PATH)
+        try:
+            index = topic_index(cube, vocabulary)
+        finally:
+            vocabulary.close()
+    with profiling.span("build output"):
+        output = build_output(cube, index, args.granularity, args.windows)
+
+    with profiling.span("write"):
+        with OUTPUT_PATH.open("w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+
+        # Drill-down cube (week x video x sentiment x intent_group x topic), see scripts/comment_cube.py
+        cells = cube["cells"]
+        CommentCube.from_cells(cells, _intent_groups(cells["intent"]), EMOTION_SCALE).save(COMMENT_CUBE_PATH)
+        # Topic matrices (weekly counts, co-occurrence), see scripts/topic_index.py
+        index.save(TOPIC_INDEX_PATH)
+
+    # Immutable per-week history (only for the channel's own, exact data: not for --input
+    # files or approximate top-k runs)
+    if SNAPSHOTS and args.input == INPUT_PATH and not (args.chunk_rows > 0 and args.topic_top_k > 0):
+        with profiling.span("snapshots"):
+            store = SnapshotStore(SNAPSHOTS_PATH)
+            try:
+                snapshot_weeks = store.append(
+                    CHANNEL_SLUG, output, final_weeks(output, LATEST_WEEKS, TREND_BASELINE_WEEKS)
+                )
+            finally:
+                store.close()
+        print(f"[snapshots] {len(snapshot_weeks)} new week snapshots → {SNAPSHOTS_PATH}")
+
+    print(f"[config] LATEST_WEEKS={LATEST_WEEKS} TREND_BASELINE_WEEKS={TREND_BASELINE_WEEKS} INCREMENTAL={INCREMENTAL} STORE={STORE} GRANULARITY={args.granularity} WINDOWS={args.windows}")
     print(f"Metrics written to {OUTPUT_PATH}")
+    print(f"Comment cube written to {COMMENT_CUBE_PATH}")
+    print(f"Topic index written to {TOPIC_INDEX_PATH}")
+    return output
 
 
 if __name__ == "__main__":
@@ -0,0 +1,278 @@
+"""
+Immutable per-week metric snapshots (data/metric_snapshots.sqlite, all channels).
+
+compute_metrics appends the final weeks of its output (final_weeks()): all
+week-keyed records (sentiment_trend, intent_shift, issues, escalation, ...) of
+that week, as JSON. A week gets a new row only when its content changed (e.g. the
+running week, or late comments), and never when the new content lacks a section
+the latest snapshot has; rows are never updated or deleted. The latest snapshot of
+each week rebuilds a metrics dict in the aggregated_metrics schema, so reports and
+charts for weeks that LATEST_WEEKS has long dropped need no recompute.
+
+    python -m scripts.metric_snapshots --list
+    python -m scripts.metric_snapshots --compare 2025-03-03/2025-03-09 2025-05-19/2025-05-25
+    python -m scripts.metric_snapshots --history 2025-05-19/2025-05-25
+
+    store = SnapshotStore(path)
+    metrics = store.metrics("mychannel", until="2025-03-09")  # weeks up to that date
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import config
+
+
+def _get_cfg_int(name: str, default: int) -> int:
+    try:
+        return int(getattr(config, name, default))
+    except Exception:
+        return default
+
+
+def _slugify_channel(handle: str) -> str:
+    s = (handle or "").strip()
+    if s.startswith("@"):
+        s = s[1:]
+    s = s.lower()
+    s = "".join(ch for ch in s if ch.isalnum() or ch in ("-", "_"))
+    return s or "channel"
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT_DIR / "data"
+SNAPSHOTS_PATH = DATA_DIR / "metric_snapshots.sqlite"
+
+SCHEMA_VERSION = 1  # of the snapshot JSON; bump when the aggregated_metrics schema changes
+
+
+def week_sections(metrics: Dict[str, Any]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """{week: {section: records}} over all lists of week-keyed records (order within a week is kept)."""
+    weeks: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for section, records in metrics.items():
+        if not isinstance(records, list) or not records or not isinstance(records[0], dict):
+            continue
+        if "week" not in records[0]:
+            continue
+        for r in records:
+            weeks.setdefault(str(r["week"]), {}).setdefault(section, []).append(r)
+    return weeks
+
+
+def final_weeks(metrics: Dict[str, Any], latest_weeks: Optional[int] = None,
+                baseline_weeks: Optional[int] = None) -> List[str]:
+    """
+    Weeks of `metrics` that are complete. If the LATEST_WEEKS window may have cut
+    older weeks off, its first TREND_BASELINE_WEEKS weeks are left out: they have no
+    trend_flags or a shorter trend baseline than they get while further inside it.
+    """
+    latest_weeks = _get_cfg_int("LATEST_WEEKS", 3) if latest_weeks is None else latest_weeks
+    baseline_weeks = max(1, _get_cfg_int("TREND_BASELINE_WEEKS", 1) if baseline_weeks is None else baseline_weeks)
+    weeks = sorted(week_sections(metrics))
+    if latest_weeks > 0 and len(weeks) >= latest_weeks:
+        weeks = weeks[baseline_weeks:]
+    return weeks
+
+
+class SnapshotStore:
+    """Append-only (channel, week) -> metrics snapshots in one local SQLite file."""
+
+    def __init__(self, path: Path = SNAPSHOTS_PATH) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(str(path), timeout=30)  # other channel processes may be appending
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                channel TEXT NOT NULL,
+                week TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                schema_version INTEGER NOT NULL,
+                created_at TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_channel_week ON snapshots (channel, week, id);
+            """
+        )
+        self._conn.commit()
+
+    def append(self, channel: str, metrics: Dict[str, Any], weeks: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Snapshot every week of `metrics` (or of `weeks`, see final_weeks()) whose content
+        differs from its latest snapshot; returns those weeks.
+        """
+        latest = {week: (fp, row_id) for week, fp, row_id in self._latest(channel)}
+        keep = None if weeks is None else set(weeks)
+        created_at = datetime.now().isoformat(timespec="seconds")
+        rows: List[Tuple[str, str, str, int, str, str]] = []
+        for week, sections in sorted(week_sections(metrics).items()):
+            if keep is not None and week not in keep:
+                continue
+            data = json.dumps(sections, ensure_ascii=False, sort_keys=True)
+            fingerprint = hashlib.sha256(data.encode("utf-8")).hexdigest()
+            if week in latest:
+                if latest[week][0] == fingerprint or not self._sections(latest[week][1]) <= set(sections):
+                    continue  # unchanged, or less complete than what is stored
+            rows.append((channel, week, fingerprint, SCHEMA_VERSION, created_at, data))
+        self._conn.executemany(
+            "INSERT INTO snapshots (channel, week, fingerprint, schema_version, created_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._conn.commit()
+        return [r[1] for r in rows]
+
+    def _latest(self, channel: str, as_of: Optional[str] = None) -> List[Tuple[str, str, int]]:
+        """(week, fingerprint, row id) of the newest snapshot per week (as_of: created_at <= as_of)."""
+        return self._conn.execute(
+            """
+            SELECT week, fingerprint, MAX(id) FROM snapshots
+            WHERE channel = ? AND (? IS NULL OR created_at <= ?)
+            GROUP BY week ORDER BY week
+            """,
+            (channel, as_of, as_of),
+        ).fetchall()
+
+    def _sections(self, row_id: int) -> set:
+        (data,) = self._conn.execute("SELECT data FROM snapshots WHERE id = ?", (row_id,)).fetchone()
+        return set(json.loads(data))
+
+    def weeks(self, channel: str) -> List[str]:
+        return [week for week, _, _ in self._latest(channel)]
+
+    def channels(self) -> List[str]:
+        return [c for (c,) in self._conn.execute("SELECT DISTINCT channel FROM snapshots ORDER BY channel")]
+
+    def week(self, channel: str, week: str, as_of: Optional[str] = None) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """{section: records} of one week, or None if it was never snapshotted."""
+        row = self._conn.execute(
+            """
+            SELECT data FROM snapshots WHERE channel = ? AND week = ? AND (? IS NULL OR created_at <= ?)
+            ORDER BY id DESC LIMIT 1
+            """,
+            (channel, week, as_of, as_of),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def history(self, channel: str, week: str) -> List[Tuple[str, str]]:
+        """(created_at, fingerprint) of every snapshot of a week, oldest first."""
+        return self._conn.execute(
+            "SELECT created_at, fingerprint FROM snapshots WHERE channel = ? AND week = ? ORDER BY id",
+            (channel, week),
+        ).fetchall()
+
+    def metrics(
+        self, channel: str, since: Optional[str] = None, until: Optional[str] = None, as_of: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Metrics dict (aggregated_metrics schema, week-keyed sections only) from the latest
+        snapshot of each week (as_of: as it was at that created_at). since/until: a full
+        week ('2025-03-03/2025-03-09') or a date, matched against the week's Monday.
+        """
+        ids = [
+            row_id for week, _, row_id in self._latest(channel, as_of)
+            if (since is None or week[:len(since)] >= since) and (until is None or week[:len(until)] <= until)
+        ]
+        metrics: Dict[str, Any] = {}
+        for i in range(0, len(ids), 500):  # SQLite limits bound parameters per statement
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for (data,) in self._conn.execute(
+                f"SELECT data FROM snapshots WHERE id IN ({placeholders}) ORDER BY week", chunk,
+            ):
+                for section, records in json.loads(data).items():
+                    metrics.setdefault(section, []).extend(records)
+        return metrics
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def merged_metrics(store: SnapshotStore, channel: str, current: Optional[Dict[str, Any]],
+                   latest_weeks: Optional[int] = None, baseline_weeks: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Snapshot history + the current metrics. Current records win for their final weeks
+    (final_weeks(), default: LATEST_WEEKS / TREND_BASELINE_WEEKS from config.py), and
+    for weeks without a snapshot.
+    """
+    history = store.metrics(channel)
+    if not current:
+        return history
+    snapshotted = set(week_sections(history))
+    final = set(final_weeks(current, latest_weeks, baseline_weeks))
+    current_weeks = {w for w in week_sections(current) if w not in snapshotted or w in final}
+    merged = {k: v for k, v in current.items() if not (isinstance(v, list) and k in history)}
+    for section, records in history.items():
+        old = [r for r in records if str(r["week"]) not in current_weeks]
+        new = [r for r in current.get(section) or [] if str(r["week"]) in current_weeks]
+        merged[section] = sorted(old + new, key=lambda r: str(r["week"]))
+    return merged
+
+
+# Key figures for --compare: (section, filter, value field, label)
+_COMPARE = [
+    ("sentiment_trend", ("sentiment", "negative"), "ratio", "negative share"),
+    ("intent_shift", ("intent_group", "critical"), "ratio", "critical share"),
+    ("escalation", None, "aggressive_ratio", "aggressive share"),
+    ("escalation", None, "level", "escalation level"),
+    ("emotion_context", None, "avg_emotion_total", "avg emotion"),
+    ("emotion_context", None, "avg_emotion_negative", "avg emotion (negative)"),
+    ("criticism_structure", None, "structure", "criticism structure"),
+    ("criticism_structure", None, "dominance", "dominance"),
+]
+
+
+def compare(a: Dict[str, List[Dict[str, Any]]], b: Dict[str, List[Dict[str, Any]]]) -> List[Tuple[str, Any, Any, Any]]:
+    """(label, value in a, value in b, b - a for numbers) for the key figures of two week snapshots."""
+    def value(sections: Dict[str, List[Dict[str, Any]]], section: str, where: Optional[Tuple[str, str]], field: str) -> Any:
+        for r in sections.get(section, []):
+            if where is None or r.get(where[0]) == where[1]:
+                return r.get(field)
+        return None
+
+    rows = []
+    for section, where, field, label in _COMPARE:
+        va, vb = value(a, section, where, field), value(b, section, where, field)
+        numeric = isinstance(va, (int, float)) and isinstance(vb, (int, float))
+        rows.append((label, va, vb, round(vb - va, 4) if numeric else None))
+    return rows
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Per-week metric snapshots (written by compute_metrics).")
+    parser.add_argument("--channel", default=getattr(config, "CHANNEL_HANDLE", ""), help="default: CHANNEL_HANDLE")
+    parser.add_argument("--path", type=Path, default=SNAPSHOTS_PATH)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--list", action="store_true", help="snapshotted weeks (and how often each changed)")
+    group.add_argument("--compare", nargs=2, metavar="WEEK", help="key figures of two weeks side by side")
+    group.add_argument("--history", metavar="WEEK", help="all snapshots of one week")
+    args = parser.parse_args(argv)
+
+    channel = _slugify_channel(args.channel)
+    store = SnapshotStore(args.path)
+    try:
+        if args.list:
+            for week in store.weeks(channel):
+                history = store.history(channel, week)
+                print(f"{week}  snapshots={len(history)}  latest={history[-1][0]}")
+        elif args.history:
+            for created_at, fingerprint in store.history(channel, args.history):
+                print(f"{created_at}  {fingerprint[:12]}")
+        else:
+            a, b = (store.week(channel, w) for w in args.compare)
+            for week, sections in zip(args.compare, (a, b)):
+                if sections is None:
+                    raise SystemExit(f"No snapshot for week {week!r} (channel {channel}); see --list")
+            print(f"{'':>24}  {args.compare[0]:>23}  {args.compare[1]:>23}  {'change':>8}")
+            for label, va, vb, delta in compare(a, b):
+                print(f"{label:>24}  {str(va):>23}  {str(vb):>23}  {'' if delta is None else f'{delta:+.3f}':>8}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
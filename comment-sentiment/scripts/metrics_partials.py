@@ -0,0 +1,141 @@
+"""
+Per-week partial aggregates for incremental metrics runs.
+
+Layout (one directory per channel):
+    data/metrics_partials_<slug>/manifest.json     week label -> fingerprint, rows, file
+    data/metrics_partials_<slug>/<week start>.json  cube cells, topic votes, topic pairs + hourly timeline of that week
+
+A week's fingerprint is an order-independent hash over the metric-relevant
+fields of its comments; weeks whose fingerprint changed are recomputed, all
+others are read back from disk.
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = "manifest.json"
+UNKNOWN_WEEK = "unknown"  # comments without a parseable timestamp
+
+VERSION = 4  # bump when the cube layout changes; older partials are recomputed
+
+CUBE_COLUMNS = {
+    "cells": ["week_period", "video_id", "sentiment", "intent", "topic", "count", "text_count", "emo_units"],
+    "topic_votes": ["week_period", "topic", "count", "first"],
+    "topic_pairs": ["week_period", "topic_a", "topic_b", "count"],
+    "timeline": ["week_period", "hour", "count", "emo_units", "aggressive", "critical", "negative", "negative_emo_units"],
+}
+INT_COLUMNS = {"count", "text_count", "emo_units", "first", "hour", "aggressive", "critical", "negative", "negative_emo_units"}
+
+
+def week_key(label: Any) -> str:
+    """Week label ('2025-03-03/2025-03-09') -> manifest key; NaN -> 'unknown'."""
+    return label if isinstance(label, str) and label != "NaT" else UNKNOWN_WEEK
+
+
+def _label_to_period(key: str):
+    if key == UNKNOWN_WEEK:
+        return pd.NaT
+    return pd.Period(key.split("/")[0], freq="W")
+
+
+def week_fingerprints(df: pd.DataFrame, emotion_scale: int, has_text: Any = True) -> Dict[str, str]:
+    """Prepared DataFrame -> {week key: fingerprint} (rows + sum of row hashes)."""
+    topics = df["key_topics"] if "key_topics" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    fields = pd.DataFrame({
+        "comment_id": df["comment_id"].astype(str) if "comment_id" in df.columns else "",
+        "video_id": df["video_id"].astype(str) if "video_id" in df.columns else "",
+        "sentiment": df["sentiment"],
+        "intent": df["intent"],
+        "emo_units": (df["emotion_intensity"] * emotion_scale).round().astype("int64"),
+        "topics": topics.map(lambda t: "\x1f".join(map(str, t)) if isinstance(t, list) else ""),
+        "has_text": has_text,
+    }, index=df.index)
+    hashes = pd.util.hash_pandas_object(fields, index=False)
+
+    keys = df["week"].map(week_key)
+    grouped = hashes.groupby(keys.to_numpy())
+    sums = grouped.sum()  # uint64, wraps around
+    sizes = grouped.size()
+    return {key: f"{int(sizes[key])}:{int(sums[key]):016x}" for key in sums.index}
+
+
+def add_fingerprints(a: str, b: str) -> str:
+    """Fingerprint of the union of two disjoint sets of rows (row hashes add up mod 2**64)."""
+    (rows_a, sum_a), (rows_b, sum_b) = a.split(":"), b.split(":")
+    return f"{int(rows_a) + int(rows_b)}:{(int(sum_a, 16) + int(sum_b, 16)) % 2 ** 64:016x}"
+
+
+def load_manifest(directory: Path) -> Dict[str, Dict[str, Any]]:
+    path = directory / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(directory: Path, manifest: Dict[str, Dict[str, Any]]) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / (MANIFEST_NAME + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(dict(sorted(manifest.items())), f, ensure_ascii=False, indent=2)
+    tmp.replace(directory / MANIFEST_NAME)
+
+
+def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    frame = frame.drop(columns="week_period").astype(object)
+    return frame.where(frame.notna(), None).to_dict(orient="records")
+
+
+def save_weeks(directory: Path, cube: Dict[str, pd.DataFrame], keys: Iterable[str]) -> Dict[str, str]:
+    """Write one partial file per week key; returns {week key: file name}."""
+    directory.mkdir(parents=True, exist_ok=True)
+    split = {
+        name: {
+            UNKNOWN_WEEK if pd.isna(period) else str(period): part
+            for period, part in frame.groupby("week_period", dropna=False)
+        }
+        for name, frame in cube.items()
+    }
+
+    files: Dict[str, str] = {}
+    for key in keys:
+        file_name = f"{key.split('/')[0]}.json"
+        payload = {
+            "week": key,
+            **{name: _records(parts[key]) if key in parts else [] for name, parts in split.items()},
+        }
+        with (directory / file_name).open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        files[key] = file_name
+    return files
+
+
+def load_weeks(directory: Path, manifest: Dict[str, Dict[str, Any]], keys: Iterable[str]) -> Dict[str, pd.DataFrame]:
+    """Read the partials of the given weeks back into one cube."""
+    frames: Dict[str, List[pd.DataFrame]] = {name: [] for name in CUBE_COLUMNS}
+    for key in keys:
+        with (directory / manifest[key]["file"]).open("r", encoding="utf-8") as f:
+            payload = json.load(f)
+        for name, columns in CUBE_COLUMNS.items():
+            part = pd.DataFrame(payload[name], columns=columns[1:])
+            part.insert(0, "week_period", _label_to_period(key))
+            frames[name].append(part)
+
+    cube: Dict[str, pd.DataFrame] = {}
+    for name, parts in frames.items():
+        frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=CUBE_COLUMNS[name])
+        frame["week_period"] = frame["week_period"].astype("period[W]")
+        for col in INT_COLUMNS.intersection(frame.columns):
+            frame[col] = frame[col].astype(np.int64)
+        cube[name] = frame
+    return cube
+
+
+def remove_weeks(directory: Path, manifest: Dict[str, Dict[str, Any]], keys: Iterable[str]) -> None:
+    for key in keys:
+        entry = manifest.pop(key, None)
+        if entry:
+            (directory / entry["file"]).unlink(missing_ok=True)
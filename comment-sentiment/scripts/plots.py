@@ -0,0 +1,266 @@
+"""
+All report charts, for one or many channels, in one process (or a process pool).
+
+    python -m scripts.plots                                   # CHANNEL_HANDLE from config.py
+    python -m scripts.plots --channels @a @b @c --workers 4 --format svg
+
+Figures are drawn on the Agg canvas without pyplot (no GUI backend, no global
+figure state). A chart is only re-rendered when the data it shows changed: the
+hash of its series is kept per output file in data/plot_hashes_<slug>.json.
+"""
+import argparse
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from matplotlib import rc_context
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import PercentFormatter
+
+import config
+
+
+def _slugify_channel(handle: str) -> str:
+    s = (handle or "").strip()
+    if s.startswith("@"):
+        s = s[1:]
+    s = s.lower()
+    s = "".join(ch for ch in s if ch.isalnum() or ch in ("-", "_"))
+    return s or "channel"
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT_DIR / "data"
+OUTPUT_DIR = ROOT_DIR / "output"
+
+DEFAULT_PLOT_FORMAT = "png"  # "svg": smaller files, no rasterization
+FORMATS = ("png", "svg")
+PNG_DPI = 200
+RENDER_VERSION = 1  # bump when the chart styling changes (invalidates stored hashes)
+
+
+@dataclass(frozen=True)
+class Chart:
+    key: str  # list in aggregated metrics, one row per week x group
+    group: str  # column holding the line label
+    colors: Dict[str, str]
+    title: str  # {channel} is replaced by the channel handle
+    legend_title: str
+
+
+CHARTS = {
+    "sentiment_trend": Chart(
+        key="sentiment_trend",
+        group="sentiment",
+        colors={"negative": "tab:red", "neutral": "tab:orange", "positive": "tab:green"},
+        title="Community Sentiment Trend (Top-Level Comments)",
+        legend_title="Sentiment",
+    ),
+    "intent_shift": Chart(
+        key="intent_shift",
+        group="intent_group",
+        colors={
+            "critical": "tab:red",
+            "supportive": "tab:green",
+            "neutral": "tab:orange",
+            "constructive": "tab:blue",
+            "mixed": "tab:blue",
+            "other": "tab:gray",
+        },
+        title="Intent Shift in Community Comments – {channel}",
+        legend_title="Intent Group",
+    ),
+}
+
+
+def plot_format() -> str:
+    fmt = str(getattr(config, "PLOT_FORMAT", DEFAULT_PLOT_FORMAT)).strip().lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"PLOT_FORMAT must be one of {FORMATS}, got {fmt!r}")
+    return fmt
+
+
+def chart_path(name: str, channel_slug: str, fmt: str = DEFAULT_PLOT_FORMAT, suffix: str = "") -> Path:
+    """suffix: e.g. '_2025-03-03' for the charts of a past-week report."""
+    return OUTPUT_DIR / f"{name}_{channel_slug}{suffix}.{fmt}"
+
+
+def week_labels(weeks: pd.PeriodIndex) -> List[str]:
+    """'KW 07 (2025)' per week, ISO week of the week's end (whole index at once)."""
+    iso = weeks.end_time.isocalendar()
+    return ("KW " + iso["week"].astype(str).str.zfill(2) + " (" + iso["year"].astype(str) + ")").tolist()
+
+
+def series(metrics: Dict[str, Any], chart: Chart) -> pd.DataFrame:
+    """Week label x group ratios, weeks in calendar order."""
+    rows = metrics.get(chart.key, [])
+    if not rows:
+        raise ValueError(f"No {chart.key!r} found in aggregated metrics.")
+    df = pd.DataFrame(rows)
+    df["week_period"] = pd.PeriodIndex(df["week"], freq="W")
+    pivot = df.pivot(index="week_period", columns=chart.group, values="ratio").sort_index().fillna(0)
+    pivot.index = week_labels(pivot.index)
+    return pivot
+
+
+def series_hash(pivot: pd.DataFrame, name: str, title: str, fmt: str) -> str:
+    payload = {
+        "chart": name,
+        "version": RENDER_VERSION,
+        "format": fmt,
+        "title": title,
+        "weeks": list(pivot.index),
+        "groups": [str(c) for c in pivot.columns],
+        "values": pivot.to_numpy().tolist(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def draw(pivot: pd.DataFrame, chart: Chart, title: str) -> Figure:
+    fig = Figure(figsize=(8, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    x = range(len(pivot.index))
+    for group in pivot.columns:
+        ax.plot(
+            x,
+            pivot[group].values,
+            marker="o",
+            label=group,
+            color=chart.colors.get(str(group).lower(), "tab:gray"),
+        )
+
+    # Force all x tick labels to show
+    labels = list(pivot.index)
+    ax.set_xticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=30, ha="right")
+    ax.set_xlim(-0.5, len(labels) - 0.5)
+
+    ax.set_title(title)
+    ax.set_xlabel("Woche")
+    ax.set_ylabel("Anteil der Kommentare (%)")
+
+    ax.set_ylim(0, 1)
+    ax.yaxis.set_major_formatter(PercentFormatter(1.0))
+
+    ax.grid(True, alpha=0.3)
+    ax.legend(title=chart.legend_title, loc="upper left")
+
+    fig.tight_layout()
+    return fig
+
+
+def render(
+    name: str,
+    metrics: Dict[str, Any],
+    output_path: Path,
+    channel_handle: str = "",
+    known_hash: Optional[str] = None,
+) -> Tuple[str, bool]:
+    """Render one chart unless output_path exists with known_hash; returns (hash, rendered)."""
+    chart = CHARTS[name]
+    fmt = output_path.suffix.lstrip(".").lower()
+    title = chart.title.format(channel=channel_handle)
+    pivot = series(metrics, chart)
+    digest = series_hash(pivot, name, title, fmt)
+    if digest == known_hash and output_path.exists():
+        return digest, False
+
+    fig = draw(pivot, chart, title)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Fixed SVG metadata/ids keep unchanged charts byte-identical across runs
+    if fmt == "png":
+        fig.savefig(output_path, dpi=PNG_DPI, bbox_inches="tight")
+    else:
+        with rc_context({"svg.hashsalt": name}):
+            fig.savefig(output_path, bbox_inches="tight", metadata={"Date": None})
+    return digest, True
+
+
+def _hash_path(channel_slug: str) -> Path:
+    return DATA_DIR / f"plot_hashes_{channel_slug}.json"
+
+
+def render_channel(
+    channel_handle: str,
+    metrics: Optional[Dict[str, Any]] = None,
+    charts: Sequence[str] = tuple(CHARTS),
+    fmt: Optional[str] = None,
+    force: bool = False,
+    suffix: str = "",
+) -> Dict[str, Path]:
+    """All `charts` of one channel (metrics: read from data/aggregated_metrics_<slug>.json if None)."""
+    channel_slug = _slugify_channel(channel_handle)
+    fmt = fmt or plot_format()
+    if metrics is None:
+        with (DATA_DIR / f"aggregated_metrics_{channel_slug}.json").open("r", encoding="utf-8") as f:
+            metrics = json.load(f)
+
+    hash_path = _hash_path(channel_slug)
+    hashes: Dict[str, str] = {}
+    if hash_path.exists():
+        with hash_path.open("r", encoding="utf-8") as f:
+            hashes = json.load(f)
+
+    paths: Dict[str, Path] = {}
+    for name in charts:
+        path = chart_path(name, channel_slug, fmt, suffix)
+        known = None if force else hashes.get(path.name)
+        hashes[path.name], rendered = render(name, metrics, path, channel_handle, known)
+        print(f"{name} plot {'written to' if rendered else 'unchanged:'} {path}")
+        paths[name] = path
+
+    hash_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = hash_path.with_name(hash_path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+    tmp.replace(hash_path)
+    return paths
+
+
+def _render_channel_job(args: Tuple[str, Sequence[str], str, bool]) -> Dict[str, Path]:
+    return render_channel(args[0], None, args[1], args[2], args[3])
+
+
+def render_channels(
+    channel_handles: Sequence[str],
+    charts: Sequence[str] = tuple(CHARTS),
+    fmt: Optional[str] = None,
+    force: bool = False,
+    workers: int = 1,
+) -> Dict[str, Dict[str, Path]]:
+    """{handle: {chart: path}}; workers > 1 renders channels in a process pool."""
+    fmt = fmt or plot_format()
+    jobs = [(h, tuple(charts), fmt, force) for h in channel_handles]
+    if workers <= 1 or len(jobs) <= 1:
+        return {job[0]: _render_channel_job(job) for job in jobs}
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return dict(zip(channel_handles, pool.map(_render_channel_job, jobs)))
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Render the report charts for one or many channels.")
+    parser.add_argument("--channels", nargs="+", metavar="HANDLE",
+                        help="default: CHANNEL_HANDLES or CHANNEL_HANDLE from config.py")
+    parser.add_argument("--charts", nargs="+", choices=list(CHARTS), default=list(CHARTS))
+    parser.add_argument("--format", choices=FORMATS, default=None, help="default: PLOT_FORMAT from config.py")
+    parser.add_argument("--workers", type=int, default=1, help="processes (channels are rendered in parallel)")
+    parser.add_argument("--force", action="store_true", help="re-render even if the series are unchanged")
+    args = parser.parse_args(argv)
+
+    channel_handles = args.channels or list(getattr(config, "CHANNEL_HANDLES", None) or [])
+    if not channel_handles:
+        channel_handles = [getattr(config, "CHANNEL_HANDLE", "")]
+    if not all(channel_handles):
+        raise ValueError("CHANNEL_HANDLE missing in config.py")
+    render_channels(channel_handles, args.charts, args.format, args.force, args.workers)
+
+
+if __name__ == "__main__":
+    main()
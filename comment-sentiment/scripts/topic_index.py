@@ -0,0 +1,266 @@
+"""
+Integer topic IDs and sparse topic matrices.
+
+Topics are interned once in data/topic_ids.sqlite (shared across runs and
+channels, IDs never change). The matrices below only have columns for the
+topics of their own channel (sorted by topic); topic_ids maps each column to
+its shared ID. compute_metrics writes data/topic_index_<slug>.npz:
+
+- week_counts: week x topic critical-intent votes (1 per topic per comment),
+  plus the first vote position per cell for Counter.most_common tie order
+- cooccurrence: symmetric topic x topic matrix, comments (any intent) that
+  mention both topics
+
+    python -m scripts.topic_index --with "topic_3"         # topics mentioned together with X
+    python -m scripts.topic_index --triggers --top 10
+
+    index = TopicIndex.load(path)
+    index.related("topic_3", n=5)
+"""
+import argparse
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+class TopicVocabulary:
+    """Append-only topic -> integer ID mapping in one local SQLite file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(str(path), timeout=30)  # other channel processes may be interning
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS topics (id INTEGER PRIMARY KEY, topic TEXT NOT NULL UNIQUE)"
+        )
+        self._conn.commit()
+
+    def intern(self, topics: Iterable[str]) -> Dict[str, int]:
+        """IDs for the given topics; unseen topics get new IDs (starting at 0)."""
+        topics = list(dict.fromkeys(topics))
+        # INSERT OR IGNORE + SELECT stays consistent when several channels run at once
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO topics (id, topic) VALUES ((SELECT COALESCE(MAX(id) + 1, 0) FROM topics), ?)",
+            [(t,) for t in topics],
+        )
+        self._conn.commit()
+        ids: Dict[str, int] = {}
+        for i in range(0, len(topics), _LOOKUP_CHUNK):
+            chunk = topics[i:i + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            ids.update(self._conn.execute(f"SELECT topic, id FROM topics WHERE topic IN ({placeholders})", chunk))
+        return ids
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class TopicIndex:
+    """
+    week_counts / week_first: (weeks x topics) CSR matrices over the same cells, column i
+    is topics[i] (shared ID topic_ids[i]); week_first stores first vote position + 1 so position 0 is not an implicit zero.
+    pruned: per-week votes folded away by prune_topic_votes (they only count towards totals).
+    """
+
+    def __init__(self, weeks: np.ndarray, topic_ids: np.ndarray, topics: np.ndarray,
+                 week_counts, week_first, pruned: np.ndarray, cooccurrence) -> None:
+        self.weeks = weeks
+        self.topic_ids = topic_ids  # shared ID per column ...
+        self.topics = topics  # ... and its label (sorted)
+        self.week_counts = week_counts
+        self.week_first = week_first
+        self.pruned = pruned
+        self.cooccurrence = cooccurrence
+        self._labels = dict(enumerate(topics.tolist()))
+        self._week_rows = {w: i for i, w in enumerate(weeks.tolist())}
+
+    @classmethod
+    def from_cube(cls, cube: Dict[str, pd.DataFrame], vocabulary: Optional[TopicVocabulary] = None,
+                  pruned_topic: Optional[str] = None) -> "TopicIndex":
+        """
+        Build from a weekly cube (compute_metrics). Without a vocabulary, the shared
+        IDs are just the column numbers.
+        """
+        from scipy import sparse
+
+        votes = cube["topic_votes"]
+        votes = votes[votes["week_period"].notna()]
+        pairs = cube["topic_pairs"]
+        pairs = pairs[pairs["week_period"].notna()]
+
+        is_pruned = (votes["topic"] == pruned_topic).to_numpy()
+        real, folded = votes[~is_pruned], votes[is_pruned]
+
+        # Factorize once over all frames, then split the codes back up
+        week_codes, weeks = pd.factorize(
+            pd.concat([real["week_period"], folded["week_period"], pairs["week_period"]], ignore_index=True), sort=True
+        )
+        weeks = np.asarray(weeks.astype(str), dtype=str)
+        r, folded_rows, _ = np.split(week_codes, [len(real), len(real) + len(folded)])
+
+        topic_codes, labels = pd.factorize(
+            pd.concat([real["topic"], pairs["topic_a"], pairs["topic_b"]], ignore_index=True).astype(str), sort=True
+        )
+        labels = np.asarray(labels, dtype=str)
+        if vocabulary is not None:
+            ids = vocabulary.intern(labels.tolist())
+            topic_ids = np.array([ids[t] for t in labels], dtype=np.int64)
+        else:
+            topic_ids = np.arange(len(labels), dtype=np.int64)
+        n_cols = len(labels)  # only this channel's topics, not the whole shared vocabulary
+        c, a, b = np.split(topic_codes, [len(real), len(real) + len(pairs)])
+
+        shape = (len(weeks), n_cols)
+        week_counts = sparse.csr_matrix((real["count"].to_numpy(dtype=np.int64), (r, c)), shape=shape)
+        week_first = sparse.csr_matrix((real["first"].to_numpy(dtype=np.int64) + 1, (r, c)), shape=shape)
+
+        pruned = np.zeros(len(weeks), dtype=np.int64)
+        np.add.at(pruned, folded_rows, folded["count"].to_numpy(dtype=np.int64))
+
+        counts = pairs["count"].to_numpy(dtype=np.int64)
+        cooccurrence = sparse.csr_matrix(
+            (np.concatenate([counts, counts]), (np.concatenate([a, b]), np.concatenate([b, a]))),
+            shape=(n_cols, n_cols),
+        )  # duplicates (same pair in several weeks) are summed
+        return cls(weeks, topic_ids, labels, week_counts, week_first, pruned, cooccurrence)
+
+    def save(self, path: Path) -> None:
+        np.savez_compressed(
+            path,
+            weeks=self.weeks,
+            topic_ids=self.topic_ids,
+            topics=self.topics,
+            pruned=self.pruned,
+            **_csr_arrays("week_counts", self.week_counts),
+            **_csr_arrays("week_first", self.week_first),
+            **_csr_arrays("cooccurrence", self.cooccurrence),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "TopicIndex":
+        with np.load(path) as data:
+            return cls(
+                data["weeks"], data["topic_ids"], data["topics"],
+                _csr_from(data, "week_counts"), _csr_from(data, "week_first"),
+                data["pruned"], _csr_from(data, "cooccurrence"),
+            )
+
+    def _ranked(self, rows: np.ndarray, cols: np.ndarray, counts: np.ndarray, first: np.ndarray,
+                top_n: int) -> List[List[Tuple[str, int]]]:
+        """Per row: top_n (topic, count), count desc, ties by first appearance."""
+        order = np.lexsort((first, -counts, rows))
+        rows, cols, counts = rows[order], cols[order], counts[order]
+        starts = np.searchsorted(rows, rows, side="left")
+        keep = np.arange(len(rows)) - starts < top_n
+        ranked: List[List[Tuple[str, int]]] = [[] for _ in range(int(rows.max()) + 1 if len(rows) else 0)]
+        for row, col, count in zip(rows[keep].tolist(), cols[keep].tolist(), counts[keep].tolist()):
+            ranked[row].append((self._labels[col], count))
+        return ranked
+
+    def trigger_topics(self, top_n: int = 5) -> List[Tuple[str, int]]:
+        """Top topics over all weeks of the index."""
+        counts = np.asarray(self.week_counts.sum(axis=0)).ravel()
+        cols = np.flatnonzero(counts)
+        if not len(cols):
+            return []
+        coo = self.week_first.tocoo()
+        first = np.full(self.week_first.shape[1], np.iinfo(np.int64).max)
+        np.minimum.at(first, coo.col, coo.data)  # earliest vote per topic (sparse min would see implicit zeros)
+        first = first[cols]
+        return self._ranked(np.zeros(len(cols), dtype=np.int64), cols, counts[cols], first, top_n)[0]
+
+    def weekly_top(self, top_n: int = 5) -> Dict[str, List[Tuple[str, int]]]:
+        """week label -> top topics of that week."""
+        coo = self.week_counts.tocoo()
+        first = self.week_first.tocoo()  # same sparsity structure (first is never 0)
+        ranked = self._ranked(coo.row, coo.col, coo.data, first.data, top_n)
+        return {str(self.weeks[i]): topics for i, topics in enumerate(ranked) if topics}
+
+    def week_totals(self) -> np.ndarray:
+        """Critical topic mentions per week, including pruned votes."""
+        return np.asarray(self.week_counts.sum(axis=1)).ravel() + self.pruned
+
+    def dominance(self) -> np.ndarray:
+        """Per week: max(topic count) / all critical topic mentions (0.0 without mentions)."""
+        totals = self.week_totals()
+        if not self.week_counts.shape[1]:
+            return np.zeros(len(totals))
+        top = self.week_counts.max(axis=1).toarray().ravel()
+        return np.divide(top, totals, out=np.zeros(len(totals)), where=totals > 0)
+
+    def week_row(self, week: str) -> Optional[int]:
+        return self._week_rows.get(week)
+
+    def column(self, topic: str) -> Optional[int]:
+        pos = np.searchsorted(self.topics, topic)
+        if pos < len(self.topics) and self.topics[pos] == topic:
+            return int(pos)
+        return None
+
+    def topic_id(self, topic: str) -> Optional[int]:
+        """Shared ID (data/topic_ids.sqlite) of a topic in this index."""
+        col = self.column(topic)
+        return None if col is None else int(self.topic_ids[col])
+
+    def related(self, topic: str, n: int = 10) -> List[Tuple[str, int]]:
+        """Topics mentioned in the same comments as `topic`, most frequent first."""
+        col = self.column(topic)
+        if col is None:
+            return []
+        row = self.cooccurrence.getrow(col)
+        labels = np.array([self._labels[c] for c in row.indices.tolist()], dtype=str)
+        order = np.lexsort((labels, -row.data))[:n]  # ties alphabetically
+        return [(self._labels[int(c)], int(k)) for c, k in zip(row.indices[order], row.data[order])]
+
+
+def _csr_arrays(name: str, matrix) -> Dict[str, np.ndarray]:
+    return {
+        f"{name}_data": matrix.data,
+        f"{name}_indices": matrix.indices,
+        f"{name}_indptr": matrix.indptr,
+        f"{name}_shape": np.array(matrix.shape),
+    }
+
+
+def _csr_from(data, name: str):
+    from scipy import sparse
+
+    return sparse.csr_matrix(
+        (data[f"{name}_data"], data[f"{name}_indices"], data[f"{name}_indptr"]),
+        shape=tuple(data[f"{name}_shape"]),
+    )
+
+
+def main() -> None:
+    from scripts.compute_metrics import TOPIC_INDEX_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", type=Path, default=TOPIC_INDEX_PATH)
+    parser.add_argument("--with", dest="topic", metavar="TOPIC", help="topics mentioned together with TOPIC")
+    parser.add_argument("--triggers", action="store_true", help="top critical-intent topics (all weeks)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    index = TopicIndex.load(args.path)
+    if args.topic:
+        rows: Sequence[Tuple[str, int]] = index.related(args.topic, args.top)
+        if not rows and index.column(args.topic) is None:
+            raise SystemExit(f"Unknown topic {args.topic!r}")
+    elif args.triggers:
+        rows = index.trigger_topics(args.top)
+    else:
+        weekly = index.weekly_top(3)
+        for week, share in zip(index.weeks.tolist(), index.dominance()):
+            print(f"{week}  dominance={share:.3f}  {weekly.get(week, [])}")
+        return
+    for topic, count in rows:
+        print(f"{count:>6}  {topic}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""
+Tests run against config.example.py (config.py holds secrets and is not in git),
+with a channel of their own. Run from comment-sentiment/:
+
+    python -m pytest -q tests
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+_spec = importlib.util.spec_from_file_location("config", ROOT_DIR / "config.example.py")
+config = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(config)
+config.CHANNEL_HANDLE = "@pytest"
+sys.modules["config"] = config
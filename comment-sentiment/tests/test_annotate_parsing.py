@@ -0,0 +1,44 @@
+import pytest
+
+import annotate_comments as ac
+
+
+def _obj(i: int) -> str:
+    return f'{{"id": "c{i}", "sentiment": "neutral", "intent": "other", "emotion_intensity": 0.1, "key_topics": []}}'
+
+
+def test_incremental_parser_returns_objects_as_soon_as_they_close():
+    text = "[" + ",".join(_obj(i) for i in range(3)) + "]"
+    parser = ac._IncrementalArrayParser()
+    seen = []
+    for cut in range(0, len(text), 7):  # chunks split objects, strings and keys
+        seen += [o["id"] for o in parser.feed(text[cut:cut + 7])]
+    assert seen == ["c0", "c1", "c2"]
+    assert parser.skipped == 0
+
+
+def test_salvage_keeps_complete_objects_of_a_truncated_response():
+    text = "[" + ",".join(_obj(i) for i in range(3)) + "]"
+    truncated = text[: text.index('"c2"') + 10]
+    assert [o["id"] for o in ac._salvage_claude_json(truncated)] == ["c0", "c1"]
+
+
+def test_salvage_ignores_preamble_code_fences_and_braces_in_strings():
+    tricky = '{"id": "c1", "sentiment": "negative", "intent": "other", "key_topics": ["a}b", "say \\"{hi\\""]}'
+    text = "Here you go:\n```json\n[" + _obj(0) + ", " + tricky + "]\n```"
+    objs = ac._salvage_claude_json(text)
+    assert [o["id"] for o in objs] == ["c0", "c1"]
+    assert objs[1]["key_topics"] == ["a}b", 'say "{hi"']
+
+
+def test_salvage_repairs_trailing_commas_and_skips_malformed_objects():
+    parser = ac._IncrementalArrayParser()
+    text = '[{"id": "c0", "key_topics": ["x",],}, {"id": c1 broken}, ' + _obj(2) + "]"
+    assert [o["id"] for o in parser.feed(text)] == ["c0", "c2"]
+    assert parser.skipped == 1
+
+
+def test_safe_parse_requires_a_complete_array():
+    text = "[" + _obj(0) + ", " + _obj(1)
+    with pytest.raises(ValueError):
+        ac._safe_parse_claude_json(text)
@@ -0,0 +1,47 @@
+from annotation_cache import AnnotationCache, group_by_text, normalize_text, text_key
+
+
+def test_normalize_text_folds_case_whitespace_and_repeats():
+    assert normalize_text("  First!\n") == normalize_text("first!")
+    assert normalize_text("Soooooo   GOOD") == "soo good"
+    assert normalize_text("😂😂😂😂😂") == "😂😂"
+    # digits are content, not emphasis
+    assert normalize_text("1000") == "1000"
+    assert normalize_text(None) == ""
+
+
+def test_group_by_text_keeps_every_comment_and_the_first_as_representative():
+    comments = [
+        {"comment_id": "a", "text": "Great video!!!"},
+        {"comment_id": "b", "text": "great   video!!"},
+        {"comment_id": "c", "text": "something else"},
+    ]
+    groups = group_by_text(comments)
+    assert len(groups) == 2
+    assert [c["comment_id"] for c in groups[text_key("GREAT VIDEO!!")]] == ["a", "b"]
+
+
+def test_cache_round_trip_is_scoped_to_the_prompt_version(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    ann = {"sentiment": "positive", "intent": "praise", "emotion_intensity": 0.8, "key_topics": ["schnitt"]}
+    key = text_key("Toller Schnitt 👍")
+
+    cache = AnnotationCache(path, "v1")
+    cache.put_many({key: ann})
+    cache.close()
+
+    cache = AnnotationCache(path, "v1")
+    assert cache.get_many([text_key("toller   schnitt 👍"), key, text_key("other")]) == {key: ann}
+    cache.close()
+
+    cache = AnnotationCache(path, "v2")
+    assert cache.get_many([key]) == {}
+    cache.close()
+
+
+def test_cache_lookup_is_chunked_below_the_sqlite_parameter_limit(tmp_path):
+    cache = AnnotationCache(tmp_path / "cache.sqlite", "v1")
+    items = {text_key(f"comment {i}"): {"sentiment": "neutral", "key_topics": [str(i)]} for i in range(1200)}
+    cache.put_many(items)
+    assert cache.get_many(items.keys()) == items
+    cache.close()
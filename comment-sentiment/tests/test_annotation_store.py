@@ -0,0 +1,57 @@
+import json
+
+import annotation_store
+from benchmarks import synthetic
+
+
+def _write(path, records):
+    # As annotate_comments writes it
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+
+def _store(directory):
+    manifest = annotation_store.load_manifest(directory)
+    weeks = annotation_store.read_weeks(directory, sorted(manifest))
+    return {k: (w["fingerprint"], w["rows"]) for k, w in manifest.items()}, weeks.sort_index()
+
+
+def _full_export(records, tmp_path):
+    _write(tmp_path / "full.json", records)
+    directory = tmp_path / "full"
+    annotation_store.export_json(tmp_path / "full.json", directory, full=True)
+    return _store(directory)
+
+
+def test_appended_records_match_a_full_export(tmp_path):
+    records = list(synthetic.comments(weeks=5, comments_per_week=200, topics=10, annotated=True))
+    path, directory = tmp_path / "annotated.json", tmp_path / "store"
+
+    _write(path, records[:600])
+    assert len(annotation_store.export_json(path, directory)) == 3
+    assert annotation_store.export_json(path, directory) == []  # unchanged file: nothing parsed or written
+
+    _write(path, records[:700] + records[900:] + records[700:900])  # appended out of week order
+    changed = annotation_store._export_appended(path.read_bytes(), directory)  # what export_json tries first
+    assert changed is not None and len(changed) == 3  # week 4 grows, weeks 5 and 6 are new
+    manifest, weeks = _store(directory)
+    full_manifest, full_weeks = _full_export(records[:700] + records[900:] + records[700:900], tmp_path)
+    assert manifest == full_manifest
+    assert weeks.equals(full_weeks)
+
+
+def test_edited_records_fall_back_to_a_full_comparison(tmp_path):
+    records = list(synthetic.comments(weeks=3, comments_per_week=100, topics=5, annotated=True))
+    path, directory = tmp_path / "annotated.json", tmp_path / "store"
+    _write(path, records)
+    annotation_store.export_json(path, directory)
+
+    records[150] = {**records[150], "sentiment": "negative", "intent": "aggressive_criticism"}
+    _write(path, records + [dict(records[0], comment_id="new")])
+    changed = annotation_store.export_json(path, directory)
+    assert len(changed) == 2  # edited week + the week the new comment belongs to
+
+    manifest, weeks = _store(directory)
+    full_manifest, full_weeks = _full_export(records + [dict(records[0], comment_id="new")], tmp_path)
+    assert manifest == full_manifest
+    assert weeks.equals(full_weeks)
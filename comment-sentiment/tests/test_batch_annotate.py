@@ -0,0 +1,100 @@
+"""submit -> collect against dev/stub_batch_server.py, run in-process on a free port."""
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import annotate_comments as ac
+import batch_annotate as ba
+import config
+from dev import stub_batch_server as stub
+
+N_TEXTS = 40
+BATCH_SIZE = 5
+
+
+@pytest.fixture
+def stub_api(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), stub.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(config, "ANTHROPIC_BASE_URL", f"http://127.0.0.1:{server.server_port}", raising=False)
+    monkeypatch.setattr(stub.Handler, "log_message", lambda *args: None)
+    monkeypatch.setattr(stub, "BATCHES", {})
+
+    comments = [{"comment_id": f"c{i}", "text": f"comment number {i}"} for i in range(N_TEXTS)]
+    comments += [
+        {"comment_id": "dup1", "text": "Comment number 0"},
+        {"comment_id": "dup2", "text": "comment  number 0"},
+    ]
+    (tmp_path / "raw.json").write_text(json.dumps(comments), encoding="utf-8")
+    monkeypatch.setattr(ac, "INPUT_PATH", tmp_path / "raw.json")
+    monkeypatch.setattr(ac, "OUTPUT_PATH", tmp_path / "annotated.json")
+    monkeypatch.setattr(ac, "CACHE_PATH", tmp_path / "cache.sqlite")
+    monkeypatch.setattr(ac, "BATCH_SIZE", BATCH_SIZE)
+    monkeypatch.setattr(ac, "ROUTING_ENABLED", False)
+    monkeypatch.setattr(ba, "JOBS_PATH", tmp_path / "jobs.json")
+    yield comments
+    server.shutdown()
+    server.server_close()
+
+
+def _annotated_ids():
+    annotated = ac._load_json(ac.OUTPUT_PATH, default=[])
+    ids = [a["comment_id"] for a in annotated]
+    assert len(ids) == len(set(ids)), "a comment was merged twice"
+    return set(ids)
+
+
+def test_partial_failures_are_resubmitted_and_merged(stub_api, monkeypatch):
+    monkeypatch.setattr(stub, "FAIL_EVERY", 3)  # requests 2 and 5 (of 8) error
+    monkeypatch.setattr(stub, "DROP_EVERY", 4)  # every 4th comment of an answer is missing
+
+    ba.submit()
+    ba.collect()
+    [job] = ba._load_jobs()
+    assert job["mode"] == "text" and job["collected"]
+    done = _annotated_ids()
+    # 6 succeeded requests x 4 answered texts, plus both duplicates of c0
+    assert len(done) == 6 * 4 + 2
+    assert {"c0", "dup1", "dup2"} <= done
+    assert not {"c3", "c10", "c14", "c25", "c29"} & done
+
+    monkeypatch.setattr(stub, "FAIL_EVERY", 0)
+    monkeypatch.setattr(stub, "DROP_EVERY", 0)
+    ba.submit()
+    jobs = ba._load_jobs()
+    resubmitted = {cid for req in jobs[1]["requests"].values() for m in req["comment_ids"].values() for cid in m}
+    assert resubmitted == {c["comment_id"] for c in stub_api} - done
+
+    ba.collect()
+    assert _annotated_ids() == {c["comment_id"] for c in stub_api}
+    assert all(job["collected"] for job in ba._load_jobs())
+
+
+def test_results_are_parsed_in_the_mode_the_job_was_submitted_with(stub_api, monkeypatch):
+    monkeypatch.setattr(ac, "ANNOTATION_MODE", "tool")
+    ba.submit()
+    monkeypatch.setattr(ac, "ANNOTATION_MODE", "text")
+    ba.collect()
+    [job] = ba._load_jobs()
+    assert job["mode"] == "tool" and job["collected"]
+    assert _annotated_ids() == {c["comment_id"] for c in stub_api}
+
+
+def test_job_stays_open_when_nothing_could_be_merged(stub_api, monkeypatch):
+    monkeypatch.setattr(stub, "DROP_EVERY", 1)  # every request succeeds with an empty answer
+    ba.submit()
+    ba.collect()
+    [job] = ba._load_jobs()
+    assert not job["collected"]
+    assert not _annotated_ids()
+
+    # Still pending, so not submitted twice; collecting again picks the results up
+    ba.submit()
+    assert len(ba._load_jobs()) == 1
+    monkeypatch.setattr(stub, "DROP_EVERY", 0)
+    ba.collect()
+    assert ba._load_jobs()[0]["collected"]
+    assert _annotated_ids() == {c["comment_id"] for c in stub_api}
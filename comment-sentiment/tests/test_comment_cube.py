@@ -0,0 +1,50 @@
+import pandas as pd
+
+from benchmarks import synthetic
+from scripts import compute_metrics as cm
+from scripts.comment_cube import CommentCube
+
+
+def _cube(records):
+    cells = cm.build_weekly_cube(cm.prepare_dataframe(pd.DataFrame(records)))["cells"]
+    return CommentCube.from_cells(cells, cm._intent_groups(cells["intent"]), cm.EMOTION_SCALE)
+
+
+def _comment(video, topic, intent="constructive_criticism", emotion=0.5):
+    return {"published_at": "2025-03-05T12:00:00Z", "video_id": video, "text": "t", "sentiment": "negative",
+            "intent": intent, "emotion_intensity": emotion, "key_topics": [topic]}
+
+
+def test_ties_rank_by_label_and_survive_save_load(tmp_path):
+    records = [_comment("vid_b", "ton"), _comment("vid_c", "ton"), _comment("vid_a", "schnitt"),
+               _comment("vid_c", "ton"), _comment("vid_b", "ton"), _comment("vid_a", "ton"),
+               _comment("vid_c", "ton", intent="praise")]
+    cube = _cube(records)
+    top = cube.top("video", n=3)
+    assert top["video"].tolist() == ["vid_c", "vid_a", "vid_b"]  # 3, then 2 / 2 alphabetically
+    assert top["comments"].tolist() == [3, 2, 2]
+
+    cube.save(tmp_path / "cube.npz")
+    loaded = CommentCube.load(tmp_path / "cube.npz")
+    critical = loaded.top("topic", intent_group="critical")
+    assert list(zip(critical["topic"], critical["comments"])) == [("ton", 5), ("schnitt", 1)]
+    assert critical["share"].tolist() == [round(5 / 6, 3), round(1 / 6, 3)]
+
+
+def test_slices_match_the_comments():
+    records = list(synthetic.comments(weeks=4, comments_per_week=250, topics=8, annotated=True))
+    cube = _cube(records)
+    df = cm.prepare_dataframe(pd.DataFrame(records))
+    df["week"] = df["week_period"].astype(str)
+    df["intent_group"] = cm._intent_groups(df["intent"])
+
+    by_video = cube.slice(by=["week", "video"], intent_group="critical")
+    critical = df[df["intent_group"] == "critical"]
+    expected = critical.groupby(["week", "video_id"]).size()
+    assert dict(zip(zip(by_video["week"], by_video["video"]), by_video["comments"])) == expected.to_dict()
+    counts = by_video["comments"].tolist()
+    assert counts == sorted(counts, reverse=True)
+    ties = by_video[by_video.duplicated("comments", keep=False)]
+    for _, group in ties.groupby("comments", sort=False):
+        labels = list(zip(group["week"], group["video"]))
+        assert labels == sorted(labels)
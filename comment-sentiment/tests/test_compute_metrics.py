@@ -0,0 +1,133 @@
+"""
+Weekly cube (user-034) and stored per-week partials (user-037) against a plain
+per-comment reference, which is how the metrics were computed before the cube.
+"""
+import json
+from collections import Counter
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic
+from scripts import compute_metrics as cm
+from scripts import metrics_partials as partials
+
+
+@pytest.fixture(scope="module")
+def records():
+    return list(synthetic.comments(weeks=6, comments_per_week=300, topics=12, annotated=True))
+
+
+def _prepared(records):
+    return cm.prepare_dataframe(pd.DataFrame(records))
+
+
+def _on_tie(values) -> bool:
+    """True if the exact mean of values lies on x.xx5, where float rounding depends on summation order."""
+    units = [round(v * cm.EMOTION_SCALE) for v in values]
+    return (Fraction(sum(units), len(units) * cm.EMOTION_SCALE) * 100 - Fraction(1, 2)).denominator == 1
+
+
+def _assert_mean(actual: float, values, rounding=round) -> None:
+    """The cube rounds the exact mean; the old float mean may be one cent off only on x.xx5 ties."""
+    units = [round(v * cm.EMOTION_SCALE) for v in values]
+    assert actual == rounding(sum(units) / (len(units) * cm.EMOTION_SCALE), 2)
+    if not _on_tie(values):
+        assert actual == rounding(float(pd.Series(values).mean()), 2)
+
+
+def _counts(df, key):
+    counts = df.groupby(["week", key]).size()
+    totals = df.groupby("week").size()
+    return {(w, k): (n, n / totals[w]) for (w, k), n in counts.items()}
+
+
+def _votes(frame):
+    topics = []
+    for tlist in frame["key_topics"]:
+        if isinstance(tlist, list) and tlist:
+            topics.extend(set(tlist))
+    return Counter(topics)
+
+
+def test_cube_sections_match_the_per_comment_reference(records):
+    df = _prepared(records)
+    out = cm.build_output(cm.build_weekly_cube(df))
+    df["week"] = df["week_period"].astype(str)
+    df["intent_group"] = df["intent"].map(cm.INTENT_GROUPS).fillna("other")
+
+    sections = [("sentiment_trend", "sentiment"), ("intent_distribution", "intent"), ("intent_shift", "intent_group")]
+    for section, key in sections:
+        assert {(r["week"], r[key]): (r["count"], r["ratio"]) for r in out[section]} == _counts(df, key)
+
+    critical = df[df["intent"].isin(cm.CRITICAL_INTENTS)]
+    assert [tuple(t) for t in out["top_trigger_topics"]] == _votes(critical).most_common(5)
+    for row in out["criticism_structure"]:
+        votes = _votes(critical[critical["week"] == row["week"]])
+        assert [tuple(t) for t in row["top_topics"]] == votes.most_common(5)
+        assert row["dominance"] == round(max(votes.values()) / sum(votes.values()), 3)
+
+    for row in out["escalation"]:
+        week = df[df["week"] == row["week"]]
+        assert row["aggressive_ratio"] == round((week["intent"] == "aggressive_criticism").sum() / len(week), 3)
+
+    with_topic = df[df["key_topics"].map(lambda t: isinstance(t, list) and len(t) > 0)]
+    issues = with_topic.assign(topic=with_topic["key_topics"].str[0])
+    expected = {
+        k: g["emotion_intensity"].tolist() for k, g in issues.groupby(["week", "topic", "sentiment", "intent_group"])
+    }
+    assert {(r["week"], r["topic"], r["sentiment"], r["intent_group"]) for r in out["issues"]} == set(expected)
+    for r in out["issues"]:
+        values = expected[(r["week"], r["topic"], r["sentiment"], r["intent_group"])]
+        assert r["comment_count"] == len(values)
+        _assert_mean(r["avg_emotion"], values, np.round)  # Series.round, as before the cube
+
+    for r in out["emotion_context"]:
+        week = df[df["week"] == r["week"]]
+        _assert_mean(r["avg_emotion_total"], week["emotion_intensity"].tolist())
+        _assert_mean(r["avg_emotion_negative"], week.loc[week["sentiment"] == "negative", "emotion_intensity"].tolist())
+
+
+def test_x_xx5_means_round_the_same_in_any_row_order():
+    rows = [
+        {"published_at": "2025-03-05T12:00:00Z", "video_id": "v", "text": "t", "sentiment": "negative",
+         "intent": "aggressive_criticism", "emotion_intensity": e, "key_topics": ["ton"]}
+        for e in (0.1, 0.2, 0.345)
+    ]
+    assert _on_tie([0.1, 0.2, 0.345])  # exact mean 0.215
+    # The old float mean is 0.215 or 0.21499999999999997 depending on the order (0.22 or 0.21).
+    # Issues round like Series.round (half to even on 21.5 -> 0.22), the weekly
+    # emotion context like round() on the float 0.215 (just below the tie -> 0.21).
+    for ordered in (rows, rows[::-1], rows[1:] + rows[:1]):
+        out = cm.build_output(cm.build_weekly_cube(_prepared(ordered)))
+        assert out["issues"][0]["avg_emotion"] == 0.22
+        assert out["emotion_context"][0]["avg_emotion_total"] == 0.21
+
+
+def test_partials_match_a_one_shot_run_after_a_week_changes(records, tmp_path, monkeypatch):
+    monkeypatch.setattr(cm, "PARTIALS_DIR", tmp_path / "partials")
+    monkeypatch.setattr(cm, "CHANGELOG_PATH", tmp_path / "changelog.jsonl")
+    monkeypatch.setattr(cm, "LATEST_WEEKS", 0)
+
+    def incremental(df):
+        fingerprints = partials.week_fingerprints(df, cm.EMOTION_SCALE, cm._has_text(df))
+        keys = df["week"].map(partials.week_key)
+        return cm.update_partials(fingerprints, lambda touched: df[keys.isin(touched)])
+
+    def as_json(cube):
+        return json.dumps(cm.build_output(cube), sort_keys=True)
+
+    df = _prepared(records)
+    assert as_json(incremental(df)) == as_json(cm.build_weekly_cube(df))
+
+    edited = [dict(r) for r in records]
+    for r in edited[300:320]:  # second week only
+        r["sentiment"], r["intent"] = "negative", "aggressive_criticism"
+    df = _prepared(edited)
+    assert as_json(incremental(df)) == as_json(cm.build_weekly_cube(df))
+
+    runs = [json.loads(line) for line in (tmp_path / "changelog.jsonl").read_text().splitlines()]
+    assert len(runs[0]["touched_weeks"]) == df["week"].nunique()
+    assert runs[1]["touched_weeks"] == sorted(df["week"].iloc[300:320].unique())
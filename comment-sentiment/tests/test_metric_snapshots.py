@@ -0,0 +1,13 @@
+import pytest
+
+from dev import check_snapshot_rollover
+from scripts import compute_metrics as cm
+
+
+# Synthetic weeks straddle calendar weeks, so one run can add two new weeks. Only the last
+# latest_weeks - baseline_weeks weeks of a window have a full trend baseline; that must be >= 2
+# for both to be snapshotted before they move into the baseline part of the window.
+@pytest.mark.parametrize("latest_weeks, baseline_weeks", [(6, 1), (4, 2), (6, 4)])
+def test_snapshots_survive_the_window_rolling_forward(latest_weeks, baseline_weeks, monkeypatch):
+    monkeypatch.setattr(cm, "TREND_BASELINE_WEEKS", cm.TREND_BASELINE_WEEKS)  # the check sets it per run
+    assert check_snapshot_rollover.check(10, latest_weeks, baseline_weeks, per_week=100) == []
@@ -0,0 +1,44 @@
+import numpy as np
+
+from preclassify import REFUSED, LocalClassifier, _llm_labeled, classify_rules
+
+
+class _Confident:
+    """Stands in for a fitted pipeline that is 95% sure of its first class for every text."""
+
+    def __init__(self, classes):
+        self.classes_ = np.array(classes)
+
+    def predict_proba(self, texts):
+        return np.array([[0.95] + [0.05 / (len(self.classes_) - 1)] * (len(self.classes_) - 1) for _ in texts])
+
+    def predict(self, texts):
+        return np.full(len(texts), 0.5)
+
+
+def test_model_never_overrides_comments_the_rules_refuse():
+    model = {
+        "sentiment": _Confident(["positive", "negative"]),
+        "intent": _Confident(["praise", "other"]),
+        "emotion": _Confident([0]),
+    }
+    texts = [
+        "Why did you not mention the sources for this claim in the video at all?",
+        "this is not good",
+        "ok",
+    ]
+    assert [classify_rules(t)["confidence"] for t in texts[:2]] == [REFUSED, REFUSED]
+    preds = LocalClassifier(model).classify_many(texts)
+    assert [p["confidence"] for p in preds[:2]] == [REFUSED, REFUSED]
+    assert preds[2]["sentiment"] == "positive" and preds[2]["confidence"] == 0.95
+
+
+def test_only_claude_labels_count_as_ground_truth():
+    base = {"text": "nice", "sentiment": "positive"}
+    records = [
+        {**base, "comment_id": "claude"},
+        {**base, "comment_id": "local", "annotation_source": "local"},
+        {**base, "comment_id": "cluster", "annotation_source": "cluster"},
+        {"comment_id": "unlabeled", "text": "nice"},
+    ]
+    assert [r["comment_id"] for r in _llm_labeled(records)] == ["claude"]
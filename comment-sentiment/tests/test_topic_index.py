@@ -0,0 +1,66 @@
+from collections import Counter
+
+import pandas as pd
+
+from benchmarks import synthetic
+from scripts import compute_metrics as cm
+from scripts.topic_index import TopicIndex, TopicVocabulary
+
+
+def _comment(topics, day=5, intent="constructive_criticism"):
+    return {"published_at": f"2025-03-{day:02d}T12:00:00Z", "video_id": "v", "text": "t", "sentiment": "negative",
+            "intent": intent, "emotion_intensity": 0.5, "key_topics": topics}
+
+
+def _index(records, chunk_rows=0, vocabulary=None):
+    if chunk_rows:
+        cube = cm.chunked_cube(cm.iter_chunks(records, chunk_rows))
+    else:
+        cube = cm.build_weekly_cube(cm.prepare_dataframe(pd.DataFrame(records)))
+    return TopicIndex.from_cube(cube, vocabulary)
+
+
+def test_ties_keep_first_appearance_order_like_counter():
+    records = [
+        _comment(["zeta"]), _comment(["mitte"]), _comment(["alpha"]), _comment(["mitte"]),
+        _comment(["alpha"]), _comment(["zeta"]), _comment(["mitte"]),
+        _comment(["beta"], day=12), _comment(["alpha"], day=12), _comment(["beta"], day=12),
+        _comment(["alpha"], day=12),
+        _comment(["omega"], intent="praise"),  # no vote
+    ]
+    expected = [("mitte", 3), ("zeta", 2), ("alpha", 2)]  # not alphabetical: zeta was seen first
+    for chunk_rows in (0, 1, 3):  # chunks merged like per-week partials
+        index = _index(records, chunk_rows)
+        assert index.trigger_topics(5) == [("alpha", 4), ("mitte", 3), ("zeta", 2), ("beta", 2)]
+        weekly = index.weekly_top(5)
+        assert list(weekly.values()) == [expected, [("beta", 2), ("alpha", 2)]]
+        assert index.dominance().round(3).tolist() == [round(3 / 7, 3), 0.5]
+
+
+def test_rankings_match_counter_on_synthetic_comments():
+    records = list(synthetic.comments(weeks=3, comments_per_week=400, topics=20, annotated=True))
+    votes = Counter()
+    for r in records:
+        if r["intent"] in cm.CRITICAL_INTENTS and r["key_topics"]:
+            votes.update(set(r["key_topics"]))
+    for chunk_rows in (0, 250):
+        assert _index(records, chunk_rows).trigger_topics(20) == votes.most_common(20)
+
+
+def test_related_ties_are_alphabetical_and_ids_are_stable(tmp_path):
+    records = [_comment(["ton", "schnitt"]), _comment(["ton", "licht"]), _comment(["ton", "audio"], intent="praise")]
+    vocabulary = TopicVocabulary(tmp_path / "topic_ids.sqlite")
+    try:
+        vocabulary.intern(["older_topic"])
+        index = _index(records, vocabulary=vocabulary)
+        assert index.related("ton") == [("audio", 1), ("licht", 1), ("schnitt", 1)]
+        assert index.week_counts.shape[1] == 4  # this channel's topics only
+        ids = {t: index.topic_id(t) for t in ("audio", "ton")}
+        assert 0 not in ids.values()  # "older_topic" keeps ID 0
+
+        index.save(tmp_path / "index.npz")
+        again = TopicIndex.load(tmp_path / "index.npz")
+        assert {t: again.topic_id(t) for t in ids} == ids
+        assert _index(records[::-1], vocabulary=vocabulary).topic_id("ton") == ids["ton"]
+    finally:
+        vocabulary.close()